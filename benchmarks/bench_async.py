@@ -0,0 +1,89 @@
+import os
+import io
+import sys
+import asyncio
+import argparse
+import contextlib
+from time import perf_counter
+
+'''
+    Runs a long loop on the AsyncInterpreter next to a task that only wants a turn on the
+    event loop as often as it can get one, and reports the longest that task had to wait.
+    That's how long one script holds up everything else, for each budget
+
+        $ python3 benchmarks/bench_async.py --budgets 100,1000,10000
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "pyterpreter"))
+
+from ErrorHandler import ErrorHandler
+from RegexScanner import RegexScanner
+from Parser import Parser
+from Resolver import Resolver
+from StackInterpreter import StackInterpreter
+from AsyncInterpreter import AsyncInterpreter
+
+
+def compileWorkload(source: str):
+    error_handler = ErrorHandler()
+    statements = Parser(RegexScanner(source, error_handler).scanTokens(), error_handler).parse()
+    Resolver(error_handler).resolve(statements)
+    return statements
+
+
+async def heartbeat(done: asyncio.Event, waits: list):
+    last = perf_counter()
+
+    while not done.is_set():
+        await asyncio.sleep(0)
+        now = perf_counter()
+        waits.append(now - last)
+        last = now
+
+
+async def timeBudget(source: str, budget: int):
+    '''
+        (seconds the script took, longest wait of the heartbeat)
+    '''
+    statements = compileWorkload(source)
+    done, waits = asyncio.Event(), []
+    beating = asyncio.create_task(heartbeat(done, waits))
+
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await AsyncInterpreter(ErrorHandler(), budget=budget).interpretAsync(statements)
+    elapsed = perf_counter() - start
+
+    done.set()
+    await beating
+    return elapsed, max(waits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop latency of the AsyncInterpreter per budget")
+    parser.add_argument("workload", nargs="?", default="loop.pr",
+                        help="workload .pr file, a relative one is looked up in benchmarks/")
+    parser.add_argument("--budgets", default="100,1000,10000", help="comma separated budgets to try")
+    args = parser.parse_args()
+
+    path = args.workload
+    if not os.path.exists(path):
+        path = os.path.join(BENCH_DIR, path)
+
+    with open(path, mode='r', encoding='utf-8') as f:
+        source = f.read()
+
+    statements = compileWorkload(source)
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        StackInterpreter(ErrorHandler()).interpret(statements)
+    print(f"{os.path.basename(path)} on the stack engine, blocking the loop: {perf_counter() - start:.3f}s")
+
+    for budget in map(int, args.budgets.split(",")):
+        elapsed, wait = asyncio.run(timeBudget(source, budget))
+        print(f"budget {budget:>6}: {elapsed:.3f}s, longest wait for the event loop {wait * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
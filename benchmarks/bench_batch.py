@@ -0,0 +1,73 @@
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from time import perf_counter
+
+'''
+    Times running lots of small scripts one 'python preter.py script' process at a time,
+    against running them all with --batch, where every worker imports the interpreter once
+
+        $ python3 benchmarks/bench_batch.py --scripts 200 --workers 4
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PRETER = os.path.join(BENCH_DIR, "..", "src", "pyterpreter", "preter.py")
+
+#a short job, most of a separate process' time goes to starting Python and importing
+SCRIPT = '''
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+
+print fib(%d);
+'''
+
+
+def writeScripts(directory: str, count: int):
+    for i in range(count):
+        with open(os.path.join(directory, f"job{i:05}.pr"), mode='w', encoding='utf-8') as f:
+            f.write(SCRIPT % (10 + i % 5))
+
+
+def timeProcesses(directory: str) -> float:
+    scripts = sorted(name for name in os.listdir(directory) if name.endswith(".pr"))
+
+    start = perf_counter()
+    for name in scripts:
+        subprocess.run([sys.executable, PRETER, "--no-cache", os.path.join(directory, name)],
+                       stdout=subprocess.DEVNULL, check=True)
+    return perf_counter() - start
+
+
+def timeBatch(directory: str, workers: int) -> float:
+    output = os.path.join(directory, "results.json")
+    command = [sys.executable, PRETER, "--no-cache", "--batch", directory, "--batch-output", output]
+    if workers is not None:
+        command += ["--workers", str(workers)]
+
+    start = perf_counter()
+    subprocess.run(command, stderr=subprocess.DEVNULL, check=True)
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a process per script against --batch")
+    parser.add_argument("--scripts", type=int, default=100, help="scripts to run")
+    parser.add_argument("--workers", type=int, help="--batch processes, defaults to one per core")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        writeScripts(directory, args.scripts)
+
+        processes = timeProcesses(directory)
+        batch = timeBatch(directory, args.workers)
+
+    print(f"{args.scripts} scripts: {processes:.2f}s one process each, {batch:.2f}s with --batch, "
+          f"{processes / batch:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
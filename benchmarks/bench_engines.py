@@ -0,0 +1,71 @@
+import os
+import io
+import sys
+import argparse
+import contextlib
+from time import perf_counter
+
+'''
+    Times the execution engines against each other on the .pr workloads in this directory.
+    Only the execution is timed, scanning, parsing and resolving happen beforehand
+
+        $ python3 benchmarks/bench_engines.py --repeat 5
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "pyterpreter"))
+sys.setrecursionlimit(100000)
+
+from preter import ENGINES
+from ErrorHandler import ErrorHandler
+from scanner import Scanner
+from Parser import Parser
+from Resolver import Resolver
+
+
+def timeEngine(engine: str, source: str) -> float:
+    error_handler = ErrorHandler()
+    statements = Parser(Scanner(source, error_handler).scanTokens(), error_handler).parse()
+    Resolver(error_handler).resolve(statements)
+    interpreter = ENGINES[engine](error_handler)
+
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+    elapsed = perf_counter() - start
+
+    if error_handler.hadError or error_handler.hadRuntimeError:
+        raise RuntimeError(f"{engine} failed to run the workload")
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare execution engines on the benchmark workloads")
+    parser.add_argument("workloads", nargs="*", help="workload .pr files, defaults to all in benchmarks/")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine, the fastest one counts")
+    parser.add_argument("--engines", default=",".join(ENGINES.keys()), help="comma separated engines to compare")
+    args = parser.parse_args()
+
+    workloads = args.workloads or sorted(
+        os.path.join(BENCH_DIR, name) for name in os.listdir(BENCH_DIR) if name.endswith(".pr")
+    )
+    engines = args.engines.split(",")
+
+    print(f"{'workload':<20} " + " ".join(f"{engine:>10}" for engine in engines) + "   speedup vs tree")
+
+    for path in workloads:
+        with open(path, mode='r', encoding='utf-8') as f:
+            source = f.read()
+
+        times = {engine: min(timeEngine(engine, source) for _ in range(args.repeat)) for engine in engines}
+
+        speedups = ""
+        if "tree" in times:
+            speedups = " ".join(f"{engine}: {times['tree'] / times[engine]:.2f}x" for engine in engines if engine != "tree")
+
+        print(f"{os.path.basename(path):<20} " + " ".join(f"{times[engine]:>9.3f}s" for engine in engines) + f"   {speedups}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import os
+import sys
+import argparse
+import tracemalloc
+from contextlib import contextmanager
+
+'''
+    Memory used per token, per AST node and per Environment on a large generated program,
+    with the __slots__ classes and with plain __dict__ backed copies of them.
+    Also reports the bytes per token of a TokenStore
+
+        $ python3 benchmarks/bench_memory.py --size 300000
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "pyterpreter"))
+
+import Expr
+import Stmt
+import scanner
+import RegexScanner
+import Parser
+import Environment
+import TokenStore
+from Token import Token
+from ErrorHandler import ErrorHandler
+from bench_scanner import generateSource
+
+#modules that create tokens, they get Token through 'from Token import *'
+TOKEN_USERS = [scanner, RegexScanner, Parser]
+
+
+def nodeClasses():
+    classes = []
+
+    for module, base in [(Expr, Expr.Expr), (Stmt, Stmt.Stmt)]:
+        for value in vars(module).values():
+            if isinstance(value, type) and issubclass(value, base) and value is not base:
+                classes.append(value)
+
+    return classes
+
+
+def withDict(cls):
+    '''
+        Copy of 'cls' without __slots__, so every instance gets a __dict__ like before
+    '''
+    namespace = {
+        name: value for name, value in vars(cls).items()
+        if name not in ("__slots__", "__dict__", "__weakref__") and name not in getattr(cls, "__slots__", ())
+    }
+    return type(cls.__name__, (), namespace)
+
+
+@contextmanager
+def dictBacked():
+    '''
+        Swap the dict backed copies in wherever the scanner and parser look the classes up
+    '''
+    swapped = []
+
+    for cls in nodeClasses():
+        swapped.append((Parser, cls.__name__, cls, withDict(cls)))
+
+    swapped.append((Environment, "Environment", Environment.Environment, withDict(Environment.Environment)))
+    for module in TOKEN_USERS:
+        swapped.append((module, "Token", Token, withDict(Token)))
+
+    for module, name, _, replacement in swapped:
+        setattr(module, name, replacement)
+
+    try:
+        yield
+    finally:
+        for module, name, original, _ in swapped:
+            setattr(module, name, original)
+
+
+def countNodes(node) -> int:
+    if isinstance(node, list):
+        return sum(countNodes(item) for item in node)
+
+    if not hasattr(node, "accept"):
+        return 0
+
+    fields = getattr(node, "__slots__", None) or vars(node)
+    return 1 + sum(countNodes(getattr(node, field)) for field in fields)
+
+
+def measure(source: str, environments: int):
+    error_handler = ErrorHandler()
+
+    tracemalloc.start()
+
+    before = tracemalloc.get_traced_memory()[0]
+    tokens = RegexScanner.RegexScanner(source, error_handler).scanTokens()
+    token_bytes = tracemalloc.get_traced_memory()[0] - before
+
+    before = tracemalloc.get_traced_memory()[0]
+    statements = Parser.Parser(tokens, error_handler).parse()
+    node_bytes = tracemalloc.get_traced_memory()[0] - before
+
+    globals_ = Environment.Environment()
+    before = tracemalloc.get_traced_memory()[0]
+    envs = [Environment.Environment(globals_, 2) for _ in range(environments)]
+    env_bytes = tracemalloc.get_traced_memory()[0] - before
+
+    before = tracemalloc.get_traced_memory()[0]
+    store = TokenStore.StoreScanner(source, error_handler).scanTokens()
+    store_bytes = tracemalloc.get_traced_memory()[0] - before
+
+    tracemalloc.stop()
+
+    nodes = countNodes(statements)
+    return {
+        "token": token_bytes / len(tokens),
+        "node": node_bytes / nodes,
+        "environment": env_bytes / len(envs),
+        "stored token": store_bytes / len(store),
+    }, len(tokens), nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory use of __slots__ and __dict__ backed objects")
+    parser.add_argument("--size", type=int, default=300000, help="approximate size of the program in characters")
+    parser.add_argument("--environments", type=int, default=100000, help="environments to allocate")
+    args = parser.parse_args()
+
+    source = generateSource(args.size)
+
+    with dictBacked():
+        before, _, _ = measure(source, args.environments)
+    after, token_count, node_count = measure(source, args.environments)
+
+    print(f"{len(source)} characters, {token_count} tokens, {node_count} nodes")
+    print(f"{'bytes per':<12} {'__dict__':>10} {'__slots__':>10}")
+    for name in ["token", "node", "environment"]:
+        print(f"{name:<12} {before[name]:>10.1f} {after[name]:>10.1f}  {before[name] / after[name]:.2f}x smaller")
+
+    #TokenStore doesn't have objects to put __slots__ on
+    print(f"{'TokenStore':<12} {after['stored token']:>21.1f}  {before['token'] / after['stored token']:.2f}x smaller than __dict__ tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import os
+import io
+import sys
+import json
+import argparse
+import platform
+import contextlib
+from statistics import median
+from time import perf_counter
+
+'''
+    Times scanning, parsing, resolving and interpreting separately on the .pr workloads
+    in this directory plus a large generated program, and checks for regressions.
+
+    Save a baseline once, then compare later runs against it:
+
+        $ python3 benchmarks/bench_phases.py --output baseline.json
+        $ python3 benchmarks/bench_phases.py --baseline baseline.json --threshold 0.10
+
+    Exits with 1 when any phase got slower than the baseline by more than the threshold.
+    Baselines are only comparable on the same machine, with the same engine and scanner
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "pyterpreter"))
+sys.setrecursionlimit(100000)
+
+from preter import ENGINES, SCANNERS
+from ErrorHandler import ErrorHandler
+from Parser import Parser, TokenStoreParser
+from TokenStore import TokenStore
+from Resolver import Resolver
+from bench_scanner import generateSource
+
+PHASES = ["scan", "parse", "resolve", "interpret"]
+
+#name of the generated workload in the results
+GENERATED = "<generated>"
+
+
+def timePhases(source: str, engine: str, scanner: str) -> dict:
+    '''
+        Seconds spent in each phase of one run of 'source'
+    '''
+    error_handler = ErrorHandler()
+
+    start = perf_counter()
+    tokens = SCANNERS[scanner](source, error_handler).scanTokens()
+    scanned = perf_counter()
+
+    if isinstance(tokens, TokenStore):
+        statements = TokenStoreParser(tokens, error_handler).parse()
+    else:
+        statements = Parser(tokens, error_handler).parse()
+    parsed = perf_counter()
+
+    Resolver(error_handler).resolve(statements)
+    resolved = perf_counter()
+
+    interpreter = ENGINES[engine](error_handler)
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+    interpreted = perf_counter()
+
+    if error_handler.hadError or error_handler.hadRuntimeError:
+        raise RuntimeError("workload failed to run")
+
+    return {
+        "scan": scanned - start,
+        "parse": parsed - scanned,
+        "resolve": resolved - parsed,
+        "interpret": interpreted - resolved,
+    }
+
+
+def benchmark(source: str, engine: str, scanner: str, repeat: int) -> dict:
+    runs = [timePhases(source, engine, scanner) for _ in range(repeat)]
+
+    return {
+        phase: {
+            "min": min(run[phase] for run in runs),
+            "median": median(run[phase] for run in runs),
+        }
+        for phase in PHASES
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_time: float) -> list:
+    '''
+        Prints each phase next to its baseline, returns the (workload, phase) pairs that regressed.
+        The fastest run is compared, phases faster than 'min_time' are too noisy to judge
+    '''
+    regressions = []
+
+    for name, current in results["workloads"].items():
+        if name not in baseline["workloads"]:
+            continue
+
+        for phase in PHASES:
+            now = current[phase]["min"]
+            before = baseline["workloads"][name][phase]["min"]
+            change = (now - before) / before if before > 0 else 0.0
+
+            verdict = ""
+            if max(now, before) >= min_time and change > threshold:
+                verdict = "REGRESSION"
+                regressions.append((name, phase))
+
+            print(f"{name:<20} {phase:<10} {before:>9.4f}s {now:>9.4f}s {change:>+8.1%}  {verdict}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each phase of the interpreter and compare against a baseline")
+    parser.add_argument("workloads", nargs="*", help="workload .pr files, defaults to all in benchmarks/")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per workload")
+    parser.add_argument("--engine", choices=ENGINES.keys(), default="tree")
+    parser.add_argument("--scanner", choices=SCANNERS.keys(), default="regex")
+    parser.add_argument("--generated-size", type=int, default=500000,
+                        help="size in characters of the generated workload, 0 leaves it out")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown as a fraction of the baseline, 0.10 is 10%%")
+    parser.add_argument("--min-time", type=float, default=0.001,
+                        help="phases faster than this many seconds are never reported as regressions")
+    args = parser.parse_args()
+
+    paths = args.workloads or sorted(
+        os.path.join(BENCH_DIR, name) for name in os.listdir(BENCH_DIR) if name.endswith(".pr")
+    )
+
+    workloads = {}
+    for path in paths:
+        with open(path, mode='r', encoding='utf-8') as f:
+            workloads[os.path.basename(path)] = f.read()
+
+    if args.generated_size > 0:
+        workloads[GENERATED] = generateSource(args.generated_size)
+
+    results = {
+        "python": platform.python_version(),
+        "engine": args.engine,
+        "scanner": args.scanner,
+        "repeat": args.repeat,
+        "workloads": {},
+    }
+
+    print(f"{'workload':<20} " + " ".join(f"{phase:>10}" for phase in PHASES) + f"   (fastest of {args.repeat})")
+
+    for name, source in workloads.items():
+        timings = results["workloads"][name] = benchmark(source, args.engine, args.scanner, args.repeat)
+        print(f"{name:<20} " + " ".join(f"{timings[phase]['min']:>9.4f}s" for phase in PHASES))
+
+    if args.output is not None:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline is None:
+        return
+
+    with open(args.baseline, mode='r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    if (baseline["engine"], baseline["scanner"]) != (args.engine, args.scanner):
+        print(f"warning: baseline ran with --engine={baseline['engine']} --scanner={baseline['scanner']}")
+
+    print(f"\n{'workload':<20} {'phase':<10} {'baseline':>10} {'current':>10} {'change':>8}")
+    regressions = compare(results, baseline, args.threshold, args.min_time)
+
+    if regressions:
+        print(f"\n{len(regressions)} phase(s) more than {args.threshold:.0%} slower than the baseline")
+        sys.exit(1)
+
+    print(f"\nno regressions over {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
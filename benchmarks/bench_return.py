@@ -0,0 +1,108 @@
+import os
+import io
+import sys
+import argparse
+import contextlib
+from time import perf_counter
+
+'''
+    Times 'return' on the tree-walking interpreter as it is, passing a Completion back up
+    through executeBlock(), against the textbook way of raising an exception out of the
+    function body and catching it in call()
+
+        $ python3 benchmarks/bench_return.py fib.pr calls.pr --repeat 5
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "pyterpreter"))
+sys.setrecursionlimit(100000)
+
+from ErrorHandler import ErrorHandler
+from Environment import Environment
+from RegexScanner import RegexScanner
+from Parser import Parser
+from Resolver import Resolver
+from Interpreter import Interpreter
+from FunctionCallable import FunctionCallable
+
+
+class ReturnException(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+class ExceptionFunction(FunctionCallable):
+    def call(self, interpreter, arguments):
+        environment = Environment(enclosing=interpreter.globals, size=self.declaration.size)
+        environment.slots[:len(arguments)] = arguments
+
+        try:
+            interpreter.executeBlock(self.declaration.body, environment)
+        except ReturnException as r:
+            return r.value
+
+        return None
+
+
+class ExceptionInterpreter(Interpreter):
+    '''
+        Interpreter whose 'return' raises ReturnException, break/continue are unchanged
+    '''
+    def visitFunctionStmt(self, stmt):
+        self.declare(stmt.slot, stmt.name.lexeme, ExceptionFunction(stmt))
+        return None
+
+    def visitReturnStmt(self, stmt):
+        raise ReturnException(None if stmt.value is None else self.evaluate(stmt.value))
+
+
+INTERPRETERS = {
+    "completion": Interpreter,
+    "exception": ExceptionInterpreter,
+}
+
+
+def timeInterpreter(interpreter_class, source: str) -> float:
+    error_handler = ErrorHandler()
+    statements = Parser(RegexScanner(source, error_handler).scanTokens(), error_handler).parse()
+    Resolver(error_handler).resolve(statements)
+    interpreter = interpreter_class(error_handler)
+
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(statements)
+    elapsed = perf_counter() - start
+
+    if error_handler.hadError or error_handler.hadRuntimeError:
+        raise RuntimeError(f"{interpreter_class.__name__} failed to run the workload")
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare returning with a Completion against raising an exception")
+    parser.add_argument("workloads", nargs="*", default=["fib.pr", "calls.pr", "loop_control.pr"],
+                        help="workload .pr files, relative ones are looked up in benchmarks/")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per interpreter, the fastest one counts")
+    args = parser.parse_args()
+
+    print(f"{'workload':<20} " + " ".join(f"{name:>11}" for name in INTERPRETERS) + "   speedup")
+
+    for path in args.workloads:
+        if not os.path.exists(path):
+            path = os.path.join(BENCH_DIR, path)
+
+        with open(path, mode='r', encoding='utf-8') as f:
+            source = f.read()
+
+        times = {
+            name: min(timeInterpreter(interpreter_class, source) for _ in range(args.repeat))
+            for name, interpreter_class in INTERPRETERS.items()
+        }
+
+        print(f"{os.path.basename(path):<20} " + " ".join(f"{times[name]:>10.3f}s" for name in INTERPRETERS)
+              + f"   {times['exception'] / times['completion']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import argparse
+from time import perf_counter
+
+'''
+    Times the scanner backends on a large generated program
+
+        $ python3 benchmarks/bench_scanner.py --size 1000000
+'''
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src", "pyterpreter"))
+
+from preter import SCANNERS
+from ErrorHandler import ErrorHandler
+
+CHUNK = '''
+//generated function {n}
+fun work{n}(a, b) {{
+    var total = 0;
+    for (var i = 0; i < a; i = i + 1) {{
+        total = total + i * 2.5 - b / 3;
+        if (total >= 1000 and !(i == 7)) {{
+            print "big total in work{n}";
+        }}
+    }}
+    /* a block comment
+       over two lines */
+    print total;
+}}
+'''
+
+
+def generateSource(size: int) -> str:
+    chunks = []
+    length = 0
+    n = 0
+
+    while length < size:
+        chunk = CHUNK.format(n=n)
+        chunks.append(chunk)
+        length += len(chunk)
+        n += 1
+
+    return "".join(chunks)
+
+
+def timeScanner(name: str, source: str):
+    error_handler = ErrorHandler()
+
+    start = perf_counter()
+    tokens = SCANNERS[name](source, error_handler).scanTokens()
+    return perf_counter() - start, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scanner backends on a generated program")
+    parser.add_argument("--size", type=int, default=1000000, help="approximate size of the program in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scanner, the fastest one counts")
+    args = parser.parse_args()
+
+    source = generateSource(args.size)
+    print(f"{len(source)} characters")
+
+    results = {}
+    for name in SCANNERS:
+        runs = [timeScanner(name, source) for _ in range(args.repeat)]
+        results[name] = min(elapsed for elapsed, _ in runs)
+        tokens = runs[0][1]
+        print(f"{name:<8} {results[name]:.3f}s  {len(tokens)} tokens  {len(source) / results[name] / 1e6:.2f} MB/s")
+
+    print(f"regex is {results['char'] / results['regex']:.2f}x faster than char")
+
+
+if __name__ == '__main__':
+    main()
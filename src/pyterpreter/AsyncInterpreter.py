@@ -0,0 +1,100 @@
+import asyncio
+from typing import List
+
+from Stmt import *
+from Expr import *
+from ErrorHandler import *
+from RuntimeError_ import *
+from Callable import Callable
+from Natives import NativeError
+from StackInterpreter import StackInterpreter
+
+'''
+    Running scripts inside an asyncio program, many of them on one thread.
+
+    The StackInterpreter keeps everything about a running script in its steps() generator,
+    so it can stop between any two steps and carry on later. AsyncInterpreter gives the event
+    loop a turn after every 'budget' loop iterations and calls. Loops are never left to the
+    visitors as a whole for that, every iteration counts, so no script keeps the event loop
+    to itself for longer than one budget's worth of work, however long it runs.
+
+    A native whose call() returns an awaitable, like a coroutine from an 'async def call()',
+    is awaited before the script goes on with its result. Functions that a native calls
+    itself, like the ones memoize() wraps, run to their end without a turn for the loop
+'''
+
+class AsyncInterpreter(StackInterpreter):
+    '''
+        Use it like
+
+            preter = Preter()
+            statements = preter.compile(source)
+            await AsyncInterpreter(preter.error_handler, budget=500).interpretAsync(statements)
+
+        A smaller budget means shorter waits for everything else on the event loop, a larger
+        one less time spent switching
+    '''
+    STACKED_NODES = (CallFunction, While)
+
+    def __init__(self, error_handler: ErrorHandler, budget: int=1000):
+        if budget < 1:
+            raise ValueError("budget has to be at least 1")
+
+        super().__init__(error_handler)
+        self.budget = budget
+
+        self.globals.define("sleep", Sleep())
+
+    async def interpretAsync(self, statements: List[Stmt]):
+        '''
+            Like interpret(), giving the event loop a turn every 'budget' loop iterations and calls
+        '''
+        steps = self.steps(list(reversed(statements)), self.globals, self.budget)
+        value, error = None, None
+
+        try:
+            while True:
+                if error is None:
+                    awaitable = steps.send(value)
+                else:
+                    awaitable = steps.throw(error)
+
+                value, error = None, None
+
+                if awaitable is None:
+                    #out of budget, let the others run
+                    await asyncio.sleep(0)
+                    continue
+
+                try:
+                    value = await awaitable
+                except Exception as e:
+                    #back into the script where the native was called, a NativeError becomes
+                    #a runtime error at the call there
+                    error = e
+
+        except StopIteration:
+            pass
+        except RuntimeError_ as e:
+            self.error_handler.runtimeError(e)
+
+
+class Sleep(Callable):
+    '''
+        sleep(seconds), lets the rest of the event loop run in the meantime. Only defined
+        for the AsyncInterpreter
+    '''
+    def arity(self):
+        return 1
+
+    async def call(self, interpreter, arguments):
+        seconds = arguments[0]
+
+        if seconds.__class__ is not float or seconds < 0:
+            raise NativeError("sleep() needs a number of seconds that isn't negative")
+
+        await asyncio.sleep(seconds)
+        return None
+
+    def __str__(self):
+        return f"<Native Function 'sleep'>"
@@ -0,0 +1,121 @@
+import os
+import io
+import sys
+import json
+import time
+import traceback
+import contextlib
+from typing import List
+from concurrent.futures import ProcessPoolExecutor
+
+'''
+    Running many independent scripts across a pool of processes, for --batch.
+
+    Every worker process starts with the interpreter already imported and runs script after
+    script, each one with a new Preter, so a fresh Interpreter and ErrorHandler and none of
+    the globals of the script before. What a script prints to stdout and stderr, and the code
+    preter.py would have exited with, end up in one JSON results file
+'''
+
+#scripts a worker gets at once, fewer round trips to the pool for lots of short scripts,
+#still small enough for the workers to finish at about the same time
+MAX_CHUNK = 16
+
+
+def findScripts(target: str) -> List[str]:
+    '''
+        The .pr files in the directory 'target' and the ones below it, sorted. Otherwise
+        'target' is a manifest listing one script per line, relative to the manifest.
+        Blank lines and lines starting with '#' are skipped
+    '''
+    if os.path.isdir(target):
+        scripts = []
+
+        for directory, subdirectories, files in os.walk(target):
+            #a cache directory next to the scripts holds compiled programs, not scripts
+            subdirectories[:] = sorted(name for name in subdirectories if name != "__prcache__")
+            scripts.extend(os.path.join(directory, name) for name in sorted(files) if name.endswith(".pr"))
+
+        return scripts
+
+    base = os.path.dirname(os.path.abspath(target))
+
+    with open(target, mode='r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+
+    return [os.path.join(base, line) for line in lines if line and not line.startswith("#")]
+
+
+#how this worker runs scripts, set by startWorker()
+preter_class = None
+preter_options = None
+stream_scripts = False
+
+
+def startWorker(preter: type, options: dict, stream: bool):
+    '''
+        Runs once in every worker process. 'preter' is the Preter class, passed in because
+        preter.py imports this module
+    '''
+    global preter_class, preter_options, stream_scripts
+    preter_class, preter_options, stream_scripts = preter, options, stream
+
+
+def runScript(path: str) -> dict:
+    '''
+        Run one script like 'preter.py path' would, with its output captured
+    '''
+    stdout, stderr = io.StringIO(), io.StringIO()
+    exit_code = 0
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            preter_class(**preter_options).runFile(path, stream=stream_scripts)
+        except SystemExit as e:
+            #runFile() exits with 65 or 70 when the script failed
+            exit_code = e.code
+        except Exception:
+            #a missing script, or a crash the interpreter didn't turn into an error,
+            #shouldn't take the rest of the batch down with it
+            traceback.print_exc()
+            exit_code = 1
+
+    return {
+        "script": path,
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def plural(count: int, noun: str) -> str:
+    return f"{count} {noun}" if count == 1 else f"{count} {noun}s"
+
+
+def runBatch(scripts: List[str], output: str, preter: type, options: dict, stream: bool=False,
+             workers: int=None) -> List[dict]:
+    '''
+        Run 'scripts' on 'workers' processes, one per core by default, with Preter(**options).
+        Writes the results, in the order of 'scripts', to 'output' as JSON and prints a
+        summary to stderr
+    '''
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, min(MAX_CHUNK, len(scripts) // (4 * workers)))
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=startWorker,
+                             initargs=(preter, options, stream)) as pool:
+        results = list(pool.map(runScript, scripts, chunksize=chunk))
+
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for result in results if result["exit_code"] != 0)
+
+    with open(output, mode='w', encoding='utf-8') as f:
+        json.dump({"workers": workers, "seconds": elapsed, "failed": failed, "results": results}, f, indent=2)
+
+    print(f"[batch] {plural(len(scripts), 'script')}, {failed} failed, {elapsed:.2f}s on "
+          f"{plural(workers, 'worker')}, results in {output}", file=sys.stderr)
+
+    return results
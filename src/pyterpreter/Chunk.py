@@ -0,0 +1,126 @@
+from Token import Token
+
+class OpCode:
+    '''
+        Every instruction is two cells in Chunk.code: the opcode and one argument.
+        Instructions that don't need an argument get 0.
+
+        Jumps take the absolute position in Chunk.code they jump to.
+
+        Binary operators take their right operand from the stack when the argument is 0,
+        otherwise from the constant at index argument - 1, which saves dispatching a
+        CONSTANT for things like 'i + 1' and 'i < 100'
+    '''
+    GET_LOCAL = 0           #slot
+    SET_LOCAL = 1           #slot
+    DEFINE_LOCAL = 2        #slot
+    GET_ENCLOSING = 3       #constant index of (depth, slot)
+    SET_ENCLOSING = 4       #constant index of (depth, slot)
+    GET_GLOBAL = 5          #constant index of name
+    SET_GLOBAL = 6          #constant index of name
+    DEFINE_GLOBAL = 7       #constant index of name
+    CONSTANT = 8            #constant index
+    POP = 9
+
+    ADD = 10
+    SUBTRACT = 11
+    MULTIPLY = 12
+    DIVIDE = 13
+    GREATER = 14
+    GREATER_EQUAL = 15
+    LESS = 16
+    LESS_EQUAL = 17
+    EQUAL = 18
+    NOT_EQUAL = 19
+    COMMA = 20
+    NEGATE = 21
+    NOT = 22
+
+    JUMP = 23               #target
+    JUMP_IF_FALSE = 24      #target, pops the condition
+    JUMP_IF_FALSE_OR_POP = 25   #target, keeps the condition if it jumps
+    JUMP_IF_TRUE_OR_POP = 26    #target, keeps the condition if it jumps
+
+    CALL = 27               #number of arguments
+    RETURN = 28
+    PRINT = 29
+    PUSH_ENV = 30           #size
+    POP_ENV = 31
+    JUMP_IF_TRUE = 32       #target, pops the condition
+
+    #like SET_*, but pop the value, for assignments used as statements
+    STORE_LOCAL = 33        #slot
+    STORE_ENCLOSING = 34    #constant index of (depth, slot)
+    STORE_GLOBAL = 35       #constant index of name
+
+    GET_INDEX = 36          #pops the index and the array
+    SET_INDEX = 37          #pops the value, the index and the array, pushes the value
+
+    #a callee that can't be called is an error before any argument of the call runs
+    GET_CALLEE = 38         #constant index of (name, paren), GET_GLOBAL of a callee that checks it
+    CHECK_CALLABLE = 39     #keeps the callee, for callees that aren't a global
+
+OpCode.names = {value: name for name, value in vars(OpCode).items() if isinstance(value, int)}
+
+
+class Chunk:
+    '''
+        A compiled piece of bytecode: either the top level of a program or a function body
+    '''
+    def __init__(self, name: str):
+        self.name = name
+        self.code = []
+        self.constants = []
+        #token per instruction, used to report the line of runtime errors
+        self.tokens = []
+
+        #float/string/bool/nil constants get deduplicated.
+        #the type goes in the key, since 1.0 == True in Python
+        self._constant_index = {}
+
+    def emit(self, op: int, argument: int=0, token: Token=None) -> int:
+        '''
+            Returns the position of the instruction, to patch jumps later
+        '''
+        self.code.append(op)
+        self.code.append(argument)
+        self.tokens.append(token)
+        return len(self.code) - 2
+
+    def patch(self, position: int, argument: int):
+        self.code[position + 1] = argument
+
+    def addConstant(self, value) -> int:
+        if value is None or isinstance(value, (float, str, bool)):
+            key = (type(value), value)
+
+            if key not in self._constant_index:
+                self._constant_index[key] = len(self.constants)
+                self.constants.append(value)
+
+            return self._constant_index[key]
+
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def tokenAt(self, position: int) -> Token:
+        return self.tokens[position // 2]
+
+    def disassemble(self) -> str:
+        lines = [f"== {self.name} =="]
+
+        for position in range(0, len(self.code), 2):
+            op, argument = self.code[position], self.code[position + 1]
+            name = OpCode.names[op]
+
+            if name in ("CONSTANT", "GET_GLOBAL", "SET_GLOBAL", "DEFINE_GLOBAL", "GET_ENCLOSING", "SET_ENCLOSING",
+                        "GET_CALLEE"):
+                constant = self.constants[argument]
+                if name == "GET_CALLEE":
+                    #the name, the paren token is only there for the error
+                    constant = constant[0]
+                lines.append(f"{position:>5} {name:<22} {argument:<4} ({constant})")
+            else:
+                lines.append(f"{position:>5} {name:<22} {argument}")
+
+        return "\n".join(lines)
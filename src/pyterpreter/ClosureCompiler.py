@@ -0,0 +1,582 @@
+from typing import List
+
+from Expr import *
+from Stmt import *
+from Visitor import *
+from TokenType import *
+from ErrorHandler import *
+from RuntimeError_ import *
+from Environment import *
+from Callable import Callable
+from Rope import STRINGS, concat
+from Natives import defineNatives, NativeError, arrayArithmetic, indexGet, indexSet
+from Completion import *
+
+'''
+    Closure compilation engine.
+
+    ClosureCompiler walks a resolved Expr/Stmt tree once and turns every node into a
+    Python closure taking the current Environment. Expression closures return their
+    value, statement closures return None. Running a program is then just calling
+    the closures, with no accept()/visit dispatch and no operator if chains at runtime.
+
+    return/break/continue closures return a Completion, like the Interpreter's visitors.
+    Only statements that contain one check what the statements inside them return,
+    everything else runs the same as if the language didn't have them
+'''
+
+class ClosureFunction(Callable):
+    def __init__(self, name: str, arity: int, size: int, body):
+        self.name = name
+        self._arity = arity
+        self.size = size
+        self.body = body
+
+    def arity(self):
+        return self._arity
+
+    def call(self, interpreter, arguments):
+        environment = Environment(enclosing=interpreter.globals, size=self.size)
+
+        #parameters take up the first slots, in order
+        environment.slots[:len(arguments)] = arguments
+
+        if self.body(environment) is RETURN:
+            value = interpreter.return_value
+            interpreter.return_value = None
+            return value
+
+        return None
+
+    def __str__(self):
+        return f"<Function '{self.name}'>"
+
+
+class ClosureCompiler(Visitor):
+    def __init__(self, interpreter):
+        #the ClosureInterpreter, passed on to native calls
+        self.interpreter = interpreter
+        self.globals = interpreter.globals
+
+    def compile(self, node):
+        return node.accept(self)
+
+    def completes(self, stmt: Stmt) -> bool:
+        '''
+            Can running 'stmt' end in a return/break/continue?
+        '''
+        if isinstance(stmt, (Return, Break, Continue)):
+            return True
+
+        if isinstance(stmt, Block):
+            return any(self.completes(statement) for statement in stmt.statements)
+
+        if isinstance(stmt, If):
+            return self.completes(stmt.thenBranch) or \
+                (stmt.elseBranch is not None and self.completes(stmt.elseBranch))
+
+        if isinstance(stmt, While):
+            return self.completes(stmt.body)
+
+        #function bodies are separate
+        return False
+
+    def quiet(self, fn):
+        '''
+            Closure running 'fn' and completing normally, for statements whose closure
+            returns something that isn't a Completion, like an expression's value
+        '''
+        def run_quiet(env):
+            fn(env)
+        return run_quiet
+
+    def compileStatements(self, statements: List[Stmt]):
+        '''
+            One closure running all of 'statements' in order.
+
+            If any of them completes, the closure stops at the first Completion and returns it.
+            Otherwise what it returns means nothing
+        '''
+        fns = [self.compile(statement) for statement in statements]
+        completing = [self.completes(statement) for statement in statements]
+
+        if any(completing):
+            if len(fns) == 1:
+                return fns[0]
+
+            steps = list(zip(fns, completing))
+
+            def run_until_completion(env):
+                for fn, completes in steps:
+                    if completes:
+                        completion = fn(env)
+                        if completion is not None:
+                            return completion
+                    else:
+                        fn(env)
+                return None
+            return run_until_completion
+
+        if len(fns) == 1:
+            return fns[0]
+
+        if len(fns) == 2:
+            first, second = fns
+
+            def run_two(env):
+                first(env)
+                second(env)
+            return run_two
+
+        def run_all(env):
+            for fn in fns:
+                fn(env)
+        return run_all
+
+    def visitAssignExpr(self, expr: Assign):
+        value = self.compile(expr.value)
+        slot = expr.slot
+
+        if expr.depth is None:
+            values = self.globals.values
+            name = expr.name.lexeme
+            token = expr.name
+
+            def assign_global(env):
+                result = value(env)
+                if name not in values:
+                    raise RuntimeError_(token, f"Undefined variable {name}")
+                values[name] = result
+                return result
+            return assign_global
+
+        if expr.depth == 0:
+            def assign_local(env):
+                result = env.slots[slot] = value(env)
+                return result
+            return assign_local
+
+        depth = expr.depth
+
+        def assign_enclosing(env):
+            result = env.ancestor(depth).slots[slot] = value(env)
+            return result
+        return assign_enclosing
+
+    def visitBinaryExpr(self, expr: Binary):
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+        operator = expr.operator
+        typ_ = operator.tokentype
+
+        if typ_ == TokenType.PLUS:
+            def add(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a + b
+                if isinstance(a, STRINGS) and isinstance(b, STRINGS):
+                    return concat(a, b)
+                return arrayArithmetic(operator, "+", a, b, "Operands must be both numbers or both strings")
+            return add
+
+        if typ_ == TokenType.EQUAL_EQUAL:
+            return lambda env: left(env) == right(env)
+
+        if typ_ == TokenType.COMMA:
+            def comma(env):
+                left(env)
+                right(env)
+                return None
+            return comma
+
+        if typ_ == TokenType.SLASH:
+            def divide(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is not float or b.__class__ is not float:
+                    return arrayArithmetic(operator, "/", a, b, "Operands must be a number")
+                if b == 0.0:
+                    raise RuntimeError_(operator, "Divide by zero")
+                return a / b
+            return divide
+
+        #everything else takes two numbers
+        return self.numberOperation(typ_, left, right, operator)
+
+    def numberOperation(self, typ_: TokenType, left, right, operator: Token):
+        if typ_ == TokenType.MINUS:
+            def subtract(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a - b
+                return arrayArithmetic(operator, "-", a, b, "Operands must be a number")
+            return subtract
+
+        if typ_ == TokenType.STAR:
+            def multiply(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a * b
+                return arrayArithmetic(operator, "*", a, b, "Operands must be a number")
+            return multiply
+
+        if typ_ == TokenType.GREATER:
+            def greater(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a > b
+                raise RuntimeError_(operator, "Operands must be a number")
+            return greater
+
+        if typ_ == TokenType.GREATER_EQUAL:
+            def greater_equal(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a >= b
+                raise RuntimeError_(operator, "Operands must be a number")
+            return greater_equal
+
+        if typ_ == TokenType.LESS:
+            def less(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a < b
+                raise RuntimeError_(operator, "Operands must be a number")
+            return less
+
+        if typ_ == TokenType.LESS_EQUAL:
+            def less_equal(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return a <= b
+                raise RuntimeError_(operator, "Operands must be a number")
+            return less_equal
+
+        if typ_ == TokenType.BANG_EQUAL:
+            def not_equal(env):
+                a = left(env)
+                b = right(env)
+                if a.__class__ is float and b.__class__ is float:
+                    return not (a == b)
+                raise RuntimeError_(operator, "Operands must be a number")
+            return not_equal
+
+        raise RuntimeError_(operator, f"Unknown operator {operator.lexeme}")
+
+    def visitCallFunctionExpr(self, expr: CallFunction):
+        callee = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        count = len(arguments)
+        paren = expr.parenLoc
+        interpreter = self.interpreter
+
+        def call(env):
+            function = callee(env)
+
+            if not isinstance(function, Callable):
+                raise RuntimeError_(paren, "Can only use call syntax on functions and classes")
+
+            #args evaluated Left to Right
+            values = [argument(env) for argument in arguments]
+
+            if function.arity() != count:
+                raise RuntimeError_(paren, f"Expected {function.arity()} arguments but got {count}")
+
+            try:
+                return function.call(interpreter, values)
+            except NativeError as e:
+                raise RuntimeError_(paren, str(e))
+        return call
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.compile(expr.expression)
+
+    def visitIndexExpr(self, expr: Index):
+        target = self.compile(expr.target)
+        index = self.compile(expr.index)
+        bracket = expr.bracket
+
+        def get_index(env):
+            array = target(env)
+            return indexGet(bracket, array, index(env))
+        return get_index
+
+    def visitSetIndexExpr(self, expr: SetIndex):
+        target = self.compile(expr.target)
+        index = self.compile(expr.index)
+        value = self.compile(expr.value)
+        bracket = expr.bracket
+
+        def set_index(env):
+            array = target(env)
+            position = index(env)
+            return indexSet(bracket, array, position, value(env))
+        return set_index
+
+    def visitLiteralExpr(self, expr: Literal):
+        value = expr.value
+        return lambda env: value
+
+    def visitLogicalExpr(self, expr: Logical):
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+
+        if expr.operator.tokentype == TokenType.OR:
+            def logic_or(env):
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+            return logic_or
+
+        def logic_and(env):
+            value = left(env)
+            if value is None or value is False:
+                return value
+            return right(env)
+        return logic_and
+
+    def visitUnaryExpr(self, expr: Unary):
+        right = self.compile(expr.right)
+        operator = expr.operator
+
+        if operator.tokentype == TokenType.MINUS:
+            def negate(env):
+                value = right(env)
+                if value.__class__ is not float:
+                    raise RuntimeError_(operator, "Operands must be a number")
+                return -value
+            return negate
+
+        def logic_not(env):
+            value = right(env)
+            return value is None or value is False
+        return logic_not
+
+    def visitVariableExpr(self, expr: Variable):
+        slot = expr.slot
+
+        if expr.depth is None:
+            values = self.globals.values
+            name = expr.name.lexeme
+            token = expr.name
+
+            def get_global(env):
+                try:
+                    return values[name]
+                except KeyError:
+                    raise RuntimeError_(token, f"Undefined variable {name}")
+            return get_global
+
+        if expr.depth == 0:
+            return lambda env: env.slots[slot]
+
+        depth = expr.depth
+        return lambda env: env.ancestor(depth).slots[slot]
+
+    def visitBlockStmt(self, stmt: Block):
+        if not stmt.statements:
+            return lambda env: None
+
+        body = self.compileStatements(stmt.statements)
+
+        if stmt.size == 0:
+            #nothing declared in here, no need for a new environment
+            return body
+
+        size = stmt.size
+
+        def block(env):
+            return body(Environment(env, size))
+        return block
+
+    def visitBreakStmt(self, stmt: Break):
+        return lambda env: BREAK
+
+    def visitContinueStmt(self, stmt: Continue):
+        return lambda env: CONTINUE
+
+    def visitExpressionStmt(self, stmt: Expression):
+        return self.compile(stmt.expression)
+
+    def visitFunctionStmt(self, stmt: Function):
+        if stmt.body:
+            body = self.compileStatements(stmt.body)
+        else:
+            body = lambda env: None
+
+        function = ClosureFunction(stmt.name.lexeme, len(stmt.params), stmt.size, body)
+        return self.define(stmt.slot, stmt.name.lexeme, lambda env: function)
+
+    def visitIfStmt(self, stmt: If):
+        condition = self.compile(stmt.condition)
+
+        if self.completes(stmt):
+            return self.completingIf(stmt, condition)
+
+        then_branch = self.compile(stmt.thenBranch)
+
+        if stmt.elseBranch is None:
+            def if_then(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    then_branch(env)
+            return if_then
+
+        else_branch = self.compile(stmt.elseBranch)
+
+        def if_then_else(env):
+            value = condition(env)
+            if value is not None and value is not False:
+                then_branch(env)
+            else:
+                else_branch(env)
+        return if_then_else
+
+    def completingIf(self, stmt: If, condition):
+        '''
+            If statement passing on the Completion of the branch that ran
+        '''
+        branches = []
+        for branch in [stmt.thenBranch, stmt.elseBranch]:
+            if branch is None:
+                branches.append(lambda env: None)
+            elif self.completes(branch):
+                branches.append(self.compile(branch))
+            else:
+                branches.append(self.quiet(self.compile(branch)))
+
+        then_branch, else_branch = branches
+
+        def if_completing(env):
+            value = condition(env)
+            if value is not None and value is not False:
+                return then_branch(env)
+            return else_branch(env)
+        return if_completing
+
+    def visitPrintStmt(self, stmt: Print):
+        expression = self.compile(stmt.expression)
+        stringify = self.interpreter.stringify
+
+        def print_(env):
+            print(stringify(expression(env)))
+        return print_
+
+    def visitReturnStmt(self, stmt: Return):
+        interpreter = self.interpreter
+
+        if stmt.value is None:
+            def return_nil(env):
+                interpreter.return_value = None
+                return RETURN
+            return return_nil
+
+        value = self.compile(stmt.value)
+
+        def return_value(env):
+            interpreter.return_value = value(env)
+            return RETURN
+        return return_value
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            initializer = self.compile(stmt.initializer)
+        else:
+            initializer = lambda env: None
+
+        return self.define(stmt.slot, stmt.name.lexeme, initializer)
+
+    def define(self, slot: int, name: str, value):
+        if slot is None:
+            values = self.globals.values
+
+            def define_global(env):
+                values[name] = value(env)
+            return define_global
+
+        def define_local(env):
+            env.slots[slot] = value(env)
+        return define_local
+
+    def visitWhileStmt(self, stmt: While):
+        condition = self.compile(stmt.condition)
+        body = self.compile(stmt.body)
+
+        if stmt.increment is not None:
+            increment = self.compile(stmt.increment)
+        else:
+            increment = lambda env: None
+
+        if self.completes(stmt.body):
+            def completing_loop(env):
+                while True:
+                    value = condition(env)
+                    if value is None or value is False:
+                        return None
+
+                    completion = body(env)
+                    if completion is not None:
+                        if completion is BREAK:
+                            return None
+                        if completion is RETURN:
+                            return completion
+                        #CONTINUE goes on to the increment
+
+                    increment(env)
+            return completing_loop
+
+        if stmt.increment is None:
+            def loop(env):
+                while True:
+                    value = condition(env)
+                    if value is None or value is False:
+                        return
+                    body(env)
+            return loop
+
+        def counting_loop(env):
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return
+                body(env)
+                increment(env)
+        return counting_loop
+
+
+class ClosureInterpreter:
+    '''
+        Same interface as the Interpreter, so Preter can use either one
+    '''
+    def __init__(self, error_handler: ErrorHandler):
+        self.error_handler = error_handler
+        self.globals = Environment()
+
+        #value of the 'return' that's unwinding to its function call
+        self.return_value = None
+
+        defineNatives(self.globals)
+
+    def interpret(self, statements: List[Stmt]):
+        compiler = ClosureCompiler(self)
+        program = [compiler.compile(statement) for statement in statements]
+
+        try:
+            for statement in program:
+                statement(self.globals)
+        except RuntimeError_ as e:
+            self.error_handler.runtimeError(e)
+
+    def stringify(self, thing):
+        if thing is None:
+            return "nil"
+        else:
+            return str(thing)
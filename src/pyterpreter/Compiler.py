@@ -0,0 +1,283 @@
+from typing import List
+
+from Expr import *
+from Stmt import *
+from Visitor import *
+from TokenType import *
+from Chunk import OpCode, Chunk
+from VMFunction import VMFunction
+
+class LoopContext:
+    '''
+        A loop being compiled, collects the jumps of its break/continue statements
+    '''
+    def __init__(self, env_depth: int):
+        #environments pushed when the loop started, the rest get popped before jumping out
+        self.env_depth = env_depth
+        self.breaks = []
+        self.continues = []
+
+
+class Compiler(Visitor):
+    '''
+        Compiles resolved Expr/Stmt trees to bytecode for the VM.
+
+        Expressions leave exactly one value on the stack, statements leave nothing
+    '''
+    binary_ops = {
+        TokenType.PLUS: OpCode.ADD,
+        TokenType.MINUS: OpCode.SUBTRACT,
+        TokenType.STAR: OpCode.MULTIPLY,
+        TokenType.SLASH: OpCode.DIVIDE,
+        TokenType.GREATER: OpCode.GREATER,
+        TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+        TokenType.LESS: OpCode.LESS,
+        TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+        TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+        TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+        TokenType.COMMA: OpCode.COMMA,
+    }
+
+    def __init__(self, name: str="<script>"):
+        self.chunk = Chunk(name)
+
+        #innermost loop last
+        self.loops = []
+        #environments pushed by the blocks around the current statement
+        self.env_depth = 0
+
+    def compile(self, statements: List[Stmt]) -> Chunk:
+        '''
+            Compile a program or a function body, ending in a RETURN of nil
+        '''
+        for statement in statements:
+            self.compileStatement(statement)
+
+        self.chunk.emit(OpCode.CONSTANT, self.chunk.addConstant(None))
+        self.chunk.emit(OpCode.RETURN)
+        return self.chunk
+
+    def compileStatement(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def compileDiscarded(self, expr: Expr):
+        '''
+            Compile an expression whose value isn't used
+        '''
+        if not isinstance(expr, Assign):
+            self.compileExpression(expr)
+            self.chunk.emit(OpCode.POP)
+            return
+
+        self.compileExpression(expr.value)
+
+        if expr.depth is None:
+            self.chunk.emit(OpCode.STORE_GLOBAL, self.chunk.addConstant(expr.name.lexeme), expr.name)
+        elif expr.depth == 0:
+            self.chunk.emit(OpCode.STORE_LOCAL, expr.slot)
+        else:
+            self.chunk.emit(OpCode.STORE_ENCLOSING, self.chunk.addConstant((expr.depth, expr.slot)))
+
+    def compileExpression(self, expr: Expr):
+        expr.accept(self)
+
+    def emitJump(self, op: int) -> int:
+        return self.chunk.emit(op, -1)
+
+    def patchJump(self, position: int):
+        self.chunk.patch(position, len(self.chunk.code))
+
+    def emitDefine(self, slot: int, name: Token):
+        if slot is None:
+            self.chunk.emit(OpCode.DEFINE_GLOBAL, self.chunk.addConstant(name.lexeme), name)
+        else:
+            self.chunk.emit(OpCode.DEFINE_LOCAL, slot)
+
+    def visitAssignExpr(self, expr: Assign):
+        self.compileExpression(expr.value)
+
+        if expr.depth is None:
+            self.chunk.emit(OpCode.SET_GLOBAL, self.chunk.addConstant(expr.name.lexeme), expr.name)
+        elif expr.depth == 0:
+            self.chunk.emit(OpCode.SET_LOCAL, expr.slot)
+        else:
+            self.chunk.emit(OpCode.SET_ENCLOSING, self.chunk.addConstant((expr.depth, expr.slot)))
+
+    def visitBinaryExpr(self, expr: Binary):
+        self.compileExpression(expr.left)
+
+        if isinstance(expr.right, Literal):
+            #right operand straight from the constants
+            self.chunk.emit(self.binary_ops[expr.operator.tokentype], self.chunk.addConstant(expr.right.value) + 1, expr.operator)
+            return
+
+        self.compileExpression(expr.right)
+        self.chunk.emit(self.binary_ops[expr.operator.tokentype], 0, expr.operator)
+
+    def visitCallFunctionExpr(self, expr: CallFunction):
+        callee = expr.callee
+
+        if all(self.isInert(argument) for argument in expr.arguments):
+            #nothing runs between the callee and CALL, which checks it just the same
+            self.compileExpression(callee)
+        elif isinstance(callee, Variable) and callee.depth is None:
+            #the usual call to a global function, looked up and checked in one instruction
+            self.chunk.emit(OpCode.GET_CALLEE, self.chunk.addConstant((callee.name.lexeme, expr.parenLoc)), callee.name)
+        else:
+            self.compileExpression(callee)
+            self.chunk.emit(OpCode.CHECK_CALLABLE, 0, expr.parenLoc)
+
+        for argument in expr.arguments:
+            self.compileExpression(argument)
+
+        self.chunk.emit(OpCode.CALL, len(expr.arguments), expr.parenLoc)
+
+    def isInert(self, expr: Expr) -> bool:
+        '''
+            Whether evaluating 'expr' can neither raise nor have side effects
+        '''
+        return isinstance(expr, Literal) or (isinstance(expr, Variable) and expr.depth is not None)
+
+    def visitGroupingExpr(self, expr: Grouping):
+        self.compileExpression(expr.expression)
+
+    def visitIndexExpr(self, expr: Index):
+        self.compileExpression(expr.target)
+        self.compileExpression(expr.index)
+        self.chunk.emit(OpCode.GET_INDEX, 0, expr.bracket)
+
+    def visitLiteralExpr(self, expr: Literal):
+        self.chunk.emit(OpCode.CONSTANT, self.chunk.addConstant(expr.value))
+
+    def visitLogicalExpr(self, expr: Logical):
+        self.compileExpression(expr.left)
+
+        if expr.operator.tokentype == TokenType.OR:
+            jump = self.emitJump(OpCode.JUMP_IF_TRUE_OR_POP)
+        else:
+            jump = self.emitJump(OpCode.JUMP_IF_FALSE_OR_POP)
+
+        self.compileExpression(expr.right)
+        self.patchJump(jump)
+
+    def visitSetIndexExpr(self, expr: SetIndex):
+        self.compileExpression(expr.target)
+        self.compileExpression(expr.index)
+        self.compileExpression(expr.value)
+        self.chunk.emit(OpCode.SET_INDEX, 0, expr.bracket)
+
+    def visitUnaryExpr(self, expr: Unary):
+        self.compileExpression(expr.right)
+
+        if expr.operator.tokentype == TokenType.MINUS:
+            self.chunk.emit(OpCode.NEGATE, 0, expr.operator)
+        else:
+            self.chunk.emit(OpCode.NOT, 0, expr.operator)
+
+    def visitVariableExpr(self, expr: Variable):
+        if expr.depth is None:
+            self.chunk.emit(OpCode.GET_GLOBAL, self.chunk.addConstant(expr.name.lexeme), expr.name)
+        elif expr.depth == 0:
+            self.chunk.emit(OpCode.GET_LOCAL, expr.slot)
+        else:
+            self.chunk.emit(OpCode.GET_ENCLOSING, self.chunk.addConstant((expr.depth, expr.slot)))
+
+    def visitBlockStmt(self, stmt: Block):
+        if stmt.size == 0:
+            for statement in stmt.statements:
+                self.compileStatement(statement)
+            return
+
+        self.chunk.emit(OpCode.PUSH_ENV, stmt.size)
+        self.env_depth += 1
+
+        for statement in stmt.statements:
+            self.compileStatement(statement)
+
+        self.env_depth -= 1
+        self.chunk.emit(OpCode.POP_ENV)
+
+    def emitLoopExit(self) -> int:
+        '''
+            Pop the environments of the blocks inside the innermost loop, returns the jump to patch
+        '''
+        for _ in range(self.env_depth - self.loops[-1].env_depth):
+            self.chunk.emit(OpCode.POP_ENV)
+
+        return self.emitJump(OpCode.JUMP)
+
+    def visitBreakStmt(self, stmt: Break):
+        self.loops[-1].breaks.append(self.emitLoopExit())
+
+    def visitContinueStmt(self, stmt: Continue):
+        self.loops[-1].continues.append(self.emitLoopExit())
+
+    def visitExpressionStmt(self, stmt: Expression):
+        self.compileDiscarded(stmt.expression)
+
+    def visitFunctionStmt(self, stmt: Function):
+        chunk = Compiler(stmt.name.lexeme).compile(stmt.body)
+        function = VMFunction(stmt.name.lexeme, len(stmt.params), stmt.size, chunk)
+
+        #functions only close over the globals, so one object per declaration is enough
+        self.chunk.emit(OpCode.CONSTANT, self.chunk.addConstant(function))
+        self.emitDefine(stmt.slot, stmt.name)
+
+    def visitIfStmt(self, stmt: If):
+        self.compileExpression(stmt.condition)
+        else_jump = self.emitJump(OpCode.JUMP_IF_FALSE)
+
+        self.compileStatement(stmt.thenBranch)
+
+        if stmt.elseBranch is None:
+            self.patchJump(else_jump)
+            return
+
+        end_jump = self.emitJump(OpCode.JUMP)
+        self.patchJump(else_jump)
+        self.compileStatement(stmt.elseBranch)
+        self.patchJump(end_jump)
+
+    def visitPrintStmt(self, stmt: Print):
+        self.compileExpression(stmt.expression)
+        self.chunk.emit(OpCode.PRINT)
+
+    def visitReturnStmt(self, stmt: Return):
+        #RETURN goes back to the caller's environment, whatever blocks we're in
+        if stmt.value is not None:
+            self.compileExpression(stmt.value)
+        else:
+            self.chunk.emit(OpCode.CONSTANT, self.chunk.addConstant(None))
+
+        self.chunk.emit(OpCode.RETURN)
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            self.compileExpression(stmt.initializer)
+        else:
+            self.chunk.emit(OpCode.CONSTANT, self.chunk.addConstant(None))
+
+        self.emitDefine(stmt.slot, stmt.name)
+
+    def visitWhileStmt(self, stmt: While):
+        #condition goes after the body, so each iteration only needs one jump
+        condition_jump = self.emitJump(OpCode.JUMP)
+
+        body_start = len(self.chunk.code)
+        loop = LoopContext(self.env_depth)
+        self.loops.append(loop)
+        self.compileStatement(stmt.body)
+        self.loops.pop()
+
+        for jump in loop.continues:
+            self.patchJump(jump)
+
+        if stmt.increment is not None:
+            self.compileDiscarded(stmt.increment)
+
+        self.patchJump(condition_jump)
+        self.compileExpression(stmt.condition)
+        self.chunk.emit(OpCode.JUMP_IF_TRUE, body_start)
+
+        for jump in loop.breaks:
+            self.patchJump(jump)
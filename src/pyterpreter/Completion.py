@@ -0,0 +1,22 @@
+'''
+    Completion signals for 'return', 'break' and 'continue'.
+
+    Statements normally complete with None. These are returned instead, and passed back
+    up from statement to statement until the loop or function call they belong to,
+    so unwinding doesn't need a Python exception. The value of a 'return' is left
+    in the interpreter's 'return_value'
+'''
+
+class Completion:
+    __slots__ = ("kind",)
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def __repr__(self):
+        return f"<Completion {self.kind}>"
+
+
+BREAK = Completion("break")
+CONTINUE = Completion("continue")
+RETURN = Completion("return")
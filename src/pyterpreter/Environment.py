@@ -1,9 +1,33 @@
 from RuntimeError_ import *
 from Token import Token
+from Rope import Rope
+
+#values a global can be assigned to and from without invalidating inline caches, none are callable.
+#Rope is what s = s + "..." leaves behind
+PLAIN_VALUES = frozenset((float, str, bool, type(None), Rope))
 
 class Environment:
-    def __init__(self, enclosing=None):
-        self.values = {}
+    '''
+        The global environment keeps its variables in a dict, since globals can be
+        defined at any time (REPL, functions referring to later declarations).
+
+        Local environments are fixed-size slot arrays. The Resolver gives every local
+        variable a (depth, slot) pair, so reading one is a few hops up the chain and
+        a list index, no hashing involved
+
+        'version' is shared by all environments, and bumped whenever a global binding
+        is (re)defined or assigned to or from something that isn't a plain value. Call
+        sites cache their callee along with the version, a changed version means the
+        callee has to be looked up again
+    '''
+    version = 0
+
+    #every block and call that declares something makes one of these
+    __slots__ = ("values", "slots", "enclosing")
+
+    def __init__(self, enclosing=None, size=0):
+        self.values = {} if enclosing is None else None
+        self.slots = [None] * size
         self.enclosing = enclosing
 
 
@@ -14,6 +38,7 @@ class Environment:
             if variable exists, redefine it
         '''
         self.values[name] = value
+        Environment.version += 1
 
     def get(self, name: Token):
         '''
@@ -21,23 +46,51 @@ class Environment:
 
             we're checking for the variable's existence at runtime
         '''
-        if name.lexeme in self.values:
+        if self.values is not None and name.lexeme in self.values:
             return self.values[name.lexeme]
 
         #look in higher up scopes
         elif self.enclosing is not None:
             return self.enclosing.get(name)
-        
+
         else:
             raise RuntimeError_(name, f"Undefined variable {name.lexeme}")
 
     def assign(self, name: Token, value: object):
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
+        values = self.values
+
+        if values is not None and name.lexeme in values:
+            #a global counter going up in a loop shouldn't invalidate every call site
+            if value.__class__ not in PLAIN_VALUES or values[name.lexeme].__class__ not in PLAIN_VALUES:
+                Environment.version += 1
+
+            values[name.lexeme] = value
 
         elif self.enclosing is not None:
             self.enclosing.assign(name, value)
             return
-        
+
         else:
             raise RuntimeError_(name, f"Undefined variable {name.lexeme}")
+
+    def ancestor(self, depth: int):
+        environment = self
+        for _ in range(depth):
+            environment = environment.enclosing
+
+        return environment
+
+    def getAt(self, depth: int, slot: int):
+        '''
+            get the value of a local variable the Resolver placed 'depth' environments up
+        '''
+        if depth == 0:
+            return self.slots[slot]
+
+        return self.ancestor(depth).slots[slot]
+
+    def assignAt(self, depth: int, slot: int, value: object):
+        if depth == 0:
+            self.slots[slot] = value
+        else:
+            self.ancestor(depth).slots[slot] = value
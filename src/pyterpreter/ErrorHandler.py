@@ -24,6 +24,18 @@ class ErrorHandler:
         print(f"{error.message}\n[line {error.token.line}]")
         self.hadRuntimeError = True
 
+    def recursionError(self, runtime: bool):
+        '''
+            Python's own stack ran out: source nested too deeply to compile, or a program
+            recursing deeper than the engine can. There's no token to report it at
+        '''
+        if runtime:
+            print("Stack overflow")
+            self.hadRuntimeError = True
+        else:
+            print("Error: Too deeply nested", file=sys.stderr)
+            self.hadError = True
+
     def report(self, line: int, where: str, message: str):
         print(f"[{line}] Error{where}: {message}", file=sys.stderr)
         self.hadError = True
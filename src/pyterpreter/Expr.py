@@ -2,18 +2,26 @@ from abc import ABC, abstractmethod
 from Token import *
 
 class Expr:
-    pass
+    __slots__ = ()
 
 
 class Assign(Expr):
+    __slots__ = ("name", "value", "depth", "slot")
+    __match_args__ = ("name", "value")
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visitAssignExpr(self)
 
 class Binary(Expr):
+    __slots__ = ("left", "operator", "right")
+    __match_args__ = ("left", "operator", "right")
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -23,22 +31,46 @@ class Binary(Expr):
         return visitor.visitBinaryExpr(self)
 
 class CallFunction(Expr):
+    __slots__ = ("callee", "arguments", "parenLoc", "cachedCallee", "cacheVersion", "cachedGlobals")
+    __match_args__ = ("callee", "arguments", "parenLoc")
+
     def __init__(self, callee, arguments, parenLoc):
         self.callee = callee
         self.arguments = arguments
         self.parenLoc = parenLoc
+        self.cachedCallee = None
+        self.cacheVersion = None
+        self.cachedGlobals = None
 
     def accept(self, visitor):
         return visitor.visitCallFunctionExpr(self)
 
 class Grouping(Expr):
+    __slots__ = ("expression",)
+    __match_args__ = ("expression",)
+
     def __init__(self, expression):
         self.expression = expression
 
     def accept(self, visitor):
         return visitor.visitGroupingExpr(self)
 
+class Index(Expr):
+    __slots__ = ("target", "bracket", "index")
+    __match_args__ = ("target", "bracket", "index")
+
+    def __init__(self, target, bracket, index):
+        self.target = target
+        self.bracket = bracket
+        self.index = index
+
+    def accept(self, visitor):
+        return visitor.visitIndexExpr(self)
+
 class Literal(Expr):
+    __slots__ = ("value",)
+    __match_args__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -46,6 +78,9 @@ class Literal(Expr):
         return visitor.visitLiteralExpr(self)
 
 class Logical(Expr):
+    __slots__ = ("left", "operator", "right")
+    __match_args__ = ("left", "operator", "right")
+
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
@@ -54,7 +89,23 @@ class Logical(Expr):
     def accept(self, visitor):
         return visitor.visitLogicalExpr(self)
 
+class SetIndex(Expr):
+    __slots__ = ("target", "bracket", "index", "value")
+    __match_args__ = ("target", "bracket", "index", "value")
+
+    def __init__(self, target, bracket, index, value):
+        self.target = target
+        self.bracket = bracket
+        self.index = index
+        self.value = value
+
+    def accept(self, visitor):
+        return visitor.visitSetIndexExpr(self)
+
 class Unary(Expr):
+    __slots__ = ("operator", "right")
+    __match_args__ = ("operator", "right")
+
     def __init__(self, operator, right):
         self.operator = operator
         self.right = right
@@ -63,8 +114,115 @@ class Unary(Expr):
         return visitor.visitUnaryExpr(self)
 
 class Variable(Expr):
+    __slots__ = ("name", "depth", "slot")
+    __match_args__ = ("name",)
+
     def __init__(self, name):
         self.name = name
+        self.depth = None
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visitVariableExpr(self)
+
+class AddFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitAddFloatsExpr(self)
+
+class AddStrings(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitAddStringsExpr(self)
+
+class SubtractFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitSubtractFloatsExpr(self)
+
+class MultiplyFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitMultiplyFloatsExpr(self)
+
+class DivideFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitDivideFloatsExpr(self)
+
+class GreaterFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitGreaterFloatsExpr(self)
+
+class GreaterEqualFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitGreaterEqualFloatsExpr(self)
+
+class LessFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitLessFloatsExpr(self)
+
+class LessEqualFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitLessEqualFloatsExpr(self)
+
+class NotEqualFloats(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitNotEqualFloatsExpr(self)
+
+class Equal(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitEqualExpr(self)
+
+class PolyBinary(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitPolyBinaryExpr(self)
+
+class Negate(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitNegateExpr(self)
+
+class Not(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitNotExpr(self)
+
+class PolyUnary(Unary):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitPolyUnaryExpr(self)
+
+class And(Logical):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitAndExpr(self)
+
+class Or(Logical):
+    __slots__ = ()
+
+    def accept(self, visitor):
+        return visitor.visitOrExpr(self)
@@ -1,5 +1,6 @@
 from Callable import Callable
 from Environment import Environment
+from Completion import RETURN
 
 class FunctionCallable(Callable):
     def __init__(self, declaration):
@@ -9,13 +10,16 @@ class FunctionCallable(Callable):
         return len(self.declaration.params)
 
     def call(self, interpreter, arguments):
-        environment = Environment(enclosing=interpreter.globals)
+        environment = Environment(enclosing=interpreter.globals, size=self.declaration.size)
 
-        #bind parameter names to passed arguments
-        for param_token, arg in zip(self.declaration.params, arguments):
-            environment.define(param_token.lexeme, arg)
+        #parameters take up the first slots, in order
+        environment.slots[:len(arguments)] = arguments
+
+        if interpreter.executeBlock(self.declaration.body, environment) is RETURN:
+            value = interpreter.return_value
+            interpreter.return_value = None
+            return value
 
-        interpreter.executeBlock(self.declaration.body, environment)
         return None
 
     def __str__(self):
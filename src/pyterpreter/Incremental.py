@@ -0,0 +1,242 @@
+from typing import List
+
+from Token import *
+from Expr import *
+from Stmt import *
+from ErrorHandler import *
+from Parser import StreamingParser
+from Optimizer import Optimizer
+from Resolver import Resolver
+
+'''
+    Compiling one version of a script after another, for --watch and the REPL.
+
+    Every top level declaration is compiled on its own, scanned, parsed, optimized with -O
+    and resolved, and remembered along with the span of source text it came from. When
+    the next version comes in, the text before the first changed character and after the
+    last one is the same as last time. Declarations in those parts keep their compiled
+    statements, only the ones from the edit on are scanned and parsed again, until the
+    parser lands on the start of a declaration in the unchanged part at the end.
+
+    That works because resolving a top level declaration doesn't depend on the ones
+    around it: anything not declared inside it is a global, looked up by name at runtime
+'''
+
+#characters past the end of a token the scanners look at to decide where it ends,
+#like the digit after the '.' in '1.5'
+SCANNER_LOOKAHEAD = 2
+
+
+class Chunk:
+    '''
+        One top level declaration. Its text runs from the end of the previous one, so
+        comments and blank lines in front of it belong to it, up to the end of its last token
+    '''
+    __slots__ = ("start", "end", "lookahead_end", "end_line", "statement", "failed")
+
+    def __init__(self, start: int, end: int, lookahead_end: int, end_line: int, statement: Stmt, failed: bool):
+        self.start = start
+        self.end = end
+        #end of the token after it, the parser looked at that one to know it was done
+        self.lookahead_end = lookahead_end
+        #line of the last token, the next declaration's scanning starts on it
+        self.end_line = end_line
+        #None if there was an error, or -O removed the declaration
+        self.statement = statement
+        #had a syntax or resolve error, compiled again every time so the error gets reported
+        self.failed = failed
+
+    def moved(self, offset: int, lines: int) -> "Chunk":
+        return Chunk(self.start + offset, self.end + offset, self.lookahead_end + offset, self.end_line + lines,
+                     self.statement, self.failed)
+
+
+class SpanParser(StreamingParser):
+    '''
+        StreamingParser that knows where in the source the previous token ended
+    '''
+    def __init__(self, scanner, error_handler: ErrorHandler):
+        self.scanner = scanner
+        super().__init__(scanner.iterTokens(), error_handler)
+
+        #iterTokens() leaves _current just past the token it stopped at, which is _peek
+        self.peek_end = scanner._current
+        self.previous_end = 0
+
+    def advance(self) -> Token:
+        if not self.isAtEnd():
+            self._previous = self._peek
+            self.previous_end = self.peek_end
+            self._peek = next(self.token_iter)
+            self.peek_end = self.scanner._current
+
+        return self._previous
+
+
+def commonPrefix(a: str, b: str) -> int:
+    #binary search on slices, so the comparing happens in C
+    low, high = 0, min(len(a), len(b))
+
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+
+def commonSuffix(a: str, b: str, limit: int) -> int:
+    low, high = 0, limit
+
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+
+def shiftLines(statement: Stmt, lines: int):
+    '''
+        Move every token in 'statement' down by 'lines', for a declaration that has moved
+        in the source. Goes through the fields the parser fills in, like __match_args__
+        says, with a stack instead of recursion. Tokens can be shared between nodes, like
+        the name of an Assign, those only get moved once
+    '''
+    seen = set()
+    stack = [statement]
+
+    while stack:
+        node = stack.pop()
+
+        if node.__class__ is list:
+            stack.extend(node)
+        elif node.__class__ is Token:
+            if id(node) not in seen:
+                seen.add(id(node))
+                node.line += lines
+        elif isinstance(node, (Expr, Stmt)):
+            stack.extend(getattr(node, field) for field in node.__match_args__)
+
+
+class IncrementalCompiler:
+    '''
+        Compiles each version of a script passed to compile(), reusing what it can from
+        the version before. 'compiled' and 'reused' count the declarations of the last
+        compile() that were compiled again and that were kept
+    '''
+    def __init__(self, scanner_class, error_handler: ErrorHandler, optimize: bool=False):
+        self.scanner_class = scanner_class
+        self.error_handler = error_handler
+        self.optimize = optimize
+
+        self.source = ""
+        self.chunks = []
+        #a scanning error before the first declaration, or in a script without any
+        self.failed_start = False
+
+        self.compiled = 0
+        self.reused = 0
+
+    def compile(self, source: str) -> List[Stmt]:
+        '''
+            Like Preter.compile(): the statements ready for an engine, or None if there were errors
+        '''
+        old_source, old_chunks = self.source, self.chunks
+
+        prefix = commonPrefix(old_source, source)
+        suffix = commonSuffix(old_source, source, min(len(old_source), len(source)) - prefix)
+
+        #declarations before the edit are kept, if the edit didn't change the token after
+        #them either. Something like an 'else' there would have made it part of them
+        keep = 0
+        while (keep < len(old_chunks) and not old_chunks[keep].failed
+               and old_chunks[keep].lookahead_end + SCANNER_LOOKAHEAD <= prefix):
+            keep += 1
+
+        chunks = old_chunks[:keep]
+        start = chunks[-1].end if chunks else 0
+
+        #old start offset -> index, for the declarations after the edit that can be picked
+        #up again. Not from before a failed one, that has to report its error again
+        offset = len(source) - len(old_source)
+        clean = max([i + 1 for i, chunk in enumerate(old_chunks) if chunk.failed], default=0)
+        resumable = {
+            old_chunks[i].start: i
+            for i in range(max(keep, clean), len(old_chunks))
+            if old_chunks[i].start >= len(old_source) - suffix and not self.failed_start
+        }
+
+        #errors are noticed per declaration, hadError stays set if it already was
+        had_error = self.error_handler.hadError
+        self.error_handler.hadError = False
+
+        #reads the first token, which can already be an error
+        scanner = self.scanner_class(source[start:], self.error_handler)
+        scanner._line = chunks[-1].end_line if chunks else 1
+        parser = SpanParser(scanner, self.error_handler)
+        resolver = Resolver(self.error_handler)
+
+        self.reused = keep
+        self.compiled = 0
+        position = start
+
+        while not parser.isAtEnd():
+            resume = resumable.get(position - offset)
+
+            if resume is not None:
+                lines = source.count('\n') - old_source.count('\n')
+
+                for chunk in old_chunks[resume:]:
+                    if lines != 0 and chunk.statement is not None:
+                        shiftLines(chunk.statement, lines)
+                    chunks.append(chunk.moved(offset, lines))
+
+                self.reused += len(old_chunks) - resume
+                break
+
+            chunks.append(self.compileDeclaration(parser, resolver, start))
+            position = chunks[-1].end
+            self.compiled += 1
+
+        #only left set if there was no declaration to blame it on
+        self.failed_start = self.error_handler.hadError
+        failed = self.failed_start or any(chunk.failed for chunk in chunks)
+        self.error_handler.hadError = had_error or failed
+
+        self.source, self.chunks = source, chunks
+
+        if failed:
+            return None
+
+        return [chunk.statement for chunk in chunks if chunk.statement is not None]
+
+    def compileDeclaration(self, parser: SpanParser, resolver: Resolver, start: int) -> Chunk:
+        '''
+            Parse, optimize and resolve the next declaration. 'start' is where the text the
+            parser is reading starts in the whole source. hadError is left clear
+        '''
+        chunk_start = start + parser.previous_end
+        statement = parser.declaration()
+
+        #a syntax error inside a block leaves a None in its statements, like Preter.compile()
+        #nothing more gets done with it
+        if self.error_handler.hadError:
+            statement = None
+
+        if statement is not None and self.optimize:
+            statement = Optimizer().optimizeStatement(statement)
+
+        if statement is not None:
+            resolver.resolve([statement])
+
+        failed = self.error_handler.hadError
+        self.error_handler.hadError = False
+
+        previous = parser.previous()
+        return Chunk(chunk_start, start + parser.previous_end, start + parser.peek_end,
+                     previous.line if previous else 1, None if failed else statement, failed)
@@ -1,5 +1,5 @@
 from typing import List
-from time import time
+from operator import lt, le, gt, ge
 
 from Expr import *
 from Stmt import *
@@ -10,6 +10,43 @@ from RuntimeError_ import *
 from Environment import *
 from Callable import Callable
 from FunctionCallable import FunctionCallable
+from Natives import defineNatives, NativeError, arrayArithmetic, indexGet, indexSet
+from NumArray import NumArray
+from Rope import Rope, STRINGS, concat
+from Completion import *
+
+#(operator, left class, right class) -> the form a Binary that saw those gets rewritten into
+BINARY_FORMS = {
+    (TokenType.PLUS, float, float): AddFloats,
+    (TokenType.MINUS, float, float): SubtractFloats,
+    (TokenType.STAR, float, float): MultiplyFloats,
+    (TokenType.SLASH, float, float): DivideFloats,
+    (TokenType.GREATER, float, float): GreaterFloats,
+    (TokenType.GREATER_EQUAL, float, float): GreaterEqualFloats,
+    (TokenType.LESS, float, float): LessFloats,
+    (TokenType.LESS_EQUAL, float, float): LessEqualFloats,
+    (TokenType.BANG_EQUAL, float, float): NotEqualFloats,
+}
+
+for left_class in STRINGS:
+    for right_class in STRINGS:
+        BINARY_FORMS[(TokenType.PLUS, left_class, right_class)] = AddStrings
+
+#condition of a loop the Resolver marked counted -> the comparison on two floats
+COUNTED_COMPARISONS = {
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge,
+}
+
+#operator -> form, for operators that don't care what their operands are
+OPERATOR_FORMS = {
+    TokenType.EQUAL_EQUAL: Equal,
+    TokenType.BANG: Not,
+    TokenType.AND: And,
+    TokenType.OR: Or,
+}
 
 class Interpreter(Visitor):
     def __init__(self, error_handler: ErrorHandler):
@@ -17,44 +54,47 @@ class Interpreter(Visitor):
         self.globals = Environment()
         self.environment = self.globals
 
-        class Clock(Callable):
-            def __init__(self):
-                super().__init__()
-                self.start_t = time()
+        #value of the 'return' that's unwinding to its function call
+        self.return_value = None
 
-            def arity(self):
-                return 0;
-
-            def call(self, interpreter, arguments):
-                #time passed since start of interpreter
-                return time() - self.start_t
-
-            def __str__(self):
-                return f"<Native Function 'clock'>"
-
-        self.globals.define("clock", Clock())
+        defineNatives(self.globals)
 
     def visitBinaryExpr(self, expr: Binary):
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
 
+        if expr.__class__ is Binary:
+            self.quickenBinary(expr, left, right)
+
+        return self.binaryOperation(expr, left, right)
+
+    def binaryOperation(self, expr: Binary, left, right):
+        '''
+            'left operator right' for any operands, raises RuntimeError_ for the wrong ones
+        '''
         typ_ = expr.operator.tokentype
 
         if typ_ == TokenType.MINUS:
+            if left.__class__ is NumArray or right.__class__ is NumArray:
+                return arrayArithmetic(expr.operator, "-", left, right, "Operands must be a number")
+
             self.checkNumberOperands(expr.operator, left, right)
             return float(left) - float(right)
         
         elif typ_ == TokenType.PLUS:
-            if isinstance(left, str) and isinstance(right, str):
-                return str(left) + str(right)
+            if isinstance(left, STRINGS) and isinstance(right, STRINGS):
+                return concat(left, right)
             
             elif isinstance(left, float) and isinstance(right, float):
                 return float(left) + float(right)
             
             else:
-                raise RuntimeError_(expr.operator, "Operands must be both numbers or both strings")
+                return arrayArithmetic(expr.operator, "+", left, right, "Operands must be both numbers or both strings")
         
         elif typ_ == TokenType.SLASH:
+            if left.__class__ is NumArray or right.__class__ is NumArray:
+                return arrayArithmetic(expr.operator, "/", left, right, "Operands must be a number")
+
             #TODO: Check Values? IEEE 754 rules?
             self.checkNumberOperands(expr.operator, left, right)
             
@@ -64,6 +104,9 @@ class Interpreter(Visitor):
             return float(left) / float(right)
 
         elif typ_ == TokenType.STAR:
+            if left.__class__ is NumArray or right.__class__ is NumArray:
+                return arrayArithmetic(expr.operator, "*", left, right, "Operands must be a number")
+
             self.checkNumberOperands(expr.operator, left, right)
             return float(left) * float(right)
         
@@ -90,15 +133,135 @@ class Interpreter(Visitor):
         elif typ_ == TokenType.EQUAL_EQUAL:
             return left == right
 
+    def quickenBinary(self, expr: Binary, left, right):
+        '''
+            Rewrite a Binary that just ran into the form for its operator and the operand
+            classes it saw. Those skip the operator dispatch and check their operands with
+            one guard, going back to binaryOperation() as a PolyBinary when it fails
+        '''
+        typ_ = expr.operator.tokentype
+        form = OPERATOR_FORMS.get(typ_) or BINARY_FORMS.get((typ_, left.__class__, right.__class__), PolyBinary)
+        expr.__class__ = form
+
+    def deoptimize(self, expr: Binary, left, right):
+        expr.__class__ = PolyBinary
+        return self.binaryOperation(expr, left, right)
+
+    def visitAddFloatsExpr(self, expr: AddFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left + right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitAddStringsExpr(self, expr: AddStrings):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if (left.__class__ is str or left.__class__ is Rope) and (right.__class__ is str or right.__class__ is Rope):
+            return concat(left, right)
+
+        return self.deoptimize(expr, left, right)
+
+    def visitSubtractFloatsExpr(self, expr: SubtractFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left - right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitMultiplyFloatsExpr(self, expr: MultiplyFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left * right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitDivideFloatsExpr(self, expr: DivideFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float and right != 0.0:
+            return left / right
+
+        #binaryOperation() raises the divide by zero
+        return self.deoptimize(expr, left, right)
+
+    def visitGreaterFloatsExpr(self, expr: GreaterFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left > right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitGreaterEqualFloatsExpr(self, expr: GreaterEqualFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left >= right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitLessFloatsExpr(self, expr: LessFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left < right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitLessEqualFloatsExpr(self, expr: LessEqualFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left <= right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitNotEqualFloatsExpr(self, expr: NotEqualFloats):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        if left.__class__ is float and right.__class__ is float:
+            return left != right
+
+        return self.deoptimize(expr, left, right)
+
+    def visitEqualExpr(self, expr: Equal):
+        return self.evaluate(expr.left) == self.evaluate(expr.right)
+
 
     def visitGroupingExpr(self, expr: Grouping):
         return self.evaluate(expr.expression)
 
+    def visitIndexExpr(self, expr: Index):
+        target = self.evaluate(expr.target)
+        return indexGet(expr.bracket, target, self.evaluate(expr.index))
+
+    def visitSetIndexExpr(self, expr: SetIndex):
+        target = self.evaluate(expr.target)
+        index = self.evaluate(expr.index)
+        return indexSet(expr.bracket, target, index, self.evaluate(expr.value))
+
     def visitLiteralExpr(self, expr: Literal):
         return expr.value
 
     def visitLogicalExpr(self, expr: Logical):
         '''evaluates and/or expressions, with short circuiting'''
+        if expr.__class__ is Logical:
+            expr.__class__ = OPERATOR_FORMS[expr.operator.tokentype]
+
         left = self.evaluate(expr.left)
 
         if expr.operator.tokentype == TokenType.OR:
@@ -111,42 +274,130 @@ class Interpreter(Visitor):
 
         return self.evaluate(expr.right)
 
+    def visitAndExpr(self, expr: And):
+        left = self.evaluate(expr.left)
+
+        if left is None or left is False:
+            return left
+
+        return self.evaluate(expr.right)
+
+    def visitOrExpr(self, expr: Or):
+        left = self.evaluate(expr.left)
+
+        if left is None or left is False:
+            return self.evaluate(expr.right)
+
+        return left
+
     def visitUnaryExpr(self, expr: Unary):
         right = self.evaluate(expr.right)
 
-        if expr.operator == TokenType.MINUS:
-            self.checkNumberOperand(expr.operator, right)
+        if expr.__class__ is Unary:
+            #like quickenBinary()
+            if expr.operator.tokentype == TokenType.MINUS and right.__class__ is float:
+                expr.__class__ = Negate
+            else:
+                expr.__class__ = OPERATOR_FORMS.get(expr.operator.tokentype, PolyUnary)
+
+        if expr.operator.tokentype == TokenType.MINUS:
+            self.checkNumberOperands(expr.operator, right)
             return -float(right)
 
-        if expr.operator == TokenType.BANG:
+        if expr.operator.tokentype == TokenType.BANG:
             #TODO: type checks for this?
             return not self.truthyness(right)
 
         #Something's wrong/Unreachable
         return None
 
+    def visitNegateExpr(self, expr: Negate):
+        right = self.evaluate(expr.right)
+
+        if right.__class__ is float:
+            return -right
+
+        #anything but a number is an error for '-'
+        expr.__class__ = PolyUnary
+        self.checkNumberOperands(expr.operator, right)
+
+    def visitNotExpr(self, expr: Not):
+        right = self.evaluate(expr.right)
+        return right is None or right is False
+
     def visitAssignExpr(self, expr: Assign):
         value = self.evaluate(expr.value)
-        self.environment.assign(expr.name, value)
+
+        if expr.depth is None:
+            self.globals.assign(expr.name, value)
+        else:
+            self.environment.assignAt(expr.depth, expr.slot, value)
+
         return value
 
     def visitCallFunctionExpr(self, expr: CallFunction):
+        #inline cache: a call to a global that hasn't been rebound since the last call here
+        #skips the lookup and the checks, the callee was already found to take these arguments.
+        #The statements can be shared between interpreters, the cache only holds for the globals it was filled from
+        if expr.cacheVersion == Environment.version and expr.cachedGlobals is self.globals:
+            callee = expr.cachedCallee
+            arguments = list(map(self.evaluate, expr.arguments))
+        else:
+            callee, arguments = self.lookupCall(expr)
+
+        try:
+            return callee.call(self, arguments)
+        except NativeError as e:
+            raise RuntimeError_(expr.parenLoc, str(e))
+
+    def lookupCall(self, expr: CallFunction) -> tuple:
+        '''
+            The callee and arguments of a call the inline cache had nothing for, checked and
+            cached where they can be. Subclasses hook in here to see the cache misses
+        '''
+        #taken before anything runs, the arguments could rebind the callee
+        version = Environment.version
         callee = self.evaluate(expr.callee)
 
         if not isinstance(callee, Callable):
-            raise RuntimeError_(expr.paren, "Can only use call syntax on functions and classes")
+            raise RuntimeError_(expr.parenLoc, "Can only use call syntax on functions and classes")
 
         #args evaluated Left to Right
         arguments = [self.evaluate(arg) for arg in expr.arguments]
 
         if callee.arity() != len(arguments):
-            raise RuntimeError(expr.parenLoc, f"Expected {callee.arity()} arguments but got {len(arguments)}")
+            raise RuntimeError_(expr.parenLoc, f"Expected {callee.arity()} arguments but got {len(arguments)}")
 
-        return callee.call(self, arguments)
+        self.cacheCallee(expr, callee, version)
+        return callee, arguments
+
+    def cacheCallee(self, expr: CallFunction, callee: Callable, version: int):
+        '''
+            Fill the inline cache of a call site. Only calls to a global by name get cached,
+            looking one up has no side effects and Environment.version tracks its binding
+            in this interpreter's globals
+        '''
+        if expr.callee.__class__ is Variable and expr.callee.depth is None:
+            expr.cachedCallee = callee
+            expr.cacheVersion = version
+            expr.cachedGlobals = self.globals
 
     def visitBlockStmt(self, stmt: Stmt):
-        self.executeBlock(stmt.statements, Environment(enclosing=self.environment))
-        return None
+        if stmt.size == 0:
+            #nothing declared in here, no need for a new environment
+            for statement in stmt.statements:
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+            return None
+
+        return self.executeBlock(stmt.statements, Environment(enclosing=self.environment, size=stmt.size))
+
+    def visitBreakStmt(self, stmt: Break):
+        return BREAK
+
+    def visitContinueStmt(self, stmt: Continue):
+        return CONTINUE
 
     def visitExpressionStmt(self, stmt: Stmt):
         self.evaluate(stmt.expression)
@@ -154,16 +405,16 @@ class Interpreter(Visitor):
 
     def visitFunctionStmt(self, stmt: Function):
         function = FunctionCallable(stmt)
-        self.environment.define(stmt.name.lexeme, function)
+        self.declare(stmt.slot, stmt.name.lexeme, function)
         return None
 
     def visitIfStmt(self, stmt: Stmt):
         #Using if statements to evaluate if statement HAH
         if self.truthyness(self.evaluate(stmt.condition)):
-            self.execute(stmt.thenBranch)
+            return self.execute(stmt.thenBranch)
         
         elif stmt.elseBranch is not None:
-            self.execute(stmt.elseBranch)
+            return self.execute(stmt.elseBranch)
 
         else:
             return None
@@ -173,6 +424,10 @@ class Interpreter(Visitor):
         print(self.stringify(value))
         return None
 
+    def visitReturnStmt(self, stmt: Return):
+        self.return_value = None if stmt.value is None else self.evaluate(stmt.value)
+        return RETURN
+
     def visitVarStmt(self, stmt: Var):
         value = None
         
@@ -181,17 +436,92 @@ class Interpreter(Visitor):
 
         #variable initializes to 'null' by default
         #TODO: maybe change this to give an error for undefined vars
-        self.environment.define(stmt.name.lexeme, value)
+        self.declare(stmt.slot, stmt.name.lexeme, value)
         return None
 
     def visitWhileStmt(self, stmt: Stmt):
+        if stmt.counted:
+            return self.countedLoop(stmt)
+
+        return self.whileLoop(stmt)
+
+    def whileLoop(self, stmt: While):
         while self.truthyness(self.evaluate(stmt.condition)):
-            self.execute(stmt.body)
+            completion = self.execute(stmt.body)
+
+            if completion is not None:
+                if completion is BREAK:
+                    break
+                if completion is RETURN:
+                    return completion
+                #CONTINUE goes on to the increment
+
+            if stmt.increment is not None:
+                self.evaluate(stmt.increment)
         
         return None
 
+    def countedLoop(self, stmt: While):
+        '''
+            A loop like 'i < bound; i = i + step' that can't change i, bound or step in its
+            body, run as a Python loop over i. The condition and increment nodes aren't
+            evaluated, and a body block gets one Environment for all iterations instead of
+            one each. Goes back to whileLoop() unless i, bound and step are all numbers
+        '''
+        condition, step_expr = stmt.condition, stmt.increment.value
+        counter = condition.left
+
+        slots = self.environment.ancestor(counter.depth).slots
+        value = slots[counter.slot]
+        bound = self.evaluate(condition.right)
+        step = self.evaluate(step_expr.right)
+
+        if value.__class__ is not float or bound.__class__ is not float or step.__class__ is not float:
+            return self.whileLoop(stmt)
+
+        if step_expr.operator.tokentype == TokenType.MINUS:
+            step = -step
+
+        compare = COUNTED_COMPARISONS[condition.operator.tokentype]
+        body = stmt.body
+
+        #functions only close over the globals, so nothing can hold on to the body's
+        #environment after an iteration and the next one can reuse it
+        environment = None
+        if body.__class__ is Block and body.size != 0:
+            environment = Environment(enclosing=self.environment, size=body.size)
+
+        while compare(value, bound):
+            if environment is None:
+                completion = self.execute(body)
+            else:
+                completion = self.executeBlock(body.statements, environment)
+
+            if completion is not None:
+                if completion is BREAK:
+                    break
+                if completion is RETURN:
+                    return completion
+
+            value += step
+            slots[counter.slot] = value
+
+        return None
+
     def visitVariableExpr(self, expr: Variable):
-        return self.environment.get(expr.name)
+        if expr.depth is None:
+            return self.globals.get(expr.name)
+
+        return self.environment.getAt(expr.depth, expr.slot)
+
+    def declare(self, slot: int, name: str, value: object):
+        '''
+            slot comes from the Resolver, None means it's a global
+        '''
+        if slot is None:
+            self.globals.define(name, value)
+        else:
+            self.environment.slots[slot] = value
 
     def checkNumberOperands(self, operator: TokenType, *args):
         for arg in args:
@@ -215,7 +545,10 @@ class Interpreter(Visitor):
         return expr.accept(self)
     
     def execute(self, stmt: Stmt):
-        stmt.accept(self)
+        '''
+            Returns None, or the Completion of a return/break/continue inside 'stmt'
+        '''
+        return stmt.accept(self)
 
     def interpret(self, statements: List[Stmt]):
         try:
@@ -235,7 +568,8 @@ class Interpreter(Visitor):
             Execute statements from block in passed 'environment'.
             
             Sets current environment to passed 'environment' and executes statements,
-            then restores previous environment
+            then restores previous environment. Stops at a return/break/continue and
+            returns its Completion
         '''
         previous = self.environment
 
@@ -243,7 +577,11 @@ class Interpreter(Visitor):
             self.environment = environment
 
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+
+            return None
         
         finally:
             self.environment = previous
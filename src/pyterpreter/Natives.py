@@ -0,0 +1,206 @@
+from time import time
+from collections import OrderedDict
+
+from Callable import Callable
+from Environment import Environment
+from RuntimeError_ import RuntimeError_
+from Rope import flatten
+from NumArray import NATIVES, ArrayError, arithmetic, getIndex, setIndex
+
+'''
+    Native functions, defined in the globals of every execution engine, and the
+    array operations the engines share
+'''
+
+class NativeError(Exception):
+    '''
+        Raised by a native function that was called wrong. Natives don't know where
+        they were called from, the engine turns this into a RuntimeError_ at the call
+    '''
+    pass
+
+class Clock(Callable):
+    def __init__(self):
+        super().__init__()
+        self.start_t = time()
+
+    def arity(self):
+        return 0;
+
+    def call(self, interpreter, arguments):
+        #time passed since start of interpreter
+        return time() - self.start_t
+
+    def __str__(self):
+        return f"<Native Function 'clock'>"
+
+
+#argument types a Memoized function caches on, calls with anything else (functions) aren't cached
+KEY_CLASSES = frozenset((float, str, bool, type(None)))
+
+
+def cacheKey(arguments):
+    '''
+        Cache key for a call with 'arguments', None if they can't be cached.
+        The classes are part of the key, since true == 1.0 as far as a dict is concerned
+    '''
+    classes = tuple(argument.__class__ for argument in arguments)
+    if not KEY_CLASSES.issuperset(classes):
+        return None
+
+    return (classes, tuple(arguments))
+
+
+class Memoized(Callable):
+    '''
+        Wraps a function, caching its results by arguments. With a 'max_size', the least
+        recently used result is evicted once the cache grows past it
+
+        Only meant for pure functions: a call that hits the cache doesn't run the body,
+        so it doesn't print or assign anything either
+    '''
+    def __init__(self, function: Callable, max_size: int=None):
+        self.function = function
+        self.max_size = max_size
+        self.cache = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def arity(self):
+        return self.function.arity()
+
+    def call(self, interpreter, arguments):
+        arguments = flatten(arguments)
+        key = cacheKey(arguments)
+        if key is None:
+            return self.function.call(interpreter, arguments)
+
+        cache = self.cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        self.misses += 1
+        value = self.function.call(interpreter, arguments)
+        cache[key] = value
+
+        if self.max_size is not None and len(cache) > self.max_size:
+            cache.popitem(last=False)
+            self.evictions += 1
+
+        return value
+
+    def statsDict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.cache)}
+
+    def statsString(self) -> str:
+        return ", ".join(f"{name} {count}" for name, count in self.statsDict().items())
+
+    def __str__(self):
+        return f"<Memoized {self.function}>"
+
+
+class Memoize(Callable):
+    '''
+        memoize(fn, maxSize) returns 'fn' caching its results, keeping at most 'maxSize'
+        of them, or all of them for nil. To cache recursive calls too, assign it back:
+
+            fib = memoize(fib, 1000);
+    '''
+    def arity(self):
+        return 2
+
+    def call(self, interpreter, arguments):
+        function, max_size = arguments
+
+        if not isinstance(function, Callable):
+            raise NativeError("memoize() needs a function")
+
+        if max_size is not None:
+            if max_size.__class__ is not float or max_size < 1 or max_size != int(max_size):
+                raise NativeError("memoize() size must be a positive whole number or nil")
+
+            max_size = int(max_size)
+
+        return Memoized(function, max_size)
+
+    def __str__(self):
+        return f"<Native Function 'memoize'>"
+
+
+class MemoStats(Callable):
+    '''
+        memoStats(fn) describes the cache of a memoized function as a string
+    '''
+    def arity(self):
+        return 1
+
+    def call(self, interpreter, arguments):
+        function = arguments[0]
+
+        if not isinstance(function, Memoized):
+            raise NativeError("memoStats() needs a memoized function")
+
+        return function.statsString()
+
+    def __str__(self):
+        return f"<Native Function 'memoStats'>"
+
+
+class ArrayNative(Callable):
+    '''
+        One of the array natives in NumArray.NATIVES
+    '''
+    def __init__(self, name: str, arity: int, function):
+        self.name = name
+        self._arity = arity
+        self.function = function
+
+    def arity(self):
+        return self._arity
+
+    def call(self, interpreter, arguments):
+        try:
+            return self.function(*flatten(arguments))
+        except ArrayError as e:
+            raise NativeError(str(e))
+
+    def __str__(self):
+        return f"<Native Function '{self.name}'>"
+
+
+def arrayArithmetic(token, symbol: str, left, right, message: str):
+    '''
+        For arithmetic operators whose operands weren't both numbers: broadcasts over
+        arrays, raises RuntimeError_(token, message) for anything else
+    '''
+    try:
+        return arithmetic(symbol, left, right, message)
+    except ArrayError as e:
+        raise RuntimeError_(token, str(e))
+
+
+def indexGet(token, target, index):
+    try:
+        return getIndex(target, index)
+    except ArrayError as e:
+        raise RuntimeError_(token, str(e))
+
+
+def indexSet(token, target, index, value):
+    try:
+        return setIndex(target, index, value)
+    except ArrayError as e:
+        raise RuntimeError_(token, str(e))
+
+
+def defineNatives(environment: Environment):
+    environment.define("clock", Clock())
+    environment.define("memoize", Memoize())
+    environment.define("memoStats", MemoStats())
+
+    for name, (arity, function) in NATIVES.items():
+        environment.define(name, ArrayNative(name, arity, function))
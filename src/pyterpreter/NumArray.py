@@ -0,0 +1,225 @@
+import math
+from array import array
+from itertools import repeat
+from operator import add, sub, mul, truediv
+
+'''
+    Numeric arrays: fixed-length runs of unboxed floats, stored in a NumPy float64 array
+    when NumPy is installed and in an array('d') otherwise.
+
+    Arithmetic between two arrays, or an array and a number, goes element by element in
+    one call into NumPy (or one map() over the array('d')), instead of an interpreted loop
+    iteration per element. Same for the natives in NATIVES, like sum() and dot().
+
+    Nothing in here depends on the interpreter. The engines turn ArrayError into a
+    RuntimeError_ at the token that caused it, and the Transpiler copies this module
+    as it is into the Python it generates
+'''
+
+class ArrayError(Exception):
+    pass
+
+
+#the numpy module, None if it isn't installed. Importing it takes longer than most
+#scripts run, so that only happens when the first array gets made
+UNLOADED = object()
+numpy = UNLOADED
+
+
+def loadNumpy():
+    global numpy
+
+    if numpy is UNLOADED:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+
+        numpy = module
+
+    return numpy
+
+
+class NumArray:
+    '''
+        'values' is a numpy.ndarray or an array('d'), whichever loadNumpy() settled on.
+        Compares equal only to itself, like functions
+    '''
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __str__(self):
+        #float() so numpy.float64 prints the same as the floats the language uses
+        return "[" + ", ".join(str(float(value)) for value in self.values) + "]"
+
+
+def wholeNumber(value, message: str) -> int:
+    if value.__class__ is not float or not value.is_integer():
+        raise ArrayError(message)
+
+    return int(value)
+
+
+def zeros(size) -> NumArray:
+    size = wholeNumber(size, "Array size must be a whole number")
+    if size < 0:
+        raise ArrayError("Array size can't be negative")
+
+    np = loadNumpy()
+
+    if np is not None:
+        return NumArray(np.zeros(size))
+
+    return NumArray(array('d', bytes(8 * size)))
+
+
+def arange(start, stop) -> NumArray:
+    '''
+        start, start + 1, ... up to but not including stop
+    '''
+    if start.__class__ is not float or stop.__class__ is not float:
+        raise ArrayError("range() needs two numbers")
+
+    np = loadNumpy()
+
+    if np is not None:
+        return NumArray(np.arange(start, stop, dtype=np.float64))
+
+    count = max(0, math.ceil(stop - start))
+
+    if start.is_integer():
+        first = int(start)
+        return NumArray(array('d', range(first, first + count)))
+
+    return NumArray(array('d', [start + i for i in range(count)]))
+
+
+def checkArray(target, message: str) -> NumArray:
+    if target.__class__ is not NumArray:
+        raise ArrayError(message)
+
+    return target
+
+
+def checkIndex(target, index) -> int:
+    checkArray(target, "Only arrays can be indexed")
+    index = wholeNumber(index, "Array index must be a whole number")
+
+    if index < 0 or index >= len(target.values):
+        raise ArrayError("Array index out of range")
+
+    return index
+
+
+def getIndex(target, index) -> float:
+    index = checkIndex(target, index)
+    return float(target.values[index])
+
+
+def setIndex(target, index, value) -> float:
+    index = checkIndex(target, index)
+
+    if value.__class__ is not float:
+        raise ArrayError("Array elements must be numbers")
+
+    target.values[index] = value
+    return value
+
+
+#operator -> (numpy ufunc name, function for array('d'))
+OPERATIONS = {
+    "+": ("add", add),
+    "-": ("subtract", sub),
+    "*": ("multiply", mul),
+    "/": ("divide", truediv),
+}
+
+
+def arithmetic(symbol: str, left, right, message: str) -> NumArray:
+    '''
+        'left symbol right' element by element, for when left and right aren't both numbers.
+        Raises ArrayError(message) unless one is an array and the other an array or a number
+    '''
+    left_class, right_class = left.__class__, right.__class__
+
+    if not ((left_class is NumArray and right_class in (NumArray, float))
+            or (left_class is float and right_class is NumArray)):
+        raise ArrayError(message)
+
+    a = left.values if left_class is NumArray else left
+    b = right.values if right_class is NumArray else right
+
+    if left_class is right_class and len(a) != len(b):
+        raise ArrayError("Arrays must have the same length")
+
+    if symbol == "/" and (not b if right_class is float else 0.0 in b):
+        raise ArrayError("Divide by zero")
+
+    name, function = OPERATIONS[symbol]
+
+    if numpy is not None:
+        return NumArray(getattr(numpy, name)(a, b))
+
+    if left_class is float:
+        return NumArray(array('d', map(function, repeat(a, len(b)), b)))
+    if right_class is float:
+        return NumArray(array('d', map(function, a, repeat(b, len(a)))))
+
+    return NumArray(array('d', map(function, a, b)))
+
+
+def length(thing) -> float:
+    if thing.__class__ is not NumArray and not isinstance(thing, str):
+        raise ArrayError("len() needs an array or a string")
+
+    return float(len(thing))
+
+
+def total(target) -> float:
+    values = checkArray(target, "sum() needs an array").values
+
+    if numpy is not None:
+        return float(numpy.sum(values))
+
+    return math.fsum(values)
+
+
+def dot(left, right) -> float:
+    a = checkArray(left, "dot() needs two arrays").values
+    b = checkArray(right, "dot() needs two arrays").values
+
+    if len(a) != len(b):
+        raise ArrayError("Arrays must have the same length")
+
+    if numpy is not None:
+        return float(numpy.dot(a, b))
+
+    return math.fsum(map(mul, a, b))
+
+
+def sort(target) -> NumArray:
+    '''
+        A sorted copy
+    '''
+    values = checkArray(target, "sort() needs an array").values
+
+    if numpy is not None:
+        return NumArray(numpy.sort(values))
+
+    return NumArray(array('d', sorted(values)))
+
+
+#native name -> (arity, function taking the arguments)
+NATIVES = {
+    "array": (1, zeros),
+    "range": (2, arange),
+    "len": (1, length),
+    "sum": (1, total),
+    "dot": (2, dot),
+    "sort": (1, sort),
+}
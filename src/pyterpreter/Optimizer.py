@@ -0,0 +1,237 @@
+from typing import List
+
+from Expr import *
+from Stmt import *
+from Visitor import *
+from TokenType import *
+
+class Optimizer(Visitor):
+    '''
+        Optional pass (-O) run between Parser.parse() and the Resolver
+
+            - folds arithmetic, comparisons and string concatenation on literals
+            - strips Grouping nodes
+            - replaces If/While with a literal condition by the branch that runs
+            - drops expression statements that can't have side effects
+
+        Anything that would raise a runtime error is left alone, so it still raises
+        at runtime and reports the line of its operator.
+
+        Expression visitors return the optimized expression, statement visitors
+        return the optimized statement, or None if it can be dropped
+    '''
+    number_ops = {
+        TokenType.MINUS: lambda a, b: a - b,
+        TokenType.STAR: lambda a, b: a * b,
+        TokenType.GREATER: lambda a, b: a > b,
+        TokenType.GREATER_EQUAL: lambda a, b: a >= b,
+        TokenType.LESS: lambda a, b: a < b,
+        TokenType.LESS_EQUAL: lambda a, b: a <= b,
+        TokenType.BANG_EQUAL: lambda a, b: not (a == b),
+    }
+
+    def optimize(self, statements: List[Stmt]) -> List[Stmt]:
+        return self.optimizeStatements(statements)
+
+    def optimizeStatements(self, statements: List[Stmt]) -> List[Stmt]:
+        optimized = []
+
+        for statement in statements:
+            statement = self.optimizeStatement(statement)
+            if statement is not None:
+                optimized.append(statement)
+
+        return optimized
+
+    def optimizeStatement(self, stmt: Stmt) -> Stmt:
+        return stmt.accept(self)
+
+    def optimizeBranch(self, stmt: Stmt) -> Stmt:
+        '''
+            For statements that have to stay, like a loop body
+        '''
+        stmt = self.optimizeStatement(stmt)
+        return Block([]) if stmt is None else stmt
+
+    def optimizeExpression(self, expr: Expr) -> Expr:
+        return expr.accept(self)
+
+    def truthyness(self, thing) -> bool:
+        return thing is not None and thing is not False
+
+    def visitAssignExpr(self, expr: Assign):
+        expr.value = self.optimizeExpression(expr.value)
+        return expr
+
+    def visitBinaryExpr(self, expr: Binary):
+        #left nested chains like 1 + 2 + ... + n get a loop instead of a recursion per operand
+        chain = []
+        while isinstance(expr, Binary):
+            chain.append(expr)
+            expr = expr.left
+
+        left = self.optimizeExpression(expr)
+
+        for expr in reversed(chain):
+            expr.left = left
+            expr.right = self.optimizeExpression(expr.right)
+            left = self.foldBinary(expr)
+
+        return left
+
+    def foldBinary(self, expr: Binary) -> Expr:
+        '''
+            'expr' with its operands already optimized, as a Literal if it can be folded
+        '''
+        if not (isinstance(expr.left, Literal) and isinstance(expr.right, Literal)):
+            return expr
+
+        left, right = expr.left.value, expr.right.value
+        typ_ = expr.operator.tokentype
+        numbers = isinstance(left, float) and isinstance(right, float)
+
+        if typ_ == TokenType.PLUS:
+            if numbers or (isinstance(left, str) and isinstance(right, str)):
+                return Literal(left + right)
+
+        elif typ_ == TokenType.SLASH:
+            if numbers and right != 0.0:
+                return Literal(left / right)
+
+        elif typ_ == TokenType.EQUAL_EQUAL:
+            return Literal(left == right)
+
+        elif typ_ == TokenType.COMMA:
+            return Literal(None)
+
+        elif typ_ in self.number_ops and numbers:
+            return Literal(self.number_ops[typ_](left, right))
+
+        #would raise at runtime, keep it around so it does
+        return expr
+
+    def visitCallFunctionExpr(self, expr: CallFunction):
+        expr.callee = self.optimizeExpression(expr.callee)
+        expr.arguments = [self.optimizeExpression(argument) for argument in expr.arguments]
+        return expr
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.optimizeExpression(expr.expression)
+
+    def visitIndexExpr(self, expr: Index):
+        expr.target = self.optimizeExpression(expr.target)
+        expr.index = self.optimizeExpression(expr.index)
+        return expr
+
+    def visitLiteralExpr(self, expr: Literal):
+        return expr
+
+    def visitLogicalExpr(self, expr: Logical):
+        expr.left = self.optimizeExpression(expr.left)
+        expr.right = self.optimizeExpression(expr.right)
+
+        if not isinstance(expr.left, Literal):
+            return expr
+
+        truthy = self.truthyness(expr.left.value)
+
+        if expr.operator.tokentype == TokenType.OR:
+            return expr.left if truthy else expr.right
+
+        return expr.right if truthy else expr.left
+
+    def visitSetIndexExpr(self, expr: SetIndex):
+        expr.target = self.optimizeExpression(expr.target)
+        expr.index = self.optimizeExpression(expr.index)
+        expr.value = self.optimizeExpression(expr.value)
+        return expr
+
+    def visitUnaryExpr(self, expr: Unary):
+        expr.right = self.optimizeExpression(expr.right)
+
+        if not isinstance(expr.right, Literal):
+            return expr
+
+        value = expr.right.value
+
+        if expr.operator.tokentype == TokenType.BANG:
+            return Literal(not self.truthyness(value))
+
+        if isinstance(value, float):
+            return Literal(-value)
+
+        return expr
+
+    def visitVariableExpr(self, expr: Variable):
+        return expr
+
+    def visitBlockStmt(self, stmt: Block):
+        stmt.statements = self.optimizeStatements(stmt.statements)
+        return stmt
+
+    def visitExpressionStmt(self, stmt: Expression):
+        stmt.expression = self.optimizeExpression(stmt.expression)
+
+        if isinstance(stmt.expression, Literal):
+            return None
+
+        return stmt
+
+    def visitFunctionStmt(self, stmt: Function):
+        stmt.body = self.optimizeStatements(stmt.body)
+        return stmt
+
+    def visitIfStmt(self, stmt: If):
+        stmt.condition = self.optimizeExpression(stmt.condition)
+
+        if isinstance(stmt.condition, Literal):
+            if self.truthyness(stmt.condition.value):
+                return self.optimizeStatement(stmt.thenBranch)
+
+            if stmt.elseBranch is not None:
+                return self.optimizeStatement(stmt.elseBranch)
+
+            return None
+
+        stmt.thenBranch = self.optimizeBranch(stmt.thenBranch)
+
+        if stmt.elseBranch is not None:
+            stmt.elseBranch = self.optimizeStatement(stmt.elseBranch)
+
+        return stmt
+
+    def visitPrintStmt(self, stmt: Print):
+        stmt.expression = self.optimizeExpression(stmt.expression)
+        return stmt
+
+    def visitVarStmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer = self.optimizeExpression(stmt.initializer)
+
+        return stmt
+
+    def visitWhileStmt(self, stmt: While):
+        stmt.condition = self.optimizeExpression(stmt.condition)
+
+        if isinstance(stmt.condition, Literal) and not self.truthyness(stmt.condition.value):
+            #body never runs
+            return None
+
+        stmt.body = self.optimizeBranch(stmt.body)
+
+        if stmt.increment is not None:
+            stmt.increment = self.optimizeExpression(stmt.increment)
+
+        return stmt
+
+    def visitBreakStmt(self, stmt: Break):
+        return stmt
+
+    def visitContinueStmt(self, stmt: Continue):
+        return stmt
+
+    def visitReturnStmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value = self.optimizeExpression(stmt.value)
+
+        return stmt
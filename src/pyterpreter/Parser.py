@@ -1,10 +1,43 @@
-from typing import List
+from typing import List, Iterator
 
 from Token import *
 from TokenType import *
 from Expr import *
 from Stmt import *
 from ErrorHandler import *
+from TokenStore import TOKEN_TYPES
+
+#how tightly each binary operator binds, higher binds tighter. All are left associative but '='
+COMMA_PRECEDENCE = 1
+ASSIGNMENT_PRECEDENCE = 2
+
+PRECEDENCE = {
+    TokenType.COMMA: COMMA_PRECEDENCE,
+    TokenType.EQUAL: ASSIGNMENT_PRECEDENCE,
+    TokenType.OR: 3,
+    TokenType.AND: 4,
+    TokenType.BANG_EQUAL: 5,
+    TokenType.EQUAL_EQUAL: 5,
+    TokenType.LESS: 6,
+    TokenType.GREATER: 6,
+    TokenType.LESS_EQUAL: 6,
+    TokenType.GREATER_EQUAL: 6,
+    TokenType.PLUS: 7,
+    TokenType.MINUS: 7,
+    TokenType.SLASH: 8,
+    TokenType.STAR: 8,
+}
+
+#operators that make a Logical instead of a Binary
+LOGICAL_OPERATORS = frozenset((TokenType.OR, TokenType.AND))
+
+UNARY_OPERATORS = frozenset((TokenType.BANG, TokenType.MINUS))
+
+KEYWORD_LITERALS = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
 
 class Parser:
     class ParseError(RuntimeError):
@@ -20,6 +53,9 @@ class Parser:
     def peek(self) -> TokenType:
         return self.tokens[self.current]
 
+    def peekType(self) -> TokenType:
+        return self.tokens[self.current].tokentype
+
     def isAtEnd(self) -> bool:
         return self.peek().tokentype == TokenType.EOF
 
@@ -73,141 +109,97 @@ class Parser:
 
     def expression(self) -> Expr:
         '''
-            expression -> commaSeparated
-        '''
-        return self.commaSeparated()
-    
-    def commaSeparated(self) -> Expr:
+            expression -> assignment ( "," assignment )*
         '''
-            commaSeparated -> assignment ( "," assignment )*
-        '''
-        left = self.assignment()
-
-        while self.match([TokenType.COMMA]):
-            operator = self.previous()
-            right = self.assignment()
-            left = Binary(left, operator, right)
-
-        return left
+        return self.binary(COMMA_PRECEDENCE)
 
     def assignment(self) -> Expr:
         '''
-            assignment -> IDENTIFIER '=' assignment | logic_or
+            assignment -> ( IDENTIFIER | functionCall '[' assignment ']' ) '=' assignment | logic_or
         '''
-        expr = self.logic_or()
-
-        if self.match([TokenType.EQUAL]):
-            equals = self.previous()
-            value = self.assignment()
+        return self.binary(ASSIGNMENT_PRECEDENCE)
 
-            if isinstance(expr, Variable):
-                return Assign(expr.name, value)
-
-            self.error(equals, "Invalid target for assignment")
-
-        return expr
-
-    def logic_or(self) -> Expr:
-        '''
-            logic_or -> logic_and ( 'or' logic_and )*
+    def binary(self, precedence: int) -> Expr:
         '''
-        left = self.logic_and()
-
-        while self.match([TokenType.OR]):
-            operator = self.previous()
-            right = self.logic_and()
-            left = Logical(left, operator, right)
+            Parses operators from PRECEDENCE that bind at least as tightly as 'precedence',
+            one loop for all of these instead of a method each:
 
-        return left
+                logic_or       -> logic_and ( 'or' logic_and )*
+                logic_and      -> equality ( 'and' equality )*
+                equality       -> comparison ( ('!=' | '==') comparison )*
+                comparison     -> addition ( ('<' | '>' | '<=' | '>=') addition )*
+                addition       -> multiplication ( ( '+' | '-' ) multiplication )*
+                multiplication -> unary ( ( '/' | '*' ) unary )*
 
-    def logic_and(self) -> Expr:
+            The right operand only takes operators binding tighter than its own, so
+            1 + 2 + 3 + ... goes round this loop instead of recursing, however long it is
         '''
-            logic_and -> equality ( 'and' equality )*
-        '''
-        left = self.equality()
+        left = self.unary()
 
-        while self.match([TokenType.AND]):
-            operator = self.previous()
-            right = self.equality()
-            left = Logical(left, operator, right)
-        
-        return left
+        while True:
+            tokentype = self.peekType()
+            operator_precedence = PRECEDENCE.get(tokentype)
 
-    def equality(self) -> Expr:
-        '''
-            equality -> comparison ( ('!=' | '==') comparison )* 
-        '''
-        #consume left comparison
-        left = self.comparison()
+            if operator_precedence is None or operator_precedence < precedence:
+                return left
 
-        while self.match([TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL]):
-            operator = self.previous()
-            right = self.comparison()
-            left = Binary(left, operator, right)
+            operator = self.advance()
 
-        return left
+            if tokentype == TokenType.EQUAL:
+                left = self.finishAssignment(left, operator)
+            elif tokentype in LOGICAL_OPERATORS:
+                left = Logical(left, operator, self.binary(operator_precedence + 1))
+            else:
+                left = Binary(left, operator, self.binary(operator_precedence + 1))
 
-    def comparison(self) -> Expr:
-        '''
-            comparison -> addition ( ('<' | '>' | '<=' | '>=') addition )*
-        '''
+    def finishAssignment(self, target: Expr, equals: Token) -> Expr:
+        #right associative, a = b = c assigns c to b first
+        value = self.binary(ASSIGNMENT_PRECEDENCE)
 
-        left = self.addition()
+        if isinstance(target, Variable):
+            return Assign(target.name, value)
 
-        while self.match([TokenType.LESS, TokenType.GREATER, TokenType.LESS_EQUAL, TokenType.GREATER_EQUAL]):
-            operator = self.previous()
-            right = self.addition()
-            left = Binary(left, operator, right)
+        if isinstance(target, Index):
+            return SetIndex(target.target, target.bracket, target.index, value)
 
-        return left
+        self.error(equals, "Invalid target for assignment")
+        return target
 
-    def addition(self) -> Expr:
-        '''
-            addition -> multiplication ( ( '+' | '-' ) multiplication )*
+    def unary(self) -> Expr:
         '''
-        left = self.multiplication()
-
-        while self.match([TokenType.PLUS, TokenType.MINUS]):
-            operator = self.previous()
-            right = self.multiplication()
-            left = Binary(left, operator, right)
-
-        return left
+            unary -> ( '!' | '-' ) unary | functionCall
 
-    def multiplication(self) -> Expr:
-        '''
-            multiplication -> unary ( ( '/' | '-' ) unary )*
+            The operators are collected in a loop, so a long run of them doesn't recurse
         '''
-        left = self.unary()
+        operators = []
+        while self.peekType() in UNARY_OPERATORS:
+            operators.append(self.advance())
 
-        while self.match([TokenType.SLASH, TokenType.STAR]):
-            operator = self.previous()
-            right = self.unary()
-            left = Binary(left, operator, right)
+        expr = self.functionCall()
 
-        return left
-        
+        for operator in reversed(operators):
+            expr = Unary(operator, expr)
 
-    def unary(self) -> Expr:
-        '''
-            unary -> ( '!' | '-' ) unary | functionCall
-        '''
-        if self.match([TokenType.BANG, TokenType.MINUS]):
-            operator = self.previous()
-            right = self.unary()
-            return Unary(operator, right)
-        
-        return self.functionCall()
+        return expr
 
     def functionCall(self):
         '''
-            functionCall -> primary ( '(' arguments ')' )*
+            functionCall -> primary ( '(' arguments ')' | '[' assignment ']' )*
         '''
         expr = self.primary()
 
         while True:
-            if self.match([TokenType.LEFT_PAREN]):
+            tokentype = self.peekType()
+
+            if tokentype == TokenType.LEFT_PAREN:
+                self.advance()
                 expr = self.finishCall(expr)
+            elif tokentype == TokenType.LEFT_BRACKET:
+                self.advance()
+                #no comma operator in here, a[i, j] is an error instead of meaning a[j]
+                index = self.assignment()
+                bracket = self.consume(TokenType.RIGHT_BRACKET, "Expected ']' after index")
+                expr = Index(expr, bracket, index)
             else:
                 break
 
@@ -252,27 +244,27 @@ class Parser:
                      | "false" 
                      | "true" 
                      | "nil" 
-                     | "(" commaSeparated ")" 
+                     | "(" expression ")" 
                      | IDENTIFIER
         '''
-        if self.match([TokenType.FALSE]):
-            return Literal(False)
-        if self.match([TokenType.TRUE]):
-            return Literal(True)
-        if self.match([TokenType.NIL]):
-            return Literal(None)
+        tokentype = self.peekType()
+
+        if tokentype == TokenType.NUMBER or tokentype == TokenType.STRING:
+            return Literal(self.advance().literal)
 
-        if self.match([TokenType.NUMBER, TokenType.STRING]):
-            return Literal(self.previous().literal)
+        if tokentype == TokenType.IDENTIFIER:
+            return Variable(self.advance())
 
-        if self.match([TokenType.LEFT_PAREN]):
-            expr = self.commaSeparated()
+        if tokentype in KEYWORD_LITERALS:
+            self.advance()
+            return Literal(KEYWORD_LITERALS[tokentype])
+
+        if tokentype == TokenType.LEFT_PAREN:
+            self.advance()
+            expr = self.expression()
             self.consume(TokenType.RIGHT_PAREN, "Expected ')' after expression")
             return Grouping(expr)
 
-        if self.match([TokenType.IDENTIFIER]):
-            return Variable(self.previous())
-
         raise self.error(self.peek(), "Expected expression")
 
     def synchronize(self):
@@ -313,6 +305,13 @@ class Parser:
 
         return statements
 
+    def iterDeclarations(self) -> Iterator[Stmt]:
+        '''
+            Like parse(), but yields each top level declaration as soon as it's parsed
+        '''
+        while not self.isAtEnd():
+            yield self.declaration()
+
     def declaration(self) -> Stmt:
         '''
             declaration -> variableDeclaration | functionDeclaration | statement
@@ -376,10 +375,24 @@ class Parser:
     def statement(self) -> Stmt:
         '''
             statement -> expressionStatement | printStatement | block | ifStatement | whileStatement | forStatement
+                       | returnStatement | breakStatement | continueStatement
         '''
         if self.match([TokenType.PRINT]):
             return self.printStatement()
 
+        elif self.match([TokenType.RETURN]):
+            return self.returnStatement()
+
+        elif self.match([TokenType.BREAK]):
+            keyword = self.previous()
+            self.consume(TokenType.SEMICOLON, "Expected ';' after 'break'")
+            return Break(keyword)
+
+        elif self.match([TokenType.CONTINUE]):
+            keyword = self.previous()
+            self.consume(TokenType.SEMICOLON, "Expected ';' after 'continue'")
+            return Continue(keyword)
+
         elif self.match([TokenType.LEFT_BRACE]):
             return Block(self.block())
 
@@ -404,6 +417,19 @@ class Parser:
         self.consume(TokenType.SEMICOLON, "Expected ';' after print value")
         return Print(value)
 
+    def returnStatement(self) -> Stmt:
+        '''
+            returnStatement -> 'return' expression? ';'
+        '''
+        keyword = self.previous()
+
+        value = None
+        if not self.check(TokenType.SEMICOLON):
+            value = self.expression()
+
+        self.consume(TokenType.SEMICOLON, "Expected ';' after return value")
+        return Return(keyword, value)
+
     def expressionStatement(self) -> Stmt:
         '''
             expressionStatement -> expression ';'
@@ -453,7 +479,7 @@ class Parser:
 
         body = self.statement()
 
-        return While(condition, body)
+        return While(condition, body, None)
 
     def forStatement(self) -> Stmt:
         self.consume(TokenType.LEFT_PAREN, "Expected '(' after for")
@@ -487,17 +513,13 @@ class Parser:
         body = self.statement()
 
 
-        #make an equivalent while loop, with initializer before the loop, 
-        #and increment at the end of loop body
+        #make an equivalent while loop, with initializer before the loop.
+        #The increment stays separate from the body, so 'continue' doesn't skip it
 
-        if increment is not None:
-            body = Block([
-                body,
-                increment
-            ])
+        if condition is None:
+            condition = Literal(True)
 
-        if condition is not None:
-            body = While(condition, body)
+        body = While(condition, body, increment)
 
         if initializer is not None:
             body = Block([
@@ -506,3 +528,89 @@ class Parser:
             ])
 
         return body
+
+
+class StreamingParser(Parser):
+    '''
+        Parser pulling tokens from an iterator, like Scanner.iterTokens(), instead of a list.
+
+        The grammar only ever looks at the current and the previous token,
+        so those two are all it keeps around
+    '''
+    def __init__(self, tokens: Iterator[Token], error_handler: ErrorHandler, logging: bool=False):
+        super().__init__([], error_handler, logging=logging)
+        self.token_iter = iter(tokens)
+        self._peek = next(self.token_iter)
+        self._previous = None
+
+    def peek(self) -> TokenType:
+        return self._peek
+
+    def peekType(self) -> TokenType:
+        return self._peek.tokentype
+
+    def previous(self) -> TokenType:
+        return self._previous
+
+    def advance(self) -> TokenType:
+        if not self.isAtEnd():
+            self._previous = self._peek
+            self._peek = next(self.token_iter)
+
+        return self._previous
+
+
+class TokenStoreParser(Parser):
+    '''
+        Parser reading a TokenStore's arrays directly.
+
+        Token types are compared as ints straight from the store, Token objects only get
+        made for tokens somebody asks for, like names and operators kept in the AST
+    '''
+    def __init__(self, tokens, error_handler: ErrorHandler, logging: bool=False):
+        super().__init__(tokens, error_handler, logging=logging)
+        self.types = tokens.types
+        self.eof = TokenType.EOF.value
+
+        #previous() is usually asked for more than once per token
+        self._token_index = -1
+        self._token = None
+
+    def token(self, index: int) -> Token:
+        if index != self._token_index:
+            self._token = self.tokens[index]
+            self._token_index = index
+
+        return self._token
+
+    def peek(self) -> TokenType:
+        return self.token(self.current)
+
+    def previous(self) -> TokenType:
+        return self.token(self.current - 1)
+
+    def peekType(self) -> TokenType:
+        return TOKEN_TYPES[self.types[self.current]]
+
+    def isAtEnd(self) -> bool:
+        return self.types[self.current] == self.eof
+
+    def check(self, type_: TokenType) -> bool:
+        tokentype = self.types[self.current]
+        return tokentype != self.eof and tokentype == type_.value
+
+    def match(self, types: List[TokenType]) -> bool:
+        tokentype = self.types[self.current]
+        if tokentype == self.eof:
+            return False
+
+        for type_ in types:
+            if tokentype == type_.value:
+                self.current += 1
+
+                if self.logging:
+                    print(f"Matched {self.previous()}")
+
+                return True
+
+        return False
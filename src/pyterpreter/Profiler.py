@@ -0,0 +1,184 @@
+import sys
+import threading
+from collections import Counter
+from time import perf_counter
+
+from Expr import Expr
+from Stmt import Stmt
+from Interpreter import Interpreter
+from FunctionCallable import FunctionCallable
+
+'''
+    Sampling profiler for .pr programs running on the tree-walking Interpreter.
+
+    A background thread wakes up every 'interval' seconds and looks at the Python stack
+    of the interpreting thread. Nothing is added to the Interpreter itself, the .pr stack
+    is read off its frames:
+
+        - FunctionCallable.call() frames are .pr function calls
+        - the innermost Interpreter.evaluate()/execute() frame with a token under it
+          gives the .pr line being run in each of those calls
+
+    Each sample becomes a stack like "<script>:12;fib:6;fib:4", outermost call first,
+    every call labelled with its function and the line it's at.
+'''
+
+#the frames the .pr stack is read off
+CALL_CODE = FunctionCallable.call.__code__
+NODE_CODES = {
+    Interpreter.evaluate.__code__: "expr",
+    Interpreter.execute.__code__: "stmt",
+}
+
+#node fields holding a token, in the order they're looked at
+TOKEN_FIELDS = ("operator", "name", "parenLoc", "keyword", "bracket")
+
+#label of the code outside of any function
+SCRIPT = "<script>"
+
+
+def nodeLine(node) -> int:
+    '''
+        Line of a node's token. Nodes without one, like blocks and loops, get the line of
+        the first token under them. None if there's no token at all, like for a literal
+    '''
+    for field in TOKEN_FIELDS:
+        token = getattr(node, field, None)
+        if token is not None:
+            return token.line
+
+    for field in getattr(node, "__slots__", ()):
+        child = getattr(node, field)
+        children = child if isinstance(child, list) else [child]
+
+        for child in children:
+            if isinstance(child, (Expr, Stmt)):
+                line = nodeLine(child)
+                if line is not None:
+                    return line
+
+    return None
+
+
+class Profiler:
+    def __init__(self, interval: float=0.005):
+        self.interval = interval
+        #collapsed stack -> samples
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        '''
+            Start sampling the calling thread
+        '''
+        self._target = threading.get_ident()
+        self._stop.clear()
+
+        #the sampler waits for the GIL up to a switch interval (5ms by default) each time it
+        #wakes up, keep that short next to the sampling interval
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, self.interval / 10))
+
+        self._started = perf_counter()
+
+        self._thread = threading.Thread(target=self._sampleLoop, name="pr-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed += perf_counter() - self._started
+
+        sys.setswitchinterval(self._switch_interval)
+
+    def _sampleLoop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                return
+
+            stack = self.prStack(frame)
+            #dropping the frame right away keeps its locals from living on in this thread
+            del frame
+
+            self.stacks[";".join(f"{name}:{line}" for name, line in stack)] += 1
+            self.samples += 1
+
+    def prStack(self, frame):
+        '''
+            [(function name, line)] of the .pr calls active in 'frame', outermost first
+        '''
+        stack = []
+        line = None
+
+        while frame is not None:
+            code = frame.f_code
+
+            if code is CALL_CODE:
+                declaration = frame.f_locals["self"].declaration
+                stack.append((declaration.name.lexeme, line if line is not None else declaration.name.line))
+                line = None
+
+            elif line is None and code in NODE_CODES:
+                line = nodeLine(frame.f_locals.get(NODE_CODES[code]))
+
+            frame = frame.f_back
+
+        stack.append((SCRIPT, line if line is not None else "?"))
+        stack.reverse()
+        return stack
+
+    def writeCollapsed(self, path: str):
+        '''
+            One "frame;frame;frame count" line per stack, what flamegraph.pl and speedscope read
+        '''
+        with open(path, mode='w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+    def totals(self, key):
+        '''
+            (self samples, total samples) per key(frame), a key counts once per sample
+            however many times it shows up in the stack
+        '''
+        self_samples = Counter()
+        total_samples = Counter()
+
+        for stack, count in self.stacks.items():
+            frames = [tuple(frame.rsplit(":", 1)) for frame in stack.split(";")]
+
+            self_samples[key(frames[-1])] += count
+            for name in set(key(frame) for frame in frames):
+                total_samples[name] += count
+
+        return self_samples, total_samples
+
+    def report(self, top: int=20, filename: str="<script>", file=sys.stderr):
+        if self.samples == 0:
+            print("profile: no samples, the program finished too quickly", file=file)
+            return
+
+        #actual time per sample, the sampler can't always wake up on time
+        per_sample = self.elapsed / self.samples
+        print(f"profile: {self.samples} samples over {self.elapsed:.3f}s", file=file)
+
+        tables = [
+            ("function", lambda frame: frame[0]),
+            ("line", lambda frame: f"{filename}:{frame[1]} ({frame[0]})"),
+        ]
+
+        for title, key in tables:
+            self_samples, total_samples = self.totals(key)
+            width = max(len(title), max(len(name) for name in total_samples))
+
+            print(f"\n{title:<{width}}  {'self':>16}  {'total':>16}", file=file)
+            names = sorted(total_samples, key=lambda name: (self_samples[name], total_samples[name]), reverse=True)
+
+            for name in names[:top]:
+                count, total = self_samples[name], total_samples[name]
+                print(f"{name:<{width}}  {count * per_sample:>8.3f}s {count / self.samples:>6.1%}"
+                      f"  {total * per_sample:>8.3f}s {total / self.samples:>6.1%}", file=file)
@@ -0,0 +1,160 @@
+import os
+import mmap
+import pickle
+import hashlib
+import tempfile
+from typing import List
+
+from Stmt import *
+
+'''
+    On-disk cache of compiled programs, like __pycache__ for .pr scripts.
+
+    Entries hold the resolved (and with -O, optimized) statement list, pickled.
+    They're keyed by a hash of the source, the -O flag and the front end that produced
+    them, so editing the script or upgrading the interpreter never loads a stale entry.
+
+    Entries are loaded through mmap, so concurrent processes share the page cache
+    instead of each reading its own copy. Writes go to a temporary file first and
+    get renamed into place, readers never see half written entries.
+
+    The directory is bounded by entry count and total size. Loading an entry
+    touches its mtime, and the least recently used entries are evicted first
+'''
+
+#bump when the cache format changes in a way the module hash below won't catch
+CACHE_VERSION = "1"
+
+#modules whose code decides what a cached statement list looks like
+FRONT_END_MODULES = [
+    "scanner.py", "RegexScanner.py", "TokenStore.py", "Parser.py", "Optimizer.py", "Resolver.py",
+    "Expr.py", "Stmt.py", "Token.py", "TokenType.py",
+]
+
+ENTRY_SUFFIX = ".prc"
+
+
+def interpreterVersion() -> str:
+    '''
+        CACHE_VERSION plus a digest of the front end's source code
+    '''
+    digest = hashlib.sha256(CACHE_VERSION.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    for name in FRONT_END_MODULES:
+        with open(os.path.join(directory, name), mode='rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+class ProgramCache:
+    _version = None
+
+    def __init__(self, directory: str, max_entries: int=256, max_bytes: int=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        if ProgramCache._version is None:
+            ProgramCache._version = interpreterVersion()
+
+    def key(self, source: str, optimize: bool) -> str:
+        digest = hashlib.sha256(ProgramCache._version.encode())
+        digest.update(b"O" if optimize else b"-")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, source: str, optimize: bool) -> str:
+        return os.path.join(self.directory, self.key(source, optimize) + ENTRY_SUFFIX)
+
+    def load(self, source: str, optimize: bool) -> List[Stmt]:
+        '''
+            Returns the cached statements for 'source', or None on a miss
+        '''
+        path = self.path(source, optimize)
+
+        try:
+            with open(path, mode='rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    statements = pickle.loads(buffer)
+
+            #mark as recently used
+            os.utime(path)
+            return statements
+
+        except FileNotFoundError:
+            return None
+
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            #empty, truncated or otherwise broken entry, get rid of it
+            self.remove(path)
+            return None
+
+    def store(self, source: str, optimize: bool, statements: List[Stmt]):
+        '''
+            Has to happen before 'statements' run: CallFunction nodes fill their inline
+            caches while running, with functions of that run that don't belong in an entry
+        '''
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            data = pickle.dumps(statements, protocol=pickle.HIGHEST_PROTOCOL)
+
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, mode='wb') as f:
+                    f.write(data)
+
+                os.replace(temp_path, self.path(source, optimize))
+            except OSError:
+                #entries() only sees finished entries, evict() would never get rid of it
+                self.remove(temp_path)
+                raise
+
+        except (OSError, pickle.PicklingError, RecursionError):
+            #the cache is only an optimization, running the program matters more
+            return
+
+        self.evict()
+
+    def entries(self):
+        '''
+            (mtime, size, path) of every entry, least recently used first
+        '''
+        entries = []
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                #evicted by another process in the meantime
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            self.remove(path)
+            total -= size
+
+    def remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
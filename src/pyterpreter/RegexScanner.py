@@ -0,0 +1,136 @@
+import re
+from typing import List, Iterator
+
+from TokenType import *
+from Token import *
+from scanner import Scanner
+
+class RegexScanner(Scanner):
+    '''
+        Scanner backend that matches a whole token at a time with one compiled master regex,
+        instead of going character by character through advance()/peek()/match().
+
+        Produces the same tokens, line numbers and errors as Scanner. The regex only
+        covers ASCII; anything it doesn't handle (non-ASCII identifiers, unterminated
+        strings and comments, unexpected characters) is scanned by Scanner.scanToken()
+    '''
+    #leading whitespace is skipped as part of the same match
+    token_re = re.compile(r'''
+        [ \t\r]*
+        (?:
+          (?P<newline>\n)
+        | (?P<identifier>[A-Za-z][A-Za-z0-9]*)
+        | (?P<number>[0-9]+(?:\.[0-9]+)?)
+        | (?P<operator>[!=<>]=?)
+        | (?P<line_comment>//[^\n]*)
+        | (?P<block_comment>/\*)
+        | (?P<single>[(){}\[\],.\-+;*/])
+        | (?P<string>"[^"]*")
+        )?
+    ''', re.VERBOSE)
+
+    def scanTokens(self) -> List[Token]:
+        self.tokens = list(self.iterTokens())
+        return self.tokens
+
+    def iterTokens(self) -> Iterator[Token]:
+        '''
+            Yields tokens as they're matched, ending with EOF. While it's stopped
+            at a token, _current is the offset just past that token
+        '''
+        source = self.source
+        end = len(source)
+        match = self.token_re.match
+
+        keywords = self.keywords
+        single_tokens = dict(self.single_tokens)
+        single_tokens['/'] = TokenType.SLASH
+        operator_tokens = {}
+        for c, double_token in self.double_tokens.items():
+            operator_tokens[c] = double_token.single
+            operator_tokens[c + '='] = double_token.double
+
+        IDENTIFIER = TokenType.IDENTIFIER
+        NUMBER = TokenType.NUMBER
+        STRING = TokenType.STRING
+
+        position = 0
+        line = self._line
+
+        while position < end:
+            m = match(source, position)
+            kind = m.lastgroup
+            after = m.end()
+
+            if kind is None:
+                #only whitespace, maybe followed by something the regex doesn't cover
+                position = after
+                if position >= end:
+                    break
+            else:
+                text = m.group(kind)
+
+                if kind == "identifier":
+                    if after >= end or source[after] < '\x80':
+                        self._current = position = after
+                        yield Token(keywords.get(text, IDENTIFIER), text, None, line)
+                        continue
+
+                elif kind == "single":
+                    self._current = position = after
+                    yield Token(single_tokens[text], text, None, line)
+                    continue
+
+                elif kind == "newline":
+                    line += 1
+                    position = after
+                    continue
+
+                elif kind == "number":
+                    #a non-ASCII digit right after could still be part of the number
+                    if (after >= end or source[after] < '\x80') and \
+                       (after + 1 >= end or source[after] != '.' or source[after + 1] < '\x80'):
+                        self._current = position = after
+                        yield Token(NUMBER, text, float(text), line)
+                        continue
+
+                elif kind == "operator":
+                    self._current = position = after
+                    yield Token(operator_tokens[text], text, None, line)
+                    continue
+
+                elif kind == "line_comment":
+                    position = after
+                    continue
+
+                elif kind == "string":
+                    line += text.count('\n')
+                    self._current = position = after
+                    yield Token(STRING, text, text[1:-1], line)
+                    continue
+
+                elif kind == "block_comment":
+                    close = source.find("*/", after)
+
+                    #Scanner.multilineComment() also stops at a NUL, leave those to it
+                    if close != -1 and source.find('\0', position, close + 2) == -1:
+                        line += source.count('\n', after, close)
+                        position = close + 2
+                        continue
+
+                position = m.start(kind)
+
+            #everything else goes through the character by character path
+            self._start = self._current = position
+            self._line = line
+            self.scanToken()
+            position = self._current
+            line = self._line
+
+            if self.tokens:
+                yield from self.tokens
+                self.tokens.clear()
+
+        self._current = position
+        self._line = line
+        yield Token(TokenType.EOF, "", None, line)
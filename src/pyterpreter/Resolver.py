@@ -0,0 +1,273 @@
+from typing import List
+from collections import Counter
+
+from Expr import *
+from Stmt import *
+from Visitor import *
+from ErrorHandler import *
+from TokenType import TokenType
+
+#conditions a counted loop can have, 'i < bound' and the like
+COUNTED_COMPARISONS = (TokenType.LESS, TokenType.LESS_EQUAL, TokenType.GREATER, TokenType.GREATER_EQUAL)
+
+class Resolver(Visitor):
+    '''
+        Static pass run between Parser.parse() and Interpreter.interpret()
+
+        Gives every local variable reference a (depth, slot) pair:
+            depth - how many environments to walk up from the current one
+            slot  - index into that environment's slot array
+
+        Variables that aren't found in any local scope get depth None,
+        and are looked up by name in the globals at runtime.
+
+        Blocks that don't declare anything get size 0, and the Interpreter
+        doesn't create an Environment for them, so they don't count towards depth
+
+        Loops shaped like 'i < bound; i = i + step', where the body doesn't assign i,
+        bound or step, get counted set, the Interpreter runs those as a Python loop
+    '''
+    def __init__(self, error_handler: ErrorHandler):
+        self.error_handler = error_handler
+
+        #each scope maps variable name -> slot
+        self.scopes = []
+        #number of slots used in each scope
+        self.sizes = []
+
+        #for checking return/break/continue are somewhere they make sense
+        self.in_function = False
+        self.loop_depth = 0
+
+        #(id of scope, name) -> assignments to that local resolved so far
+        self.assignments = Counter()
+
+    def resolve(self, statements: List[Stmt]):
+        for statement in statements:
+            self.resolveNode(statement)
+
+    def resolveNode(self, node):
+        node.accept(self)
+
+    def declares(self, statements: List[Stmt]) -> bool:
+        '''
+            Does this list of statements directly declare any variables or functions?
+        '''
+        return any(isinstance(statement, (Var, Function)) for statement in statements)
+
+    def declare(self, name: str):
+        '''
+            Returns the slot for 'name' in the innermost scope, or None for globals.
+            Redeclaring a variable in the same scope reuses its slot
+        '''
+        if not self.scopes:
+            return None
+
+        scope = self.scopes[-1]
+        if name not in scope:
+            scope[name] = self.sizes[-1]
+            self.sizes[-1] += 1
+
+        return scope[name]
+
+    def beginScope(self):
+        self.scopes.append({})
+        self.sizes.append(0)
+
+    def endScope(self) -> int:
+        '''
+            Returns the number of slots the scope needs
+        '''
+        self.scopes.pop()
+        return self.sizes.pop()
+
+    def localKey(self, name: str):
+        '''
+            Key into 'assignments' for the local 'name' refers to here, None for globals
+        '''
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return (id(scope), name)
+
+        return None
+
+    def countedLoopLocals(self, stmt: While):
+        '''
+            Keys of the locals a loop like 'i < bound; i = i + step' reads, i first, or
+            None if the loop isn't like that. bound and step can be numbers or locals
+        '''
+        condition, increment = stmt.condition, stmt.increment
+
+        if not (isinstance(condition, Binary) and condition.operator.tokentype in COUNTED_COMPARISONS
+                and isinstance(increment, Assign) and isinstance(increment.value, Binary)
+                and increment.value.operator.tokentype in (TokenType.PLUS, TokenType.MINUS)):
+            return None
+
+        counter = increment.name.lexeme
+        names = [counter]
+
+        for operand in (condition.left, increment.value.left):
+            if not (isinstance(operand, Variable) and operand.name.lexeme == counter):
+                return None
+
+        for operand in (condition.right, increment.value.right):
+            if isinstance(operand, Variable):
+                if operand.name.lexeme == counter:
+                    return None
+                names.append(operand.name.lexeme)
+
+            elif not (isinstance(operand, Literal) and operand.value.__class__ is float):
+                return None
+
+        keys = [self.localKey(name) for name in names]
+        return None if None in keys else keys
+
+    def resolveLocal(self, expr: Expr, name: str):
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if name in scope:
+                expr.depth = depth
+                expr.slot = scope[name]
+                return
+
+        #not found, assume it's global
+        expr.depth = None
+        expr.slot = None
+
+    def visitAssignExpr(self, expr: Assign):
+        self.resolveNode(expr.value)
+        self.resolveLocal(expr, expr.name.lexeme)
+
+        if expr.depth is not None:
+            self.assignments[self.localKey(expr.name.lexeme)] += 1
+
+    def visitBinaryExpr(self, expr: Binary):
+        #a chain like 1 + 2 + ... + n nests to the left as deep as it's long,
+        #walked down with a loop so it doesn't recurse once per operand
+        rights = []
+        while isinstance(expr, Binary):
+            rights.append(expr.right)
+            expr = expr.left
+
+        self.resolveNode(expr)
+
+        for right in reversed(rights):
+            self.resolveNode(right)
+
+    def visitCallFunctionExpr(self, expr: CallFunction):
+        self.resolveNode(expr.callee)
+
+        for argument in expr.arguments:
+            self.resolveNode(argument)
+
+    def visitGroupingExpr(self, expr: Grouping):
+        self.resolveNode(expr.expression)
+
+    def visitIndexExpr(self, expr: Index):
+        self.resolveNode(expr.target)
+        self.resolveNode(expr.index)
+
+    def visitLiteralExpr(self, expr: Literal):
+        pass
+
+    def visitLogicalExpr(self, expr: Logical):
+        self.resolveNode(expr.left)
+        self.resolveNode(expr.right)
+
+    def visitSetIndexExpr(self, expr: SetIndex):
+        self.resolveNode(expr.target)
+        self.resolveNode(expr.index)
+        self.resolveNode(expr.value)
+
+    def visitUnaryExpr(self, expr: Unary):
+        self.resolveNode(expr.right)
+
+    def visitVariableExpr(self, expr: Variable):
+        self.resolveLocal(expr, expr.name.lexeme)
+
+    def visitBlockStmt(self, stmt: Block):
+        if not self.declares(stmt.statements):
+            stmt.size = 0
+            self.resolve(stmt.statements)
+            return
+
+        self.beginScope()
+        self.resolve(stmt.statements)
+        stmt.size = self.endScope()
+
+    def visitBreakStmt(self, stmt: Break):
+        if self.loop_depth == 0:
+            self.error_handler.errorOnToken(stmt.keyword, "Can't use 'break' outside of a loop")
+
+    def visitContinueStmt(self, stmt: Continue):
+        if self.loop_depth == 0:
+            self.error_handler.errorOnToken(stmt.keyword, "Can't use 'continue' outside of a loop")
+
+    def visitExpressionStmt(self, stmt: Expression):
+        self.resolveNode(stmt.expression)
+
+    def visitFunctionStmt(self, stmt: Function):
+        stmt.slot = self.declare(stmt.name.lexeme)
+
+        #functions only close over the globals, so the body can't see
+        #any of the scopes surrounding the declaration
+        enclosing_scopes, enclosing_sizes = self.scopes, self.sizes
+        self.scopes, self.sizes = [], []
+        self.beginScope()
+
+        #a loop around the declaration doesn't count inside the body
+        enclosing_function, enclosing_loop_depth = self.in_function, self.loop_depth
+        self.in_function, self.loop_depth = True, 0
+
+        #parameters take up the first slots, in order. A repeated parameter name
+        #still gets its own slot, the last one wins like it would with define()
+        for slot, param in enumerate(stmt.params):
+            self.scopes[-1][param.lexeme] = slot
+        self.sizes[-1] = len(stmt.params)
+
+        #the body shares its environment with the parameters
+        self.resolve(stmt.body)
+
+        stmt.size = self.endScope()
+        self.scopes, self.sizes = enclosing_scopes, enclosing_sizes
+        self.in_function, self.loop_depth = enclosing_function, enclosing_loop_depth
+
+    def visitIfStmt(self, stmt: If):
+        self.resolveNode(stmt.condition)
+        self.resolveNode(stmt.thenBranch)
+
+        if stmt.elseBranch is not None:
+            self.resolveNode(stmt.elseBranch)
+
+    def visitPrintStmt(self, stmt: Print):
+        self.resolveNode(stmt.expression)
+
+    def visitReturnStmt(self, stmt: Return):
+        if not self.in_function:
+            self.error_handler.errorOnToken(stmt.keyword, "Can't return from top-level code")
+
+        if stmt.value is not None:
+            self.resolveNode(stmt.value)
+
+    def visitVarStmt(self, stmt: Var):
+        #initializer is resolved before the name is declared, so that
+        #'var b = b + 20;' still reads the 'b' from the enclosing scope
+        if stmt.initializer is not None:
+            self.resolveNode(stmt.initializer)
+
+        stmt.slot = self.declare(stmt.name.lexeme)
+
+    def visitWhileStmt(self, stmt: While):
+        self.resolveNode(stmt.condition)
+
+        keys = self.countedLoopLocals(stmt)
+        if keys is not None:
+            before = [self.assignments[key] for key in keys]
+
+        self.loop_depth += 1
+        self.resolveNode(stmt.body)
+        self.loop_depth -= 1
+
+        stmt.counted = keys is not None and before == [self.assignments[key] for key in keys]
+
+        if stmt.increment is not None:
+            self.resolveNode(stmt.increment)
@@ -0,0 +1,82 @@
+'''
+    Lazy strings for '+', so building a string up in a loop doesn't copy everything
+    built so far on every iteration.
+
+    Concatenating two short strings still makes a plain str. Once the result is long
+    enough it becomes a Rope, the list of pieces it was made of, and appending to that
+    is a list append. The text is only joined when something needs it: printing,
+    comparing, hashing or passing it to a native function.
+
+    A Rope is equal to the str with the same text, so the engines can hand either to
+    '==' and get the same answer as before. Like NumArray.py, nothing in here depends
+    on the interpreter, the Transpiler copies this module into the Python it generates
+'''
+
+#results shorter than this are plain strings, copying them is cheaper than keeping pieces
+ROPE_MIN = 128
+
+
+class Rope:
+    '''
+        The text is "".join(parts[:count]). 'parts' is shared with the Rope this one was
+        appended to, so appending to the newest Rope of a chain only appends to the list.
+        Appending to an older one copies its parts first, the newer ones keep theirs
+    '''
+    __slots__ = ("parts", "count", "text")
+
+    def __init__(self, parts: list, count: int):
+        self.parts = parts
+        self.count = count
+        #the joined text once something asked for it
+        self.text = None
+
+    def append(self, string: str) -> "Rope":
+        parts = self.parts
+
+        if len(parts) != self.count:
+            parts = parts[:self.count]
+
+        parts.append(string)
+        return Rope(parts, self.count + 1)
+
+    def __str__(self):
+        if self.text is None:
+            parts = self.parts
+            self.text = "".join(parts if len(parts) == self.count else parts[:self.count])
+
+        return self.text
+
+    def __eq__(self, other):
+        if other.__class__ is Rope or other.__class__ is str:
+            return str(self) == str(other)
+
+        return False
+
+    def __hash__(self):
+        return hash(str(self))
+
+
+#what '+' accepts as a string
+STRINGS = (str, Rope)
+
+
+def concat(left, right):
+    '''
+        left + right for two strings, either of which can be a Rope
+    '''
+    if left.__class__ is Rope:
+        return left.append(str(right))
+
+    right = str(right)
+
+    if len(left) + len(right) < ROPE_MIN:
+        return left + right
+
+    return Rope([left, right], 2)
+
+
+def flatten(values: list) -> list:
+    '''
+        'values' with every Rope joined into a str, for natives
+    '''
+    return [str(value) if value.__class__ is Rope else value for value in values]
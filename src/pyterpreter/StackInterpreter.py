@@ -0,0 +1,546 @@
+from typing import List
+from inspect import isawaitable
+from operator import add, sub, mul, lt, le, gt, ge, eq, ne
+
+from Expr import *
+from Stmt import *
+from TokenType import *
+from ErrorHandler import *
+from RuntimeError_ import *
+from Environment import *
+from Callable import Callable
+from FunctionCallable import FunctionCallable
+from Natives import NativeError, indexGet, indexSet
+from Completion import BREAK, CONTINUE, RETURN
+from Interpreter import Interpreter
+
+'''
+    Tree-walking without Python recursion growing with the program's call depth.
+
+    The Interpreter's visitors recurse in Python for every node, and a call to a .pr function
+    adds about a dozen Python frames, so recursion some 80 calls deep already hits Python's
+    recursion limit. Here run() pops work off a list instead: nodes still to be evaluated
+    or executed, and continuations, what's left to do for a node once its operands are on
+    the value stack. A call pushes a frame and the function's body, so how deep .pr
+    functions can recurse only depends on MAX_FRAMES.
+
+    Nodes without a call anywhere inside them can't go deeper than the source nests, those
+    still go through the Interpreter's visitors, quickening and counted loops included
+'''
+
+#work items: nodes stand for themselves, continuations are (kind, node) tuples. Literals,
+#variables, function declarations, break and continue never have a call in them
+BINARY, LOGICAL, UNARY, GROUPING, ASSIGN, CALL, INDEX, SET_INDEX = range(8)
+EXPRESSION, PRINT, VAR, BLOCK, IF, WHILE, RETURN_STMT, BREAK_STMT, CONTINUE_STMT = range(8, 17)
+
+(APPLY_BINARY, APPLY_LOGICAL, APPLY_UNARY, APPLY_ASSIGN, CHECK_CALLEE, APPLY_CALL, INVOKE, END_CALL, APPLY_INDEX,
+ APPLY_SET_INDEX, POP, APPLY_PRINT, APPLY_VAR, RESTORE, BRANCH, TEST, NEXT, END_LOOP, APPLY_RETURN, VISIT_LOOP) = range(17, 37)
+
+#node class -> what kind of work it is, quickened forms are the same work as their node
+KINDS = {
+    Binary: BINARY, Logical: LOGICAL, Unary: UNARY, Grouping: GROUPING, Assign: ASSIGN,
+    CallFunction: CALL, Index: INDEX, SetIndex: SET_INDEX,
+    Expression: EXPRESSION, Print: PRINT, Var: VAR, Block: BLOCK, If: IF, While: WHILE, Return: RETURN_STMT,
+}
+
+for node_class in list(KINDS):
+    for form in node_class.__subclasses__():
+        KINDS[form] = KINDS[node_class]
+
+#continuations that don't need a node
+POP_VALUE = (POP, None)
+END_CALL_FRAME = (END_CALL, None)
+END_LOOP_FRAME = (END_LOOP, None)
+
+#operators with nothing to check when both operands are numbers. '/' still has to check for 0
+FLOAT_OPERATIONS = {
+    TokenType.PLUS: add,
+    TokenType.MINUS: sub,
+    TokenType.STAR: mul,
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge,
+    TokenType.EQUAL_EQUAL: eq,
+    TokenType.BANG_EQUAL: ne,
+}
+
+
+def containsAny(node, classes: tuple) -> bool:
+    '''
+        True if there's a node of one of 'classes' in 'node'. Not looking inside function
+        declarations, declaring a function doesn't run its body
+    '''
+    stack = [node]
+
+    while stack:
+        node = stack.pop()
+
+        if node.__class__ is list:
+            stack.extend(node)
+        elif node.__class__ in classes:
+            return True
+        elif isinstance(node, (Expr, Stmt)) and node.__class__ is not Function:
+            stack.extend(getattr(node, field) for field in node.__match_args__)
+
+    return False
+
+
+#how run() handles a node without STACKED_NODES in it, and a call whose callee and arguments
+#don't have any, those are evaluated right away. Other nodes are handled as their KINDS, or
+#as VISIT_LOOP for a While that is only stacked itself
+VISIT_EXPR, VISIT_STMT, DIRECT_CALL = range(-3, 0)
+
+
+class StackInterpreter(Interpreter):
+    '''
+        Interpreter running everything with a call in it through run()'s work and value stacks.
+        Operators that aren't on two numbers go through the Interpreter's binaryOperation(),
+        natives get called like they are there
+    '''
+    #calls to .pr functions that can be in progress at once, --max-frames changes it
+    MAX_FRAMES = 100000
+
+    #nodes that can't be left to the visitors when they're anywhere in a statement or expression
+    STACKED_NODES = (CallFunction,)
+
+    def __init__(self, error_handler: ErrorHandler):
+        super().__init__(error_handler)
+
+        #node -> VISIT_EXPR, VISIT_STMT, DIRECT_CALL or its kind, worked out the first time it runs
+        self.handling = {}
+
+    def interpret(self, statements: List[Stmt]):
+        try:
+            self.run(list(reversed(statements)), self.globals)
+        except RuntimeError_ as e:
+            self.error_handler.runtimeError(e)
+
+    def executeBlock(self, statements: List[Stmt], environment: Environment):
+        '''
+            For blocks the visitors execute, and for FunctionCallable.call() when a native
+            like memoize() calls a .pr function. Statements with a call in them go through
+            run(), the rest are visited like Interpreter.executeBlock() does
+        '''
+        previous = self.environment
+        handling = self.handling
+
+        try:
+            for statement in statements:
+                how = handling.get(statement)
+                if how is None:
+                    how = handling[statement] = self.handle(statement)
+
+                self.environment = environment
+
+                if how == VISIT_STMT:
+                    completion = statement.accept(self)
+                else:
+                    completion = self.run([statement], environment)
+
+                if completion is not None:
+                    return completion
+
+            return None
+        finally:
+            self.environment = previous
+
+    def run(self, todo: list, env: Environment):
+        '''
+            Work through 'todo' in 'env', last item first, in one go. Returns the Completion
+            of a return/break/continue that isn't for a call or loop started in here
+        '''
+        try:
+            #without a budget steps() doesn't stop until it's done
+            next(self.steps(todo, env))
+        except StopIteration as done:
+            return done.value
+
+    def steps(self, todo: list, env: Environment, budget: int=None):
+        '''
+            Generator doing the work of run(). With a 'budget' it yields None every 'budget'
+            loop iterations and calls, the only things that can repeat, and yields what a
+            native returned if that's awaitable, to be sent the result. Returns what run() does
+        '''
+        turns = budget
+        values = []
+        push = values.append
+        pop = values.pop
+        work = todo.append
+
+        #(todo height, environment, loops height) of every call in progress
+        frames = []
+        #(todo height, environment, While) of every loop in progress
+        loops = []
+
+        globals_ = self.globals
+        handling = self.handling
+        float_operations = FLOAT_OPERATIONS
+        binaryOperation = self.binaryOperation
+        float_ = float
+        tuple_ = tuple
+
+        #the next item when it's known already, saves putting it on 'todo' just to pop it
+        following = None
+
+        while True:
+            if following is None:
+                if not todo:
+                    break
+                item = todo.pop()
+            else:
+                item = following
+                following = None
+
+            if item.__class__ is tuple_:
+                kind, node = item
+            else:
+                node = item
+                kind = handling.get(node)
+                if kind is None:
+                    kind = handling[node] = self.handle(node)
+
+                if kind == VISIT_EXPR:
+                    self.environment = env
+                    push(node.accept(self))
+                    continue
+
+                if kind == VISIT_STMT:
+                    self.environment = env
+                    completion = node.accept(self)
+
+                    if completion is None:
+                        continue
+
+                    #carry on below like the stacked statement would have
+                    if completion is RETURN:
+                        push(self.return_value)
+                        self.return_value = None
+                        kind = APPLY_RETURN
+                    else:
+                        kind = BREAK_STMT if completion is BREAK else CONTINUE_STMT
+
+                elif kind == DIRECT_CALL:
+                    self.environment = env
+
+                    #the same inline cache as Interpreter.visitCallFunctionExpr()
+                    if node.cacheVersion == Environment.version and node.cachedGlobals is self.globals:
+                        callee = node.cachedCallee
+                    else:
+                        version = Environment.version
+                        callee = node.callee.accept(self)
+
+                        if not isinstance(callee, Callable):
+                            raise RuntimeError_(node.parenLoc, "Can only use call syntax on functions and classes")
+
+                        self.cacheCallee(node, callee, version)
+
+                    arguments = [argument.accept(self) for argument in node.arguments]
+                    kind = INVOKE
+
+            if kind == APPLY_CALL:
+                #the callee and arguments went through the value stack
+                start = len(values) - len(node.arguments)
+                arguments = values[start:]
+                callee = values[start - 1]
+                del values[start - 1:]
+                kind = INVOKE
+
+            if kind == INVOKE:
+                count = len(arguments)
+
+                if callee.__class__ is FunctionCallable:
+                    declaration = callee.declaration
+
+                    if len(declaration.params) != count:
+                        raise RuntimeError_(node.parenLoc, f"Expected {len(declaration.params)} arguments but got {count}")
+
+                    if len(frames) >= self.MAX_FRAMES:
+                        raise RuntimeError_(node.parenLoc, "Stack overflow")
+
+                    frames.append((len(todo), env, len(loops)))
+                    work(END_CALL_FRAME)
+
+                    env = Environment(enclosing=globals_, size=declaration.size)
+                    env.slots[:count] = arguments
+                    todo.extend(reversed(declaration.body))
+
+                    if budget is not None:
+                        turns -= 1
+                        if turns == 0:
+                            turns = budget
+                            yield None
+
+                else:
+                    if callee.arity() != count:
+                        raise RuntimeError_(node.parenLoc, f"Expected {callee.arity()} arguments but got {count}")
+
+                    self.environment = env
+
+                    try:
+                        value = callee.call(self, arguments)
+
+                        if isawaitable(value):
+                            if budget is None:
+                                value.close()
+                                raise NativeError(f"{callee} can only be called when running asynchronously")
+
+                            value = yield value
+
+                        push(value)
+                    except NativeError as e:
+                        raise RuntimeError_(node.parenLoc, str(e))
+
+            elif kind == APPLY_BINARY:
+                right = pop()
+                left = values[-1]
+
+                if left.__class__ is float_ and right.__class__ is float_:
+                    operation = float_operations.get(node.operator.tokentype)
+                    if operation is not None:
+                        values[-1] = operation(left, right)
+                        continue
+
+                values[-1] = binaryOperation(node, left, right)
+
+            elif kind == BINARY:
+                work((APPLY_BINARY, node))
+                work(node.right)
+                following = node.left
+
+            elif kind == RETURN_STMT:
+                work((APPLY_RETURN, node))
+                following = node.value
+
+            elif kind == APPLY_RETURN:
+                if not frames:
+                    self.return_value = pop()
+                    return RETURN
+
+                height, env, loops_height = frames.pop()
+                del todo[height:]
+                del loops[loops_height:]
+
+            elif kind == END_CALL:
+                #the body ran to its end without a return
+                _, env, _ = frames.pop()
+                push(None)
+
+            elif kind == EXPRESSION:
+                work(POP_VALUE)
+                following = node.expression
+
+            elif kind == POP:
+                pop()
+
+            elif kind == IF:
+                condition = node.condition
+
+                if handling.get(condition) != VISIT_EXPR:
+                    work((BRANCH, node))
+                    work(condition)
+                    continue
+
+                #a condition without calls is evaluated right away, like the visitors do
+                self.environment = env
+                condition = condition.accept(self)
+
+                if condition is not None and condition is not False:
+                    work(node.thenBranch)
+                elif node.elseBranch is not None:
+                    work(node.elseBranch)
+
+            elif kind == BRANCH:
+                condition = pop()
+
+                if condition is not None and condition is not False:
+                    work(node.thenBranch)
+                elif node.elseBranch is not None:
+                    work(node.elseBranch)
+
+            elif kind == BLOCK:
+                if node.size != 0:
+                    work((RESTORE, env))
+                    env = Environment(enclosing=env, size=node.size)
+
+                todo.extend(reversed(node.statements))
+
+            elif kind == RESTORE:
+                env = node
+
+            elif kind == CALL:
+                #callee, then it gets checked, then the arguments left to right, then the call
+                work((APPLY_CALL, node))
+                todo.extend(reversed(node.arguments))
+                work((CHECK_CALLEE, node))
+                work(node.callee)
+
+            elif kind == CHECK_CALLEE:
+                if not isinstance(values[-1], Callable):
+                    raise RuntimeError_(node.parenLoc, "Can only use call syntax on functions and classes")
+
+            elif kind == WHILE:
+                work(END_LOOP_FRAME)
+                loops.append((len(todo), env, node))
+                work((TEST, node))
+                work(node.condition)
+
+            elif kind == TEST:
+                condition = pop()
+
+                if condition is not None and condition is not False:
+                    work((NEXT, node))
+                    work(node.body)
+
+                    if budget is not None:
+                        turns -= 1
+                        if turns == 0:
+                            turns = budget
+                            yield None
+
+            elif kind == NEXT:
+                work((TEST, node))
+                work(node.condition)
+
+                if node.increment is not None:
+                    work(POP_VALUE)
+                    work(node.increment)
+
+            elif kind == END_LOOP:
+                loops.pop()
+
+            elif kind == VISIT_LOOP:
+                #Interpreter.whileLoop(), taking its turns from the budget
+                condition, body, increment = node.condition, node.body, node.increment
+                self.environment = env
+
+                while True:
+                    value = condition.accept(self)
+                    if value is None or value is False:
+                        break
+
+                    completion = body.accept(self)
+
+                    if completion is BREAK:
+                        break
+                    if completion is RETURN:
+                        push(self.return_value)
+                        self.return_value = None
+                        work((APPLY_RETURN, node))
+                        break
+
+                    if increment is not None:
+                        increment.accept(self)
+
+                    if budget is not None:
+                        turns -= 1
+                        if turns == 0:
+                            turns = budget
+                            yield None
+                            self.environment = env
+
+            elif kind == BREAK_STMT:
+                if not loops:
+                    return BREAK
+
+                #back to the loop's END_LOOP, in the environment the loop started in
+                height, env, _ = loops[-1]
+                del todo[height:]
+
+            elif kind == CONTINUE_STMT:
+                if not loops:
+                    return CONTINUE
+
+                height, env, loop = loops[-1]
+                del todo[height:]
+                work((NEXT, loop))
+
+            elif kind == VAR:
+                work((APPLY_VAR, node))
+                work(node.initializer)
+
+            elif kind == APPLY_VAR:
+                self.environment = env
+                self.declare(node.slot, node.name.lexeme, pop())
+
+            elif kind == PRINT:
+                work((APPLY_PRINT, node))
+                work(node.expression)
+
+            elif kind == APPLY_PRINT:
+                print(self.stringify(pop()))
+
+            elif kind == ASSIGN:
+                work((APPLY_ASSIGN, node))
+                work(node.value)
+
+            elif kind == APPLY_ASSIGN:
+                if node.depth is None:
+                    globals_.assign(node.name, values[-1])
+                else:
+                    env.assignAt(node.depth, node.slot, values[-1])
+
+            elif kind == LOGICAL:
+                work((APPLY_LOGICAL, node))
+                work(node.left)
+
+            elif kind == APPLY_LOGICAL:
+                left = values[-1]
+                truthy = left is not None and left is not False
+
+                if truthy == (node.operator.tokentype == TokenType.AND):
+                    pop()
+                    work(node.right)
+
+            elif kind == GROUPING:
+                work(node.expression)
+
+            elif kind == UNARY:
+                work((APPLY_UNARY, node))
+                work(node.right)
+
+            elif kind == APPLY_UNARY:
+                right = values[-1]
+
+                if node.operator.tokentype == TokenType.MINUS:
+                    self.checkNumberOperands(node.operator, right)
+                    values[-1] = -right
+                else:
+                    values[-1] = right is None or right is False
+
+            elif kind == INDEX:
+                work((APPLY_INDEX, node))
+                work(node.index)
+                work(node.target)
+
+            elif kind == APPLY_INDEX:
+                index = pop()
+                values[-1] = indexGet(node.bracket, values[-1], index)
+
+            elif kind == SET_INDEX:
+                work((APPLY_SET_INDEX, node))
+                work(node.value)
+                work(node.index)
+                work(node.target)
+
+            elif kind == APPLY_SET_INDEX:
+                value = pop()
+                index = pop()
+                values[-1] = indexSet(node.bracket, values[-1], index, value)
+
+        return None
+
+    def handle(self, node) -> int:
+        stacked = self.STACKED_NODES
+
+        if containsAny(node, stacked):
+            if (node.__class__ is CallFunction and not containsAny(node.callee, stacked)
+                    and not containsAny(node.arguments, stacked)):
+                return DIRECT_CALL
+
+            if node.__class__ is While and not containsAny([node.condition, node.body, node.increment], stacked):
+                return VISIT_LOOP
+
+            return KINDS[node.__class__]
+
+        return VISIT_EXPR if isinstance(node, Expr) else VISIT_STMT
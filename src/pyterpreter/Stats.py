@@ -0,0 +1,148 @@
+import sys
+import json
+from collections import Counter
+from contextlib import contextmanager
+from time import perf_counter
+
+from Expr import *
+from Stmt import *
+from ErrorHandler import *
+from Environment import *
+from Callable import Callable
+from Natives import Memoized
+from FunctionCallable import FunctionCallable
+from Interpreter import Interpreter
+
+'''
+    Counters for --stats.
+
+    The counting lives in StatsInterpreter, a subclass of the Interpreter that Preter only
+    uses when --stats is given. The plain Interpreter has no counters and no checks for
+    whether they're on, so it runs exactly as fast as before
+'''
+
+class Stats:
+    def __init__(self):
+        #phase -> seconds
+        self.phases = Counter()
+        #node class -> evaluate()/execute() calls
+        self.visits = Counter()
+        #how many environments up a variable was found, None for globals
+        self.depths = Counter()
+        #"block"/"call" -> Environments allocated
+        self.environments = Counter()
+        #function name -> calls
+        self.calls = Counter()
+        #"hit"/"miss" -> calls that did/didn't find their callee in the call site's inline cache
+        self.call_cache = Counter()
+        #global name -> Memoized cache statistics, filled in at the end of the run
+        self.memoized = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += perf_counter() - start
+
+    def toDict(self) -> dict:
+        return {
+            "phases": dict(self.phases),
+            "visits": {cls.__name__: count for cls, count in self.visits.most_common()},
+            "depths": {("global" if depth is None else str(depth)): count for depth, count in self.sortedDepths()},
+            "environments": dict(self.environments),
+            "calls": dict(self.calls.most_common()),
+            "call cache": dict(self.call_cache),
+            "memoized": dict(self.memoized),
+        }
+
+    def collectMemoized(self, globals: Environment):
+        for name, value in globals.values.items():
+            if isinstance(value, Memoized):
+                self.memoized[name] = value.statsDict()
+
+    def sortedDepths(self):
+        #globals first, then locals from the innermost scope out
+        return sorted(self.depths.items(), key=lambda item: -1 if item[0] is None else item[0])
+
+    def writeJSON(self, path: str):
+        with open(path, mode='w', encoding='utf-8') as f:
+            json.dump(self.toDict(), f, indent=4)
+
+    def report(self, file=sys.stderr):
+        stats = self.toDict()
+
+        sections = [
+            ("phase", {name: f"{seconds:.4f}s" for name, seconds in stats["phases"].items()}),
+            ("node visits", stats["visits"]),
+            ("variable depth", stats["depths"]),
+            ("environments", stats["environments"]),
+            ("calls", stats["calls"]),
+            ("call cache", stats["call cache"]),
+            ("memoized", {name: ", ".join(f"{key} {count}" for key, count in counts.items())
+                          for name, counts in stats["memoized"].items()}),
+        ]
+
+        for title, values in sections:
+            if not values:
+                continue
+
+            print(f"{title}:", file=file)
+            width = max(len(name) for name in values)
+
+            for name, value in values.items():
+                print(f"    {name:<{width}}  {value:>12}", file=file)
+
+
+class StatsInterpreter(Interpreter):
+    '''
+        Interpreter counting what it does into a Stats
+    '''
+    def __init__(self, error_handler: ErrorHandler, stats: Stats=None):
+        super().__init__(error_handler)
+        self.stats = Stats() if stats is None else stats
+
+    def evaluate(self, expr: Expr):
+        self.stats.visits[expr.__class__] += 1
+
+        #the inline cache hits, counted here rather than around visitCallFunctionExpr() so every
+        #call doesn't cost a Python frame more than without --stats. lookupCall() sees the misses
+        if expr.__class__ is CallFunction and expr.cacheVersion == Environment.version \
+                and expr.cachedGlobals is self.globals:
+            self.stats.call_cache["hit"] += 1
+            self.countCall(expr.cachedCallee)
+
+        return expr.accept(self)
+
+    def execute(self, stmt: Stmt):
+        self.stats.visits[stmt.__class__] += 1
+        return stmt.accept(self)
+
+    def visitVariableExpr(self, expr: Variable):
+        self.stats.depths[expr.depth] += 1
+        return super().visitVariableExpr(expr)
+
+    def visitAssignExpr(self, expr: Assign):
+        self.stats.depths[expr.depth] += 1
+        return super().visitAssignExpr(expr)
+
+    def visitBlockStmt(self, stmt: Block):
+        if stmt.size != 0:
+            self.stats.environments["block"] += 1
+
+        return super().visitBlockStmt(stmt)
+
+    def lookupCall(self, expr: CallFunction) -> tuple:
+        self.stats.call_cache["miss"] += 1
+        callee, arguments = super().lookupCall(expr)
+        self.countCall(callee)
+        return callee, arguments
+
+    def countCall(self, callee: Callable):
+        if isinstance(callee, FunctionCallable):
+            self.stats.calls[callee.declaration.name.lexeme] += 1
+            #FunctionCallable.call() makes one for the parameters and body
+            self.stats.environments["call"] += 1
+        else:
+            self.stats.calls[str(callee)] += 1
@@ -2,17 +2,44 @@ from abc import ABC, abstractmethod
 from Token import *
 
 class Stmt:
-    pass
+    __slots__ = ()
 
 
 class Block(Stmt):
+    __slots__ = ("statements", "size")
+    __match_args__ = ("statements",)
+
     def __init__(self, statements):
         self.statements = statements
+        self.size = None
 
     def accept(self, visitor):
         return visitor.visitBlockStmt(self)
 
+class Break(Stmt):
+    __slots__ = ("keyword",)
+    __match_args__ = ("keyword",)
+
+    def __init__(self, keyword):
+        self.keyword = keyword
+
+    def accept(self, visitor):
+        return visitor.visitBreakStmt(self)
+
+class Continue(Stmt):
+    __slots__ = ("keyword",)
+    __match_args__ = ("keyword",)
+
+    def __init__(self, keyword):
+        self.keyword = keyword
+
+    def accept(self, visitor):
+        return visitor.visitContinueStmt(self)
+
 class Expression(Stmt):
+    __slots__ = ("expression",)
+    __match_args__ = ("expression",)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -20,15 +47,23 @@ class Expression(Stmt):
         return visitor.visitExpressionStmt(self)
 
 class Function(Stmt):
+    __slots__ = ("name", "params", "body", "slot", "size")
+    __match_args__ = ("name", "params", "body")
+
     def __init__(self, name, params, body):
         self.name = name
         self.params = params
         self.body = body
+        self.slot = None
+        self.size = None
 
     def accept(self, visitor):
         return visitor.visitFunctionStmt(self)
 
 class If(Stmt):
+    __slots__ = ("condition", "thenBranch", "elseBranch")
+    __match_args__ = ("condition", "thenBranch", "elseBranch")
+
     def __init__(self, condition, thenBranch, elseBranch):
         self.condition = condition
         self.thenBranch = thenBranch
@@ -38,24 +73,47 @@ class If(Stmt):
         return visitor.visitIfStmt(self)
 
 class Print(Stmt):
+    __slots__ = ("expression",)
+    __match_args__ = ("expression",)
+
     def __init__(self, expression):
         self.expression = expression
 
     def accept(self, visitor):
         return visitor.visitPrintStmt(self)
 
+class Return(Stmt):
+    __slots__ = ("keyword", "value")
+    __match_args__ = ("keyword", "value")
+
+    def __init__(self, keyword, value):
+        self.keyword = keyword
+        self.value = value
+
+    def accept(self, visitor):
+        return visitor.visitReturnStmt(self)
+
 class Var(Stmt):
+    __slots__ = ("name", "initializer", "slot")
+    __match_args__ = ("name", "initializer")
+
     def __init__(self, name, initializer):
         self.name = name
         self.initializer = initializer
+        self.slot = None
 
     def accept(self, visitor):
         return visitor.visitVarStmt(self)
 
 class While(Stmt):
-    def __init__(self, condition, body):
+    __slots__ = ("condition", "body", "increment", "counted")
+    __match_args__ = ("condition", "body", "increment")
+
+    def __init__(self, condition, body, increment):
         self.condition = condition
         self.body = body
+        self.increment = increment
+        self.counted = None
 
     def accept(self, visitor):
         return visitor.visitWhileStmt(self)
@@ -1,6 +1,10 @@
 from TokenType import TokenType
 
 class Token(object):
+    #one of these per token, keep them small
+    __slots__ = ("tokentype", "lexeme", "literal", "line")
+    __match_args__ = ("tokentype", "lexeme", "literal", "line")
+
     def __init__(self, tokentype: int, lexeme: str, literal: object, line: int):
         self.tokentype = tokentype
         self.lexeme = lexeme
@@ -0,0 +1,254 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterator
+
+from TokenType import *
+from Token import *
+from RegexScanner import RegexScanner
+
+'''
+    Token storage without a Python object per token.
+
+    A TokenStore keeps four parallel arrays of C ints: token type, start offset into the
+    source, length and literal index, so a token costs 16 bytes however big the script is.
+    Lexemes are sliced out of the source, and line numbers looked up in an index of
+    newline offsets, only when someone asks for them.
+
+    TokenStoreParser (in Parser.py) reads the arrays directly and only makes Token objects
+    for the tokens the AST or an error message keeps. Anything else can still index or
+    iterate a TokenStore like a list of Tokens
+'''
+
+#TokenType values back to their TokenType
+TOKEN_TYPES = {tokentype.value: tokentype for tokentype in TokenType}
+
+#literal index of tokens without a literal
+NO_LITERAL = -1
+
+
+class TokenStore:
+    def __init__(self, source: str):
+        self.source = source
+
+        self.types = array('i')
+        self.starts = array('i')
+        self.lengths = array('i')
+        self.literals = array('i')
+
+        #literal values, shared by all tokens spelling the same number or string
+        self.literal_values = []
+        self.literal_ids = {}
+
+        #offsets of every '\n' in source, built the first time a line is needed
+        self.newlines = None
+
+    def append(self, tokentype: TokenType, start: int, length: int, literal=None):
+        self.types.append(tokentype.value)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.literals.append(self.literalIndex(literal))
+
+    def literalIndex(self, literal) -> int:
+        if literal is None:
+            return NO_LITERAL
+
+        index = self.literal_ids.get(literal)
+        if index is None:
+            index = self.literal_ids[literal] = len(self.literal_values)
+            self.literal_values.append(literal)
+
+        return index
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+
+        return self.token(index)
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.types)):
+            yield self.token(index)
+
+    def token(self, index: int) -> Token:
+        '''
+            Token object for the token at 'index', same as the list scanners would give
+        '''
+        return Token(self.tokentype(index), self.lexeme(index), self.literal(index), self.line(index))
+
+    def tokentype(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        start = self.starts[index]
+        return self.source[start: start + self.lengths[index]]
+
+    def literal(self, index: int):
+        literal = self.literals[index]
+        return None if literal == NO_LITERAL else self.literal_values[literal]
+
+    def lineIndex(self) -> array:
+        if self.newlines is None:
+            newlines = array('i')
+            source = self.source
+            position = source.find('\n')
+
+            while position != -1:
+                newlines.append(position)
+                position = source.find('\n', position + 1)
+
+            self.newlines = newlines
+
+        return self.newlines
+
+    def line(self, index: int) -> int:
+        #the scanners give a token the line it ends on, that only matters for strings
+        end = self.starts[index] + self.lengths[index]
+        last = end - 1 if end > self.starts[index] else end
+
+        return bisect_left(self.lineIndex(), last) + 1
+
+    def column(self, index: int) -> int:
+        '''
+            1 based column the token starts at
+        '''
+        start = self.starts[index]
+        newlines = self.lineIndex()
+        line = bisect_left(newlines, start)
+
+        if line == 0:
+            return start + 1
+
+        return start - newlines[line - 1]
+
+
+class StoreScanner(RegexScanner):
+    '''
+        RegexScanner filling a TokenStore instead of making Token objects
+    '''
+    def scanTokens(self) -> TokenStore:
+        store = TokenStore(self.source)
+
+        source = self.source
+        end = len(source)
+        match = self.token_re.match
+
+        #the store's arrays, appended to directly
+        types = store.types.append
+        starts = store.starts.append
+        lengths = store.lengths.append
+        literals = store.literals.append
+        literalIndex = store.literalIndex
+
+        keywords = {text: tokentype.value for text, tokentype in self.keywords.items()}
+        single_tokens = {c: tokentype.value for c, tokentype in self.single_tokens.items()}
+        single_tokens['/'] = TokenType.SLASH.value
+        operator_tokens = {}
+        for c, double_token in self.double_tokens.items():
+            operator_tokens[c] = double_token.single.value
+            operator_tokens[c + '='] = double_token.double.value
+
+        IDENTIFIER = TokenType.IDENTIFIER.value
+        NUMBER = TokenType.NUMBER.value
+        STRING = TokenType.STRING.value
+
+        position = 0
+        line = self._line
+
+        while position < end:
+            m = match(source, position)
+            kind = m.lastgroup
+            after = m.end()
+
+            if kind is None:
+                #only whitespace, maybe followed by something the regex doesn't cover
+                position = after
+                if position >= end:
+                    break
+            else:
+                start = m.start(kind)
+
+                if kind == "identifier":
+                    if after >= end or source[after] < '\x80':
+                        types(keywords.get(m.group(kind), IDENTIFIER))
+                        starts(start)
+                        lengths(after - start)
+                        literals(NO_LITERAL)
+                        position = after
+                        continue
+
+                elif kind == "single":
+                    types(single_tokens[source[start]])
+                    starts(start)
+                    lengths(1)
+                    literals(NO_LITERAL)
+                    position = after
+                    continue
+
+                elif kind == "newline":
+                    line += 1
+                    position = after
+                    continue
+
+                elif kind == "number":
+                    #a non-ASCII digit right after could still be part of the number
+                    if (after >= end or source[after] < '\x80') and \
+                       (after + 1 >= end or source[after] != '.' or source[after + 1] < '\x80'):
+                        types(NUMBER)
+                        starts(start)
+                        lengths(after - start)
+                        literals(literalIndex(float(m.group(kind))))
+                        position = after
+                        continue
+
+                elif kind == "operator":
+                    types(operator_tokens[m.group(kind)])
+                    starts(start)
+                    lengths(after - start)
+                    literals(NO_LITERAL)
+                    position = after
+                    continue
+
+                elif kind == "line_comment":
+                    position = after
+                    continue
+
+                elif kind == "string":
+                    line += source.count('\n', start, after)
+                    types(STRING)
+                    starts(start)
+                    lengths(after - start)
+                    literals(literalIndex(source[start + 1: after - 1]))
+                    position = after
+                    continue
+
+                elif kind == "block_comment":
+                    close = source.find("*/", after)
+
+                    #Scanner.multilineComment() also stops at a NUL, leave those to it
+                    if close != -1 and source.find('\0', position, close + 2) == -1:
+                        line += source.count('\n', after, close)
+                        position = close + 2
+                        continue
+
+                position = start
+
+            #everything else goes through the character by character path
+            self._start = self._current = position
+            self._line = line
+            self.scanToken()
+            position = self._current
+            line = self._line
+
+            #scanToken() makes at most one token, spanning _start to _current
+            for token in self.tokens:
+                store.append(token.tokentype, self._start, self._current - self._start, token.literal)
+            self.tokens.clear()
+
+        self._current = position
+        self._line = line
+        store.append(TokenType.EOF, position, 0)
+
+        return store
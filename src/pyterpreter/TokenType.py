@@ -4,7 +4,7 @@ from enum import Enum
 #as singles, doubles, literals, keywords, EOF
 
 TokenType = Enum("TokenType",
-                 "LEFT_PAREN RIGHT_PAREN LEFT_BRACE RIGHT_BRACE \
+                 "LEFT_PAREN RIGHT_PAREN LEFT_BRACE RIGHT_BRACE LEFT_BRACKET RIGHT_BRACKET \
                   COMMA DOT MINUS PLUS SEMICOLON SLASH STAR \
                   BANG BANG_EQUAL \
                   EQUAL EQUAL_EQUAL \
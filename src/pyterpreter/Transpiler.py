@@ -0,0 +1,572 @@
+import math
+import inspect
+from typing import List
+
+import Rope
+import NumArray
+from Expr import *
+from Stmt import *
+from Visitor import *
+from TokenType import *
+
+'''
+    Ahead-of-time translation of resolved .pr programs to Python modules.
+
+    The generated module runs the program when executed, or exposes main() when imported:
+
+        $ python3 src/pyterpreter/preter.py --emit-python fib.py fib.pr
+        $ python3 fib.py
+
+    Mapping:
+        - globals become module globals named g_<name>
+        - locals become Python locals, named after the scope they were declared in,
+          so shadowing and block scoping keep working
+        - 'fun' declarations become real Python functions
+        - if/while/return/break/continue become native Python control flow. A for loop's
+          increment is emitted at the end of the body and before each 'continue'
+        - arithmetic and comparisons go through small helpers doing the same type
+          checks as the Interpreter
+
+    Runtime errors are reported with .pr line numbers through _LINES, a table mapping each
+    generated line to the line of the .pr statement it came from.
+
+    Arity is checked before the arguments are evaluated, unlike the Interpreter, which
+    only makes a difference to the output of a call that is about to fail anyway.
+
+    Generated modules don't import anything from the interpreter, Rope.py and NumArray.py
+    get copied into each of them for strings and arrays
+'''
+
+#replaced by the source of Rope.py and NumArray.py
+ROPE_RUNTIME = "#<Rope.py>\n"
+ARRAY_RUNTIME = "#<NumArray.py>\n"
+
+PRELUDE = '''\
+import sys
+from time import time as _time
+from collections import OrderedDict as _OrderedDict
+
+#string runtime, copied from Rope.py
+#<Rope.py>
+
+#array runtime, copied from NumArray.py
+#<NumArray.py>
+
+#runtime support, same semantics as the Interpreter
+
+class _PrError(Exception):
+    pass
+
+class _Clock:
+    pr_arity = 0
+
+    def __init__(self):
+        self.start_t = _time()
+
+    def __call__(self):
+        return _time() - self.start_t
+
+    def __str__(self):
+        return "<Native Function 'clock'>"
+
+class _Native:
+    def __init__(self, name, arity, fn):
+        self.pr_name = name
+        self.pr_arity = arity
+        self.fn = fn
+
+    def __call__(self, *arguments):
+        return self.fn(*flatten(arguments))
+
+    def __str__(self):
+        return f"<Native Function '{self.pr_name}'>"
+
+def _function(fn, name, arity):
+    fn.pr_name = name
+    fn.pr_arity = arity
+    return fn
+
+_FunctionType = type(_function)
+
+class _Memoized:
+    def __init__(self, fn, max_size):
+        self.fn = fn
+        self.pr_arity = fn.pr_arity
+        self.max_size = max_size
+        self.cache = _OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __call__(self, *arguments):
+        arguments = tuple(flatten(arguments))
+        classes = tuple(argument.__class__ for argument in arguments)
+        if not _KEY_CLASSES.issuperset(classes):
+            return self.fn(*arguments)
+
+        key = (classes, arguments)
+        cache = self.cache
+        if key in cache:
+            self.hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        self.misses += 1
+        value = cache[key] = self.fn(*arguments)
+        if self.max_size is not None and len(cache) > self.max_size:
+            cache.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def __str__(self):
+        return f"<Memoized {_stringify(self.fn)}>"
+
+_KEY_CLASSES = frozenset((float, str, bool, type(None)))
+
+class _Memoize:
+    pr_arity = 2
+
+    def __call__(self, fn, max_size):
+        if getattr(fn, "pr_arity", None) is None:
+            raise _PrError("memoize() needs a function")
+        if max_size is not None:
+            if max_size.__class__ is not float or max_size < 1 or max_size != int(max_size):
+                raise _PrError("memoize() size must be a positive whole number or nil")
+            max_size = int(max_size)
+        return _Memoized(fn, max_size)
+
+    def __str__(self):
+        return "<Native Function 'memoize'>"
+
+class _MemoStats:
+    pr_arity = 1
+
+    def __call__(self, fn):
+        if fn.__class__ is not _Memoized:
+            raise _PrError("memoStats() needs a memoized function")
+        return f"hits {fn.hits}, misses {fn.misses}, evictions {fn.evictions}, size {len(fn.cache)}"
+
+    def __str__(self):
+        return "<Native Function 'memoStats'>"
+
+def _stringify(thing):
+    if thing is None:
+        return "nil"
+    if thing.__class__ is _FunctionType:
+        return f"<Function '{thing.pr_name}'>"
+    return str(thing)
+
+def _callee(fn, count):
+    arity = getattr(fn, "pr_arity", None)
+    if arity is None:
+        raise _PrError("Can only use call syntax on functions and classes")
+    if arity != count:
+        raise _PrError(f"Expected {arity} arguments but got {count}")
+    return fn
+
+def _assigned(name, value):
+    if name not in _G:
+        raise _PrError(f"Undefined variable {name[2:]}")
+    return value
+
+def _numbers(a, b):
+    if a.__class__ is not float or b.__class__ is not float:
+        raise _PrError("Operands must be a number")
+
+def _add(a, b):
+    if a.__class__ is float and b.__class__ is float:
+        return a + b
+    if isinstance(a, STRINGS) and isinstance(b, STRINGS):
+        return concat(a, b)
+    return arithmetic("+", a, b, "Operands must be both numbers or both strings")
+
+def _sub(a, b):
+    if a.__class__ is float and b.__class__ is float:
+        return a - b
+    return arithmetic("-", a, b, "Operands must be a number")
+
+def _mul(a, b):
+    if a.__class__ is float and b.__class__ is float:
+        return a * b
+    return arithmetic("*", a, b, "Operands must be a number")
+
+def _div(a, b):
+    if a.__class__ is not float or b.__class__ is not float:
+        return arithmetic("/", a, b, "Operands must be a number")
+    if b == 0.0:
+        raise _PrError("Divide by zero")
+    return a / b
+
+def _gt(a, b):
+    _numbers(a, b)
+    return a > b
+
+def _ge(a, b):
+    _numbers(a, b)
+    return a >= b
+
+def _lt(a, b):
+    _numbers(a, b)
+    return a < b
+
+def _le(a, b):
+    _numbers(a, b)
+    return a <= b
+
+def _ne(a, b):
+    _numbers(a, b)
+    return not (a == b)
+
+def _neg(a):
+    if a.__class__ is not float:
+        raise _PrError("Operands must be a number")
+    return -a
+
+def _comma(a, b):
+    return None
+
+def _line(traceback):
+    #innermost frame that belongs to this module, mapped back to the .pr line
+    line = None
+    while traceback is not None:
+        if traceback.tb_frame.f_globals is _G:
+            line = _LINES.get(traceback.tb_lineno, line)
+        traceback = traceback.tb_next
+    return line
+
+def main():
+    \'\'\'
+        Run the program, returns the exit code preter.py would use
+    \'\'\'
+    try:
+        _program()
+    except (_PrError, ArrayError) as e:
+        message, traceback = str(e), e.__traceback__
+    except NameError as e:
+        message, traceback = f"Undefined variable {e.name[2:]}", e.__traceback__
+    else:
+        return 0
+
+    print(f"{message}\\n[line {_line(traceback)}]")
+    return 70
+
+_G = globals()
+g_clock = _Clock()
+g_memoize = _Memoize()
+g_memoStats = _MemoStats()
+for _name, (_arity, _fn) in NATIVES.items():
+    _G["g_" + _name] = _Native(_name, _arity, _fn)
+'''
+
+EPILOGUE = '''
+if __name__ == '__main__':
+    sys.exit(main())
+'''
+
+binary_helpers = {
+    TokenType.PLUS: "_add",
+    TokenType.MINUS: "_sub",
+    TokenType.STAR: "_mul",
+    TokenType.SLASH: "_div",
+    TokenType.GREATER: "_gt",
+    TokenType.GREATER_EQUAL: "_ge",
+    TokenType.LESS: "_lt",
+    TokenType.LESS_EQUAL: "_le",
+    TokenType.BANG_EQUAL: "_ne",
+    TokenType.COMMA: "_comma",
+}
+
+
+class FunctionContext:
+    '''
+        A Python function being generated, either a .pr function or the top level _program
+    '''
+    def __init__(self, header: str, indent: int):
+        self.header = header
+        self.indent = indent
+        #(indent, text, .pr line)
+        self.lines = []
+        self.assigned_globals = set()
+
+
+class Transpiler(Visitor):
+    def __init__(self, source_name: str="<script>"):
+        self.source_name = source_name
+
+        #unique id for each scope that gets its own environment in the Interpreter,
+        #innermost last. Empty means we're at global scope
+        self.scopes = []
+        self.scope_count = 0
+        self.function_count = 0
+        #(increment expression or None, scopes) of each loop around the current statement, innermost last
+        self.loops = []
+
+        self.context = None
+        self.indent = 0
+        #.pr line of the statement being generated, that's the line of its first token
+        self.line = 1
+        self.line_pending = False
+
+    def transpile(self, statements: List[Stmt]) -> str:
+        self.context = FunctionContext("def _program():", 0)
+        self.indent = 1
+        self.line_pending = True
+        self.emitStatements(statements)
+
+        prelude = PRELUDE.replace(ROPE_RUNTIME, inspect.getsource(Rope))
+        lines = prelude.replace(ARRAY_RUNTIME, inspect.getsource(NumArray)).splitlines()
+        line_map = {}
+
+        for indent, text, pr_line in self.finishFunction(self.context):
+            lines.append("    " * indent + text)
+            line_map[len(lines)] = pr_line
+
+        lines.append("")
+        lines.append(f"#generated line -> line in {self.source_name}")
+        lines.append(f"_LINES = {line_map!r}")
+        lines.extend(EPILOGUE.splitlines())
+
+        return "\n".join(lines) + "\n"
+
+    def finishFunction(self, context: FunctionContext):
+        header = [(context.indent, context.header, self.line)]
+
+        if context.assigned_globals:
+            header.append((context.indent + 1, "global " + ", ".join(sorted(context.assigned_globals)), self.line))
+
+        if not context.lines:
+            header.append((context.indent + 1, "pass", self.line))
+
+        return header + context.lines
+
+    def emit(self, text: str):
+        self.context.lines.append((self.indent, text, self.line))
+        self.line_pending = True
+
+    def emitStatements(self, statements: List[Stmt]):
+        if not statements:
+            self.emit("pass")
+
+        for statement in statements:
+            self.emitStatement(statement)
+
+    def emitStatement(self, stmt: Stmt):
+        #every statement takes its line from its own first token, not from whatever was seen
+        #before it, like the header of the function it's the first statement of
+        self.line_pending = True
+        stmt.accept(self)
+
+    def expression(self, expr: Expr) -> str:
+        return expr.accept(self)
+
+    def seeToken(self, token: Token):
+        if self.line_pending:
+            self.line = token.line
+            self.line_pending = False
+
+    def scopeName(self, depth: int, slot: int) -> str:
+        return f"v{self.scopes[-1 - depth]}_{slot}"
+
+    def globalName(self, name: str) -> str:
+        return f"g_{name}"
+
+    def truthy(self, code: str) -> str:
+        return f"((_t := {code}) is not None and _t is not False)"
+
+    def declaredName(self, slot: int, name: str) -> str:
+        if slot is None:
+            self.context.assigned_globals.add(self.globalName(name))
+            return self.globalName(name)
+
+        return self.scopeName(0, slot)
+
+    def visitAssignExpr(self, expr: Assign):
+        self.seeToken(expr.name)
+        value = self.expression(expr.value)
+
+        if expr.depth is None:
+            name = self.globalName(expr.name.lexeme)
+            self.context.assigned_globals.add(name)
+            return f"({name} := _assigned({name!r}, {value}))"
+
+        return f"({self.scopeName(expr.depth, expr.slot)} := {value})"
+
+    def visitBinaryExpr(self, expr: Binary):
+        left = self.expression(expr.left)
+        self.seeToken(expr.operator)
+        right = self.expression(expr.right)
+
+        if expr.operator.tokentype == TokenType.EQUAL_EQUAL:
+            return f"({left} == {right})"
+
+        return f"{binary_helpers[expr.operator.tokentype]}({left}, {right})"
+
+    def visitCallFunctionExpr(self, expr: CallFunction):
+        callee = self.expression(expr.callee)
+        self.seeToken(expr.parenLoc)
+        arguments = ", ".join(self.expression(argument) for argument in expr.arguments)
+
+        return f"_callee({callee}, {len(expr.arguments)})({arguments})"
+
+    def visitGroupingExpr(self, expr: Grouping):
+        return self.expression(expr.expression)
+
+    def visitIndexExpr(self, expr: Index):
+        target = self.expression(expr.target)
+        self.seeToken(expr.bracket)
+        index = self.expression(expr.index)
+
+        return f"getIndex({target}, {index})"
+
+    def visitSetIndexExpr(self, expr: SetIndex):
+        target = self.expression(expr.target)
+        self.seeToken(expr.bracket)
+        index = self.expression(expr.index)
+        value = self.expression(expr.value)
+
+        return f"setIndex({target}, {index}, {value})"
+
+    def visitLiteralExpr(self, expr: Literal):
+        if isinstance(expr.value, float) and not math.isfinite(expr.value):
+            #number literals too long for a double, and -O folding them into nan
+            return f"float({str(expr.value)!r})"
+
+        return repr(expr.value)
+
+    def visitLogicalExpr(self, expr: Logical):
+        left = self.expression(expr.left)
+        self.seeToken(expr.operator)
+        right = self.expression(expr.right)
+
+        #_t is read straight after it's assigned, so nesting these is fine
+        if expr.operator.tokentype == TokenType.OR:
+            return f"(_t if {self.truthy(left)} else {right})"
+
+        return f"({right} if {self.truthy(left)} else _t)"
+
+    def visitUnaryExpr(self, expr: Unary):
+        self.seeToken(expr.operator)
+        right = self.expression(expr.right)
+
+        if expr.operator.tokentype == TokenType.MINUS:
+            return f"_neg({right})"
+
+        return f"(not {self.truthy(right)})"
+
+    def visitVariableExpr(self, expr: Variable):
+        self.seeToken(expr.name)
+
+        if expr.depth is None:
+            return self.globalName(expr.name.lexeme)
+
+        return self.scopeName(expr.depth, expr.slot)
+
+    def visitBlockStmt(self, stmt: Block):
+        if stmt.size == 0:
+            self.emitStatements(stmt.statements)
+            return
+
+        self.scope_count += 1
+        self.scopes.append(self.scope_count)
+        self.emitStatements(stmt.statements)
+        self.scopes.pop()
+
+    def visitExpressionStmt(self, stmt: Expression):
+        self.emit(self.expression(stmt.expression))
+
+    def visitFunctionStmt(self, stmt: Function):
+        self.seeToken(stmt.name)
+        self.function_count += 1
+        python_name = f"_f{self.function_count}_{stmt.name.lexeme}"
+
+        #the body only sees its own scope and the globals
+        enclosing_scopes, enclosing_context, enclosing_indent = self.scopes, self.context, self.indent
+        enclosing_loops, self.loops = self.loops, []
+
+        self.scope_count += 1
+        self.scopes = [self.scope_count]
+        params = ", ".join(self.scopeName(0, slot) for slot in range(len(stmt.params)))
+
+        self.context = FunctionContext(f"def {python_name}({params}):", enclosing_indent)
+        self.indent = enclosing_indent + 1
+        for statement in stmt.body:
+            self.emitStatement(statement)
+
+        lines = self.finishFunction(self.context)
+        self.scopes, self.context, self.indent = enclosing_scopes, enclosing_context, enclosing_indent
+        self.loops = enclosing_loops
+        self.context.lines.extend(lines)
+
+        self.seeToken(stmt.name)
+        name = self.declaredName(stmt.slot, stmt.name.lexeme)
+        self.emit(f"{name} = _function({python_name}, {stmt.name.lexeme!r}, {len(stmt.params)})")
+
+    def visitIfStmt(self, stmt: If):
+        self.emit(f"if {self.truthy(self.expression(stmt.condition))}:")
+        self.emitBody(stmt.thenBranch)
+
+        if stmt.elseBranch is not None:
+            self.emit("else:")
+            self.emitBody(stmt.elseBranch)
+
+    def emitBody(self, stmt: Stmt, increment: Expr=None):
+        self.indent += 1
+        line_count = len(self.context.lines)
+
+        self.emitStatement(stmt)
+
+        if increment is not None:
+            self.emitIncrement(increment)
+
+        if len(self.context.lines) == line_count:
+            self.emit("pass")
+
+        self.indent -= 1
+
+    def emitIncrement(self, increment: Expr):
+        #reported with its own line, not the one of the statement before it
+        self.line_pending = True
+        self.emit(self.expression(increment))
+
+    def visitBreakStmt(self, stmt: Break):
+        self.seeToken(stmt.keyword)
+        self.emit("break")
+
+    def visitContinueStmt(self, stmt: Continue):
+        increment, loop_scopes = self.loops[-1]
+
+        if increment is not None:
+            #the increment's variables were resolved from the loop's scope, not the body's
+            scopes, self.scopes = self.scopes, loop_scopes
+            self.emitIncrement(increment)
+            self.scopes = scopes
+
+        self.line_pending = True
+        self.seeToken(stmt.keyword)
+        self.emit("continue")
+
+    def visitReturnStmt(self, stmt: Return):
+        self.seeToken(stmt.keyword)
+
+        if stmt.value is None:
+            self.emit("return None")
+        else:
+            self.emit(f"return {self.expression(stmt.value)}")
+
+    def visitPrintStmt(self, stmt: Print):
+        self.emit(f"print(_stringify({self.expression(stmt.expression)}))")
+
+    def visitVarStmt(self, stmt: Var):
+        self.seeToken(stmt.name)
+
+        if stmt.initializer is not None:
+            value = self.expression(stmt.initializer)
+        else:
+            value = "None"
+
+        self.emit(f"{self.declaredName(stmt.slot, stmt.name.lexeme)} = {value}")
+
+    def visitWhileStmt(self, stmt: While):
+        self.emit(f"while {self.truthy(self.expression(stmt.condition))}:")
+
+        self.loops.append((stmt.increment, list(self.scopes)))
+        self.emitBody(stmt.body, stmt.increment)
+        self.loops.pop()
@@ -0,0 +1,365 @@
+from typing import List
+
+from Stmt import *
+from ErrorHandler import *
+from RuntimeError_ import *
+from Environment import *
+from Callable import Callable
+from Chunk import OpCode, Chunk
+from Compiler import Compiler
+from VMFunction import VMFunction
+from Rope import STRINGS, concat
+from Natives import defineNatives, NativeError, arrayArithmetic, indexGet, indexSet
+
+class VM:
+    '''
+        Stack based virtual machine running the bytecode made by the Compiler.
+
+        Same interface as the Interpreter, so Preter can use either one.
+        Calls to compiled functions push a frame instead of recursing in Python
+    '''
+    #frames of compiled functions that can be active at once
+    MAX_FRAMES = 10000
+
+    def __init__(self, error_handler: ErrorHandler):
+        self.error_handler = error_handler
+        self.globals = Environment()
+
+        defineNatives(self.globals)
+
+    def interpret(self, statements: List[Stmt]):
+        chunk = Compiler().compile(statements)
+
+        try:
+            self.run(chunk, self.globals)
+        except RuntimeError_ as e:
+            self.error_handler.runtimeError(e)
+
+    def stringify(self, thing):
+        if thing is None:
+            return "nil"
+        else:
+            return str(thing)
+
+    def run(self, chunk: Chunk, environment: Environment):
+        '''
+            Run 'chunk' until it returns, and return the returned value
+        '''
+        #opcodes as locals, comparing against those is cheaper than attribute lookups
+        GET_LOCAL = OpCode.GET_LOCAL
+        SET_LOCAL = OpCode.SET_LOCAL
+        DEFINE_LOCAL = OpCode.DEFINE_LOCAL
+        GET_ENCLOSING = OpCode.GET_ENCLOSING
+        SET_ENCLOSING = OpCode.SET_ENCLOSING
+        GET_GLOBAL = OpCode.GET_GLOBAL
+        SET_GLOBAL = OpCode.SET_GLOBAL
+        DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL
+        CONSTANT = OpCode.CONSTANT
+        POP = OpCode.POP
+        ADD = OpCode.ADD
+        SUBTRACT = OpCode.SUBTRACT
+        MULTIPLY = OpCode.MULTIPLY
+        DIVIDE = OpCode.DIVIDE
+        GREATER = OpCode.GREATER
+        GREATER_EQUAL = OpCode.GREATER_EQUAL
+        LESS = OpCode.LESS
+        LESS_EQUAL = OpCode.LESS_EQUAL
+        EQUAL = OpCode.EQUAL
+        NOT_EQUAL = OpCode.NOT_EQUAL
+        COMMA = OpCode.COMMA
+        NEGATE = OpCode.NEGATE
+        NOT = OpCode.NOT
+        GET_INDEX = OpCode.GET_INDEX
+        SET_INDEX = OpCode.SET_INDEX
+        JUMP = OpCode.JUMP
+        JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE
+        JUMP_IF_FALSE_OR_POP = OpCode.JUMP_IF_FALSE_OR_POP
+        JUMP_IF_TRUE_OR_POP = OpCode.JUMP_IF_TRUE_OR_POP
+        CALL = OpCode.CALL
+        GET_CALLEE = OpCode.GET_CALLEE
+        CHECK_CALLABLE = OpCode.CHECK_CALLABLE
+        RETURN = OpCode.RETURN
+        PRINT = OpCode.PRINT
+        PUSH_ENV = OpCode.PUSH_ENV
+        POP_ENV = OpCode.POP_ENV
+        JUMP_IF_TRUE = OpCode.JUMP_IF_TRUE
+        STORE_LOCAL = OpCode.STORE_LOCAL
+        STORE_ENCLOSING = OpCode.STORE_ENCLOSING
+        STORE_GLOBAL = OpCode.STORE_GLOBAL
+
+        globals_ = self.globals.values
+        float_ = float
+        strings = STRINGS
+
+        code = chunk.code
+        constants = chunk.constants
+        env = environment
+        slots = env.slots
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        #saved (chunk, ip, env) of the callers
+        frames = []
+        ip = 0
+
+        while True:
+            op = code[ip]
+            arg = code[ip + 1]
+            ip += 2
+
+            if op == GET_LOCAL:
+                push(slots[arg])
+
+            elif op == CONSTANT:
+                push(constants[arg])
+
+            elif op == GET_GLOBAL:
+                try:
+                    push(globals_[constants[arg]])
+                except KeyError:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), f"Undefined variable {constants[arg]}")
+
+            elif op == GET_CALLEE:
+                name, paren = constants[arg]
+                try:
+                    callee = globals_[name]
+                except KeyError:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), f"Undefined variable {name}")
+
+                if not isinstance(callee, Callable):
+                    raise RuntimeError_(paren, "Can only use call syntax on functions and classes")
+                push(callee)
+
+            elif op == STORE_LOCAL:
+                slots[arg] = pop()
+
+            elif op == JUMP_IF_TRUE:
+                value = pop()
+                if value is not None and value is not False:
+                    ip = arg
+
+            elif op == STORE_GLOBAL:
+                name = constants[arg]
+                if name not in globals_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), f"Undefined variable {name}")
+                globals_[name] = pop()
+
+            elif op == JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    ip = arg
+
+            elif op == JUMP:
+                ip = arg
+
+            elif op == ADD:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+
+                if left.__class__ is float_ and right.__class__ is float_:
+                    stack[-1] = left + right
+                elif isinstance(left, strings) and isinstance(right, strings):
+                    stack[-1] = concat(left, right)
+                else:
+                    stack[-1] = arrayArithmetic(chunk.tokenAt(ip - 2), "+", left, right,
+                                                "Operands must be both numbers or both strings")
+
+            elif op == LESS:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is not float_ or right.__class__ is not float_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Operands must be a number")
+                stack[-1] = left < right
+
+            elif op == SUBTRACT:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is float_ and right.__class__ is float_:
+                    stack[-1] = left - right
+                else:
+                    stack[-1] = arrayArithmetic(chunk.tokenAt(ip - 2), "-", left, right, "Operands must be a number")
+
+            elif op == CALL:
+                callee = stack[-arg - 1]
+
+                if callee.__class__ is VMFunction:
+                    if callee._arity != arg:
+                        raise RuntimeError_(chunk.tokenAt(ip - 2), f"Expected {callee._arity} arguments but got {arg}")
+
+                    if len(frames) >= self.MAX_FRAMES:
+                        raise RuntimeError_(chunk.tokenAt(ip - 2), "Stack overflow")
+
+                    frames.append((chunk, ip, env))
+
+                    env = Environment(enclosing=self.globals, size=callee.size)
+                    slots = env.slots
+                    if arg:
+                        slots[:arg] = stack[-arg:]
+                    del stack[-arg - 1:]
+
+                    chunk = callee.chunk
+                    code = chunk.code
+                    constants = chunk.constants
+                    ip = 0
+
+                elif isinstance(callee, Callable):
+                    if callee.arity() != arg:
+                        raise RuntimeError_(chunk.tokenAt(ip - 2), f"Expected {callee.arity()} arguments but got {arg}")
+
+                    arguments = stack[len(stack) - arg:]
+                    del stack[-arg - 1:]
+                    try:
+                        push(callee.call(self, arguments))
+                    except NativeError as e:
+                        raise RuntimeError_(chunk.tokenAt(ip - 2), str(e))
+
+                else:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Can only use call syntax on functions and classes")
+
+            elif op == CHECK_CALLABLE:
+                if not isinstance(stack[-1], Callable):
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Can only use call syntax on functions and classes")
+
+            elif op == RETURN:
+                if not frames:
+                    return pop()
+
+                chunk, ip, env = frames.pop()
+                code = chunk.code
+                constants = chunk.constants
+                slots = env.slots
+
+            elif op == DEFINE_LOCAL:
+                slots[arg] = pop()
+
+            elif op == SET_LOCAL:
+                slots[arg] = stack[-1]
+
+            elif op == POP:
+                pop()
+
+            elif op == SET_GLOBAL:
+                name = constants[arg]
+                if name not in globals_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), f"Undefined variable {name}")
+                globals_[name] = stack[-1]
+
+            elif op == GET_ENCLOSING:
+                depth, slot = constants[arg]
+                push(env.ancestor(depth).slots[slot])
+
+            elif op == SET_ENCLOSING:
+                depth, slot = constants[arg]
+                env.ancestor(depth).slots[slot] = stack[-1]
+
+            elif op == STORE_ENCLOSING:
+                depth, slot = constants[arg]
+                env.ancestor(depth).slots[slot] = pop()
+
+            elif op == PUSH_ENV:
+                env = Environment(enclosing=env, size=arg)
+                slots = env.slots
+
+            elif op == POP_ENV:
+                env = env.enclosing
+                slots = env.slots
+
+            elif op == MULTIPLY:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is float_ and right.__class__ is float_:
+                    stack[-1] = left * right
+                else:
+                    stack[-1] = arrayArithmetic(chunk.tokenAt(ip - 2), "*", left, right, "Operands must be a number")
+
+            elif op == DIVIDE:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is not float_ or right.__class__ is not float_:
+                    stack[-1] = arrayArithmetic(chunk.tokenAt(ip - 2), "/", left, right, "Operands must be a number")
+                elif right == 0.0:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Divide by zero")
+                else:
+                    stack[-1] = left / right
+
+            elif op == GREATER:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is not float_ or right.__class__ is not float_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Operands must be a number")
+                stack[-1] = left > right
+
+            elif op == GREATER_EQUAL:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is not float_ or right.__class__ is not float_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Operands must be a number")
+                stack[-1] = left >= right
+
+            elif op == LESS_EQUAL:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is not float_ or right.__class__ is not float_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Operands must be a number")
+                stack[-1] = left <= right
+
+            elif op == EQUAL:
+                right = constants[arg - 1] if arg else pop()
+                stack[-1] = stack[-1] == right
+
+            elif op == NOT_EQUAL:
+                right = constants[arg - 1] if arg else pop()
+                left = stack[-1]
+                if left.__class__ is not float_ or right.__class__ is not float_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Operands must be a number")
+                stack[-1] = not (left == right)
+
+            elif op == JUMP_IF_FALSE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip = arg
+                else:
+                    pop()
+
+            elif op == JUMP_IF_TRUE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    pop()
+                else:
+                    ip = arg
+
+            elif op == PRINT:
+                print(self.stringify(pop()))
+
+            elif op == NEGATE:
+                value = stack[-1]
+                if value.__class__ is not float_:
+                    raise RuntimeError_(chunk.tokenAt(ip - 2), "Operands must be a number")
+                stack[-1] = -value
+
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+
+            elif op == COMMA:
+                #comma operator evaluates both sides and gives nil, same as the Interpreter
+                if not arg:
+                    pop()
+                stack[-1] = None
+
+            elif op == DEFINE_GLOBAL:
+                globals_[constants[arg]] = pop()
+
+            elif op == GET_INDEX:
+                index = pop()
+                stack[-1] = indexGet(chunk.tokenAt(ip - 2), stack[-1], index)
+
+            elif op == SET_INDEX:
+                value = pop()
+                index = pop()
+                stack[-1] = indexSet(chunk.tokenAt(ip - 2), stack[-1], index, value)
+
+            else:
+                raise RuntimeError_(chunk.tokenAt(ip - 2), f"Unknown opcode {op}")
@@ -0,0 +1,27 @@
+from Callable import Callable
+from Environment import Environment
+
+class VMFunction(Callable):
+    '''
+        A function compiled to bytecode by the Compiler.
+
+        The VM calls these without going through call(), by pushing a frame.
+        call() is there for everything else, it runs the body in a nested VM loop
+    '''
+    def __init__(self, name: str, arity: int, size: int, chunk):
+        self.name = name
+        self._arity = arity
+        self.size = size
+        self.chunk = chunk
+
+    def arity(self):
+        return self._arity
+
+    def call(self, interpreter, arguments):
+        environment = Environment(enclosing=interpreter.globals, size=self.size)
+        environment.slots[:len(arguments)] = arguments
+
+        return interpreter.run(self.chunk, environment)
+
+    def __str__(self):
+        return f"<Function '{self.name}'>"
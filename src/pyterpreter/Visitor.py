@@ -21,6 +21,10 @@ class Visitor(ABC):
     def visitGroupingExpr(self, expr: Grouping):
         pass
 
+    @abstractmethod
+    def visitIndexExpr(self, expr: Index):
+        pass
+
     @abstractmethod
     def visitLiteralExpr(self, expr: Literal):
         pass
@@ -29,6 +33,10 @@ class Visitor(ABC):
     def visitLogicalExpr(self, expr: Logical):
         pass
 
+    @abstractmethod
+    def visitSetIndexExpr(self, expr: SetIndex):
+        pass
+
     @abstractmethod
     def visitUnaryExpr(self, expr: Unary):
         pass
@@ -37,10 +45,69 @@ class Visitor(ABC):
     def visitVariableExpr(self, expr: Variable):
         pass
 
+    def visitAddFloatsExpr(self, expr: AddFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitAddStringsExpr(self, expr: AddStrings):
+        return self.visitBinaryExpr(expr)
+
+    def visitSubtractFloatsExpr(self, expr: SubtractFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitMultiplyFloatsExpr(self, expr: MultiplyFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitDivideFloatsExpr(self, expr: DivideFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitGreaterFloatsExpr(self, expr: GreaterFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitGreaterEqualFloatsExpr(self, expr: GreaterEqualFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitLessFloatsExpr(self, expr: LessFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitLessEqualFloatsExpr(self, expr: LessEqualFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitNotEqualFloatsExpr(self, expr: NotEqualFloats):
+        return self.visitBinaryExpr(expr)
+
+    def visitEqualExpr(self, expr: Equal):
+        return self.visitBinaryExpr(expr)
+
+    def visitPolyBinaryExpr(self, expr: PolyBinary):
+        return self.visitBinaryExpr(expr)
+
+    def visitNegateExpr(self, expr: Negate):
+        return self.visitUnaryExpr(expr)
+
+    def visitNotExpr(self, expr: Not):
+        return self.visitUnaryExpr(expr)
+
+    def visitPolyUnaryExpr(self, expr: PolyUnary):
+        return self.visitUnaryExpr(expr)
+
+    def visitAndExpr(self, expr: And):
+        return self.visitLogicalExpr(expr)
+
+    def visitOrExpr(self, expr: Or):
+        return self.visitLogicalExpr(expr)
+
     @abstractmethod
     def visitBlockStmt(self, stmt: Block):
         pass
 
+    @abstractmethod
+    def visitBreakStmt(self, stmt: Break):
+        pass
+
+    @abstractmethod
+    def visitContinueStmt(self, stmt: Continue):
+        pass
+
     @abstractmethod
     def visitExpressionStmt(self, stmt: Expression):
         pass
@@ -57,6 +124,10 @@ class Visitor(ABC):
     def visitPrintStmt(self, stmt: Print):
         pass
 
+    @abstractmethod
+    def visitReturnStmt(self, stmt: Return):
+        pass
+
     @abstractmethod
     def visitVarStmt(self, stmt: Var):
         pass
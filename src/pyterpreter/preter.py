@@ -1,19 +1,80 @@
+import os
 import sys
+import time
 import argparse
+from contextlib import nullcontext
 
 from ErrorHandler import *
 from scanner import *
+from RegexScanner import *
+from TokenStore import *
 from Parser import *
+from Resolver import *
+from Optimizer import *
 from AstPrinter import *
 from Interpreter import *
+from StackInterpreter import *
+from VM import *
+from ClosureCompiler import *
+from Transpiler import *
+from ProgramCache import *
+from Incremental import *
+from Batch import *
+from Profiler import *
+from Stats import *
 
 #error codes are used according to 
 #   https://www.freebsd.org/cgi/man.cgi?query=sysexits&apropos=0&sektion=0&manpath=FreeBSD+4.3-RELEASE&format=html
 
+#execution engines selectable with --engine, all take resolved statements
+ENGINES = {
+    "tree": Interpreter,
+    "vm": VM,
+    "closure": ClosureInterpreter,
+    "stack": StackInterpreter,
+}
+
+#scanner backends selectable with --scanner, all produce the same tokens
+SCANNERS = {
+    "regex": RegexScanner,
+    "char": Scanner,
+    "store": StoreScanner,
+}
+
 class Preter:
-    def __init__(self):
+    def __init__(self, engine: str="tree", optimize: bool=False, scanner: str="regex",
+                 cache: bool=True, cache_dir: str=None, stats: bool=False, max_frames: int=None):
         self.error_handler = ErrorHandler()
-        self.interpreter = Interpreter(self.error_handler)
+
+        #how deep calls can go on the engines that keep their own call stack
+        self.max_frames = max_frames
+
+        #phase timings for every engine, the tree-walker also counts what it does
+        self.stats = Stats() if stats else None
+
+        self.engine = engine
+        self.interpreter = self.newInterpreter()
+
+        self.optimize = optimize
+        self.scanner_class = SCANNERS[scanner]
+
+        #compiled program cache for runFile, defaults to __prcache__ next to the script
+        self.cache = cache
+        self.cache_dir = cache_dir
+
+        #samples the program while it runs, set by profileFile
+        self.profiler = None
+
+    def newInterpreter(self):
+        if self.stats is not None and self.engine == "tree":
+            return StatsInterpreter(self.error_handler, self.stats)
+
+        interpreter = ENGINES[self.engine](self.error_handler)
+
+        if self.max_frames is not None:
+            interpreter.MAX_FRAMES = self.max_frames
+
+        return interpreter
 
     def printTokens(self, tokens):
         print(f"{'Type':<33} | {'lexeme':<10} | {'literal':<10} | line")
@@ -21,12 +82,31 @@ class Preter:
             print(token)
         print("\n")
 
-    def run(self, program, debug=False):
-        #print("Running: \n{}".format(program))
+    def phase(self, name: str):
+        '''
+            Times a 'with' block into the stats as phase 'name', does nothing without --stats
+        '''
+        if self.stats is None:
+            return nullcontext()
+
+        return self.stats.phase(name)
+
+    def compile(self, program, debug=False):
+        '''
+            Scan, parse, optimize (with -O) and resolve 'program'.
+            Returns the statements ready for an engine, or None if there were errors
+        '''
+        try:
+            return self.compileStatements(program, debug)
+        except RecursionError:
+            self.error_handler.recursionError(runtime=False)
+            return None
 
-        scanner = Scanner(program, self.error_handler)
+    def compileStatements(self, program, debug):
+        scanner = self.scanner_class(program, self.error_handler)
 
-        tokens = scanner.scanTokens()
+        with self.phase("scan"):
+            tokens = scanner.scanTokens()
 
         if debug:
             print("\n")
@@ -37,31 +117,232 @@ class Preter:
 
         #self.printTokens(tokens)
 
-        parser = Parser(tokens, self.error_handler)
-        statements = parser.parse()
+        if isinstance(tokens, TokenStore):
+            parser = TokenStoreParser(tokens, self.error_handler)
+        else:
+            parser = Parser(tokens, self.error_handler)
+
+        with self.phase("parse"):
+            statements = parser.parse()
 
         if self.error_handler.hadError or self.error_handler.hadRuntimeError:
-            return
+            return None
+
+        if self.optimize:
+            with self.phase("optimize"):
+                statements = Optimizer().optimize(statements)
+
+        with self.phase("resolve"):
+            Resolver(self.error_handler).resolve(statements)
+
+        #misplaced return/break/continue
+        if self.error_handler.hadError:
+            return None
+
+        return statements
+
+    def run(self, program, debug=False, cache: ProgramCache=None, compiler: IncrementalCompiler=None):
+        '''
+            Compile and execute 'program'. With a 'cache' the compiled program can come from
+            there, with a 'compiler' only the parts that changed since its last program get compiled
+        '''
+        #print("Running: \n{}".format(program))
+
+        statements = None
+        if cache is not None:
+            with self.phase("cache load"):
+                statements = cache.load(program, self.optimize)
+
+        if statements is None:
+            if compiler is not None:
+                with self.phase("compile"):
+                    try:
+                        statements = compiler.compile(program)
+                    except RecursionError:
+                        self.error_handler.recursionError(runtime=False)
+                        return
+            else:
+                statements = self.compile(program, debug=debug)
+
+            if statements is None:
+                return
+
+            if cache is not None:
+                cache.store(program, self.optimize, statements)
 
         #print("AstPrinter expression:")
         #print(AstPrinter().print(expression))
 
-        self.interpreter.interpret(statements)
+        with self.phase("execute"):
+            if self.profiler is not None:
+                self.profiler.start()
+
+            try:
+                self.interpreter.interpret(statements)
+            except RecursionError:
+                #the engines that recurse in Python, on a chain of operators too long
+                #or a program recursing too deep for them
+                self.error_handler.recursionError(runtime=True)
+            finally:
+                if self.profiler is not None:
+                    self.profiler.stop()
+
+    def runStreaming(self, program):
+        '''
+            Execute each top level declaration as soon as it's parsed, then let go of it.
+            Tokens are scanned only when the parser asks for them, so neither the whole
+            token list nor the whole AST is in memory at once, just the source text.
 
-    def runFile(self, filename, debug=False):
+            After a syntax or resolve error nothing more gets executed, but parsing goes on to report
+            the other errors. Declarations before the error have already run by then
+        '''
+        scanner = self.scanner_class(program, self.error_handler)
+        parser = StreamingParser(scanner.iterTokens(), self.error_handler)
+        resolver = Resolver(self.error_handler)
+
+        try:
+            self.streamDeclarations(parser, resolver)
+        except RecursionError:
+            #parsing, optimizing or resolving a declaration nested too deeply, nothing after it runs
+            self.error_handler.recursionError(runtime=False)
+
+    def streamDeclarations(self, parser: StreamingParser, resolver: Resolver):
+        for statement in parser.iterDeclarations():
+            if statement is None:
+                continue
+
+            if self.optimize:
+                statement = Optimizer().optimizeStatement(statement)
+                if statement is None:
+                    continue
+
+            #scanning and parsing happen bit by bit inside iterDeclarations(), only these get timed
+            with self.phase("resolve"):
+                resolver.resolve([statement])
+
+            if self.error_handler.hadError:
+                continue
+
+            with self.phase("execute"):
+                try:
+                    self.interpreter.interpret([statement])
+                except RecursionError:
+                    self.error_handler.recursionError(runtime=True)
+
+            if self.error_handler.hadRuntimeError:
+                return
+
+    def emitPython(self, filename, output):
+        '''
+            Translate the script in 'filename' to a Python module written to 'output', without running it
+        '''
+        with open(filename, mode='r', encoding='utf-8') as f:
+            program = f.read()
+
+        statements = self.compile(program)
+
+        if statements is None:
+            sys.exit(65)
+
+        try:
+            source = Transpiler(filename).transpile(statements)
+        except RecursionError:
+            self.error_handler.recursionError(runtime=False)
+            sys.exit(65)
+
+        with open(output, mode='w', encoding='utf-8') as f:
+            f.write(source)
+
+    def programCache(self, filename) -> ProgramCache:
+        if not self.cache:
+            return None
+
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(filename)), "__prcache__")
+
+        return ProgramCache(cache_dir)
+
+    def runFile(self, filename, debug=False, stream=False):
         with open(filename, mode='r', encoding='utf-8') as f:
-            self.run("".join(f.readlines()), debug=debug)
+            if stream:
+                self.runStreaming(f.read())
+            else:
+                self.run("".join(f.readlines()), debug=debug, cache=self.programCache(filename))
             
             if self.error_handler.hadError:
                 sys.exit(65)
             if self.error_handler.hadRuntimeError:
                 sys.exit(70)
 
+    def profileFile(self, filename, output, interval=0.005, top=20):
+        '''
+            Run the script in 'filename' under the sampling Profiler. Writes collapsed stacks
+            to 'output' and prints the 'top' functions and lines to stderr, even if the
+            script fails
+        '''
+        self.profiler = Profiler(interval)
+
+        try:
+            self.runFile(filename)
+        finally:
+            self.profiler.writeCollapsed(output)
+            self.profiler.report(top, os.path.basename(filename))
+
+    def reportStats(self, json_path=None):
+        '''
+            Print the --stats counters to stderr, or write them to 'json_path' as JSON
+        '''
+        self.stats.collectMemoized(self.interpreter.globals)
+
+        if json_path is None:
+            self.stats.report()
+        else:
+            self.stats.writeJSON(json_path)
+
+    def watchFile(self, filename, interval=0.2):
+        '''
+            Run the script in 'filename', then again with fresh globals every time it's saved,
+            until interrupted. Only the declarations that changed get compiled again
+        '''
+        compiler = IncrementalCompiler(self.scanner_class, self.error_handler, self.optimize)
+        modified = None
+
+        try:
+            while True:
+                try:
+                    current = os.stat(filename).st_mtime_ns
+                except FileNotFoundError:
+                    #some editors save by deleting and renaming, wait for it to come back
+                    current = modified
+
+                if current != modified:
+                    modified = current
+
+                    with open(filename, mode='r', encoding='utf-8') as f:
+                        program = f.read()
+
+                    self.interpreter = self.newInterpreter()
+                    self.error_handler.hadError = False
+                    self.error_handler.hadRuntimeError = False
+
+                    self.run(program, compiler=compiler)
+                    print(f"[watch] {filename}: compiled {compiler.compiled}, reused {compiler.reused} declarations",
+                          file=sys.stderr)
+
+                time.sleep(interval)
+
+        except KeyboardInterrupt:
+            print("\nKeyboardInterrupt")
+
     def runPrompt(self, debug=False):
+        #entering a line again, or an edited one, only compiles the declarations that changed
+        compiler = None if debug else IncrementalCompiler(self.scanner_class, self.error_handler, self.optimize)
+
         try:
             while True:
                 print(">>>", end="")
-                self.run(input(), debug=debug)
+                self.run(input(), debug=debug, compiler=compiler)
 
                 #error shouldn't kill the interactive prompt
                 self.error_handler.hadError = False
@@ -70,17 +351,107 @@ class Preter:
         except KeyboardInterrupt:
             print("\nKeyboardInterrupt")
 
-    def main(self, debug=False):
-        if len(sys.argv[1:]) > 1:
-            print("Usage: preter [script]")
-        elif len(sys.argv[1:]) == 1:
-            self.runFile(sys.argv[1], debug=debug)
+    def main(self, script=None, debug=False, stream=False):
+        if script is not None:
+            self.runFile(script, debug=debug, stream=stream)
         else:
             self.runPrompt(debug=debug)
 
 if __name__ == '__main__':
-    #parser = argparse.ArgumentParser(description="PyTerpreter: execute .pr files, or use the REPL")
-    #parser.add_argument
+    parser = argparse.ArgumentParser(description="PyTerpreter: execute .pr files, or use the REPL")
+    parser.add_argument("script", nargs="?", help="file to execute, starts the REPL if left out")
+    parser.add_argument("--engine", choices=ENGINES.keys(), default="tree",
+                        help="tree: tree-walking interpreter, vm: bytecode compiler and VM, "
+                             "closure: compiles the tree to nested Python closures, "
+                             "stack: tree-walking on its own stacks, without Python recursion")
+    parser.add_argument("--max-frames", type=int, metavar="N",
+                        help="calls that can be in progress at once on --engine=vm or stack, "
+                             "deeper recursion is a 'Stack overflow' error")
+    parser.add_argument("--emit-python", metavar="OUT",
+                        help="translate the script to a Python module written to OUT instead of running it")
+    parser.add_argument("-O", dest="optimize", action="store_true",
+                        help="fold constants and remove dead code before running")
+    parser.add_argument("--scanner", choices=SCANNERS.keys(), default="regex",
+                        help="regex: one master regex per token, char: character at a time, "
+                             "store: like regex, into compact arrays instead of Token objects")
+    parser.add_argument("--watch", action="store_true",
+                        help="run the script again every time it changes, compiling only the declarations that did")
+    parser.add_argument("--batch", metavar="TARGET",
+                        help="run every .pr file in the directory TARGET, or every script listed in the manifest "
+                             "file TARGET, across a pool of processes")
+    parser.add_argument("--batch-output", metavar="OUT", default="batch_results.json",
+                        help="JSON file the output and exit code of every --batch script are written to")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="processes for --batch, defaults to one per core")
+    parser.add_argument("--stream", action="store_true",
+                        help="run each top level declaration as soon as it's parsed, keeps memory bounded for huge scripts")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="don't load or store compiled programs in the cache")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="where compiled programs are cached, defaults to __prcache__ next to the script")
+    parser.add_argument("--profile", metavar="OUT",
+                        help="sample the running program, write collapsed stacks for flamegraph tools to OUT "
+                             "and print the slowest functions and lines")
+    parser.add_argument("--profile-interval", type=float, default=5.0, metavar="MS",
+                        help="milliseconds between profiler samples")
+    parser.add_argument("--profile-top", type=int, default=20, metavar="N",
+                        help="functions and lines listed in the profile report")
+    parser.add_argument("--stats", action="store_true",
+                        help="print time spent per phase, and with --engine=tree node visits, variable "
+                             "lookup depths, environments and calls, to stderr")
+    parser.add_argument("--stats-json", metavar="OUT",
+                        help="like --stats, but write them to OUT as JSON")
+    args = parser.parse_args()
 
-    interpreter = Preter()
-    interpreter.main(debug=False)
+    if args.max_frames is not None and args.engine not in ("vm", "stack"):
+        parser.error("--max-frames only works with --engine=vm or stack")
+
+    stats = args.stats or args.stats_json is not None
+    interpreter = Preter(engine=args.engine, optimize=args.optimize, scanner=args.scanner,
+                         cache=args.cache, cache_dir=args.cache_dir, stats=stats, max_frames=args.max_frames)
+
+    if args.emit_python is not None:
+        if args.script is None:
+            parser.error("--emit-python needs a script")
+
+        interpreter.emitPython(args.script, args.emit_python)
+    elif args.batch is not None:
+        if args.script is not None:
+            parser.error("--batch runs the scripts in TARGET, leave out the script")
+        if args.watch or args.profile is not None or stats:
+            parser.error("--batch doesn't work with --watch, --profile or --stats")
+
+        options = dict(engine=args.engine, optimize=args.optimize, scanner=args.scanner, cache=args.cache,
+                       cache_dir=args.cache_dir, max_frames=args.max_frames)
+        results = runBatch(findScripts(args.batch), args.batch_output, Preter, options, stream=args.stream,
+                           workers=args.workers)
+
+        #the worst exit code of the scripts, so a failed batch fails the command too
+        exit_code = max((result["exit_code"] for result in results), default=0)
+        if exit_code != 0:
+            sys.exit(exit_code)
+    elif args.watch:
+        if args.script is None:
+            parser.error("--watch needs a script")
+        if args.stream or args.profile is not None:
+            parser.error("--watch doesn't work with --stream or --profile")
+
+        try:
+            interpreter.watchFile(args.script)
+        finally:
+            if stats:
+                interpreter.reportStats(args.stats_json)
+    elif args.profile is not None:
+        if args.script is None:
+            parser.error("--profile needs a script")
+        if args.engine != "tree" or args.stream or stats:
+            parser.error("--profile only works with --engine=tree, without --stream or --stats")
+
+        interpreter.profileFile(args.script, args.profile, interval=args.profile_interval / 1000,
+                                top=args.profile_top)
+    else:
+        try:
+            interpreter.main(args.script, debug=False, stream=args.stream)
+        finally:
+            if stats:
+                interpreter.reportStats(args.stats_json)
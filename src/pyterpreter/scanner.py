@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Iterator
 from collections import namedtuple
 
 from TokenType import *
@@ -28,6 +28,8 @@ class Scanner:
             ')': TokenType.RIGHT_PAREN,
             '{': TokenType.LEFT_BRACE,
             '}': TokenType.RIGHT_BRACE,
+            '[': TokenType.LEFT_BRACKET,
+            ']': TokenType.RIGHT_BRACKET,
             ',': TokenType.COMMA,
             '.': TokenType.DOT,
             '-': TokenType.MINUS,
@@ -76,6 +78,21 @@ class Scanner:
 
         return self.tokens
 
+    def iterTokens(self) -> Iterator[Token]:
+        '''
+            Like scanTokens(), but yields the tokens as they're scanned instead of keeping them all.
+            While it's stopped at a token, _current is the offset just past that token
+        '''
+        while not self._isAtEnd():
+            self._start = self._current
+            self.scanToken()
+
+            if self.tokens:
+                yield from self.tokens
+                self.tokens.clear()
+
+        yield Token(TokenType.EOF, "", None, self._line)
+
     def advance(self) -> chr:
         #TODO: Won't this cause an error at the end of source?
         self._current += 1
@@ -5,6 +5,15 @@ from typing import List
     Generates AST-related files, like src/pyterpreter/Expr.py, src/pyterpreter/Visitor.py
 
     We can add new types by adding lines to the list passed to defineAst() inside main()
+
+    Each line is "ClassName | constructor fields | resolved fields", where the optional
+    third part lists fields that start out as None and get filled in by the Resolver,
+    or by an engine at runtime
+
+    A node can also have quickened forms, "FormName < ClassName". Those are subclasses
+    with the same fields that an engine switches a node's __class__ to once it has seen
+    it run. The Visitor visits a form like the node it came from, unless a visitor
+    overrides visit<FormName><base>()
 '''
 
 def defineImports(outf):
@@ -14,18 +23,36 @@ def defineImports(outf):
     outf.write("\n")
 
 
-def defineType(outf, base_name: str, class_name: str, fields: str):
+def tupleOf(names: List[str]) -> str:
+    if len(names) == 1:
+        return f'("{names[0]}",)'
+
+    return "(" + ", ".join(f'"{name}"' for name in names) + ")"
+
+
+def defineType(outf, base_name: str, class_name: str, fields: str, resolved: str=""):
     outf.write(f"\nclass {class_name}({base_name}):\n")
 
+    field_list = [field.strip() for field in fields.split(",")]
+    #filled in later by the Resolver, not by the Parser
+    resolved_list = [field.strip() for field in resolved.split(",") if field.strip()]
+
+    #no per-instance __dict__, big scripts make a lot of these
+    outf.write(f"    __slots__ = {tupleOf(field_list + resolved_list)}\n")
+    #lets nodes be taken apart with a match statement, e.g. case Binary(left, operator, right)
+    outf.write(f"    __match_args__ = {tupleOf(field_list)}\n")
+    outf.write("\n")
+
     #TODO: set fields to None by default
-    outf.write(f"    def __init__(self, {fields}):\n")
+    outf.write(f"    def __init__(self, {', '.join(field_list)}):\n")
 
-    field_list = fields.split(",")
+    #plain stores into the slots, no loops or keyword handling
     for field in field_list:
-        #field_name = field.split(":")[0].strip()
-        field = field.strip()
         outf.write(f"        self.{field} = {field}\n")
 
+    for field in resolved_list:
+        outf.write(f"        self.{field} = None\n")
+
     outf.write("\n")
     outf.write(f"    def accept(self, visitor):\n")
     outf.write(f"        return visitor.visit{class_name}{base_name}(self)\n")
@@ -48,19 +75,36 @@ def addVisitorLines(base_name: str, types_: List[str], visitorLines: List[str]):
 def defineBaseClass(outf, base_name: str):
     outf.write(f"class {base_name}:\n")
     
-    outf.write("    pass\n")
+    outf.write("    __slots__ = ()\n")
     
 
+def defineForm(outf, base_name: str, form_name: str, class_name: str):
+    outf.write(f"\nclass {form_name}({class_name}):\n")
+    #same layout as the class it came from, so a node's __class__ can be switched between them
+    outf.write("    __slots__ = ()\n")
+    outf.write("\n")
+    outf.write(f"    def accept(self, visitor):\n")
+    outf.write(f"        return visitor.visit{form_name}{base_name}(self)\n")
+
+
+def addFormVisitorLines(base_name: str, forms: List[str], visitorLines: List[str]):
+    for form in forms:
+        form_name, class_name = [v.strip() for v in form.split("<")]
+
+        visitorLines.append(f"    def visit{form_name}{base_name}(self, {base_name.lower()}: {form_name}):\n")
+        visitorLines.append(f"        return self.visit{class_name}{base_name}({base_name.lower()})\n\n")
+
+
 def defineExprClasses(outf, base_name: str, types_: List[str]):
     outf.write("\n")
 
     for type_ in types_:
-        class_name, fields = [v.strip() for v in type_.split("|")[:2]]
+        class_name, fields, *resolved = [v.strip() for v in type_.split("|")[:3]]
 
-        defineType(outf, base_name, class_name, fields)
+        defineType(outf, base_name, class_name, fields, *resolved)
     
 
-def defineAst(output_dir: str, base_name: str, types_: List[str], visitorLines: List[str]):
+def defineAst(output_dir: str, base_name: str, types_: List[str], visitorLines: List[str], forms: List[str]=[]):
     path = f"{output_dir}/{base_name}.py"
 
     output_file = open(path, mode='w+', encoding="utf-8")
@@ -71,7 +115,11 @@ def defineAst(output_dir: str, base_name: str, types_: List[str], visitorLines:
 
     defineExprClasses(output_file, base_name, types_)
 
+    for form in forms:
+        defineForm(output_file, base_name, *[v.strip() for v in form.split("<")])
+
     addVisitorLines(base_name, types_, visitorLines)
+    addFormVisitorLines(base_name, forms, visitorLines)
 
     print(f"[written]: {path}")
 
@@ -104,28 +152,53 @@ def main():
     defineAst(output_dir, 
               "Expr",
               [
-                "Assign | name, value",
+                "Assign | name, value | depth, slot",
                 "Binary | left, operator, right",
-                "CallFunction | callee, arguments, parenLoc",
+                "CallFunction | callee, arguments, parenLoc | cachedCallee, cacheVersion, cachedGlobals",
                 "Grouping | expression",
+                "Index | target, bracket, index",
                 "Literal | value",
                 "Logical | left, operator, right",
+                "SetIndex | target, bracket, index, value",
                 "Unary | operator, right",
-                "Variable | name"
+                "Variable | name | depth, slot"
               ],
-              visitorLines
+              visitorLines,
+              #what the tree Interpreter rewrites Binary, Unary and Logical nodes into
+              [
+                "AddFloats < Binary",
+                "AddStrings < Binary",
+                "SubtractFloats < Binary",
+                "MultiplyFloats < Binary",
+                "DivideFloats < Binary",
+                "GreaterFloats < Binary",
+                "GreaterEqualFloats < Binary",
+                "LessFloats < Binary",
+                "LessEqualFloats < Binary",
+                "NotEqualFloats < Binary",
+                "Equal < Binary",
+                "PolyBinary < Binary",
+                "Negate < Unary",
+                "Not < Unary",
+                "PolyUnary < Unary",
+                "And < Logical",
+                "Or < Logical"
+              ]
     )
     
     defineAst(output_dir,
               "Stmt",
               [
-                  "Block | statements",
+                  "Block | statements | size",
+                  "Break | keyword",
+                  "Continue | keyword",
                   "Expression | expression",
-                  "Function | name, params, body",
+                  "Function | name, params, body | slot, size",
                   "If | condition, thenBranch, elseBranch",
                   "Print | expression",
-                  "Var | name, initializer",
-                  "While | condition, body"
+                  "Return | keyword, value",
+                  "Var | name, initializer | slot",
+                  "While | condition, body, increment | counted"
               ],
               visitorLines
     )